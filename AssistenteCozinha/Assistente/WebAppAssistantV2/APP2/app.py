@@ -26,13 +26,21 @@ Os módulos externos:
 - @ref API_OpenFoodFacts: Funções para interagir com a API Open Food Facts e obter dados de produtos.
 - @ref format_date: Funções para formatar datas expressas em texto para um formato padrão.
 - @ref get_product: Funções para extrair informações de produtos a partir de sentenças.
+- @ref db_pool: Pool de conexões partilhado pelas bases de dados de receitas e da despensa.
+- @ref recipe_catalog: Catálogo de receitas em memória que serve os endpoints de leitura de receitas.
+- @ref cooking_session: Instruções das receitas em memória e cursor de passos por sessão de confeção.
+- @ref recipe_search: Pesquisa aproximada de receitas pelo nome, tolerante a acentos e erros de escrita.
+- @ref recipe_facets: Pesquisa facetada de receitas por tags, ingredientes, utensílios, tempo e porções.
+- @ref pantry_matcher: Sugestões de receitas ordenadas pelo que existe na despensa.
+- @ref change_feed: Feed de alterações da despensa e da lista de compras, com versões, para os clientes.
+- @ref utterance_extractor: Extração num só passo da quantidade, ingrediente, unidade e validade de um comando de voz.
 
 @note A maioria dos endpoints inclui tratamento de erros que retorna mensagens de erro adequadas como respostas JSON 
 quando ocorrem exceções ou dados de entrada estão faltando ou são inválidos.
 
 """
 
-from flask import Flask, render_template,request, jsonify
+from flask import Flask, render_template,request, jsonify, Response, stream_with_context
 # ----------------------------------------------------------------------------------------- MODULE: Recipedb_queries
 import recipedb_queries as db
 # ----------------------------------------------------------------------------------------- MODULE: Pantrydb_queries
@@ -49,10 +57,27 @@ import API_OpenFoodFacts as api_op
 import format_date as fd
 # ----------------------------------------------------------------------------------------- MODULE: get_product
 import get_product as gp
+# ----------------------------------------------------------------------------------------- MODULE: db_pool
+import db_pool
+# ----------------------------------------------------------------------------------------- MODULE: recipe_catalog
+import recipe_catalog as rc
+# ----------------------------------------------------------------------------------------- MODULE: cooking_session
+import cooking_session as cs
+# ----------------------------------------------------------------------------------------- MODULE: recipe_search
+import recipe_search as rs
+# ----------------------------------------------------------------------------------------- MODULE: recipe_facets
+import recipe_facets as rf
+# ----------------------------------------------------------------------------------------- MODULE: pantry_matcher
+import pantry_matcher as pm
+# ----------------------------------------------------------------------------------------- MODULE: change_feed
+import change_feed as cf
+# ----------------------------------------------------------------------------------------- MODULE: utterance_extractor
+import utterance_extractor as ue
 # ----------------------------------------------------------------------------------------- MODULE: requests
 import json
 
 from decimal import Decimal
+from datetime import date
 from flask_cors import CORS
  
 """@var app
@@ -90,9 +115,9 @@ def fetch_recipes():
     """
     @brief Obtém todas as receitas da base de dados.
 
-    @details Este endpoint recupera todas as receitas armazenadas na base de dados e formata cada receita
+    @details Este endpoint recupera todas as receitas do catálogo em memória e formata cada receita
     para incluir apenas o nome, número de porções e tempo de confeção. A função chama a
-    função `getRecipes()` do módulo `recipedb_queries`, que se espera que retorne
+    função `get_recipes()` do módulo `recipe_catalog`, que se espera que retorne
     um dicionário onde cada key representa uma receita.
 
     O endpoint formata a resposta num objeto JSON que inclui apenas (nome, número de porções e tempo de confeção).
@@ -126,9 +151,9 @@ def fetch_recipes():
     Quaisquer erros na camada de acesso à base de dados (como problemas de conexão ou erros SQL)
     precisam ser tratados pela função `getRecipes()` e devem ser registrados adequadamente.
 
-    @see recipedb_queries.getRecipes()
+    @see recipe_catalog.get_recipes()
     """
-    recipes = db.getRecipes()
+    recipes = rc.get_recipes()
     # Format each recipe to include only the desired fields
     formatted_recipes = [
         {
@@ -147,9 +172,9 @@ def fetch_recipe_by_tag(tag):
     @brief Obtém as IDs das receitas associadas a uma tag.
 
     @details Este endpoint é utilizado para obter todas os IDs de receitas que estão associadas a uma
-    tag. A tag é passada como parte do URL. A função chama `getRecipeByTag(tag)` do módulo
-    `recipedb_queries`, que deve buscar na base de dados e retornar uma lista de IDs de receitas que correspondem
-    à tag fornecida.
+    tag. A tag é passada como parte do URL. A função chama `get_recipe_ids_by_tag(tag)` do módulo
+    `recipe_facets`, que consulta o índice de tags em memória (ignorando acentos e maiúsculas) e retorna uma lista
+    de IDs de receitas que correspondem à tag fornecida.
 
     @param tag A tag pela qual as receitas serão pesquisadas na base de dados.
 
@@ -175,9 +200,9 @@ def fetch_recipe_by_tag(tag):
     }
     @endcode
 
-    @see recipedb_queries.getRecipeByTag(`tag`)
+    @see recipe_facets.get_recipe_ids_by_tag(`tag`)
     """
-    recipe_ids = db.getRecipeByTag(tag)
+    recipe_ids = rf.get_recipe_ids_by_tag(tag)
     return jsonify({'recipe_ids': recipe_ids})
 
 # ----------------------------------------------------------------------------------------- > FETCH RECIPE BY NAME
@@ -187,8 +212,8 @@ def fetch_recipe_by_name(name):
     @brief Obtém a ID de uma receita pelo seu nome.
 
     @details Este endpoint é utilizado para recuperar a ID de uma receita baseada no seu nome.
-    O nome é passado como parte do URL. A função consulta a base de dados através da função `getRecipe(name)`
-    do módulo `recipedb_queries`, que retorna a ID da receita se encontrada.
+    O nome é passado como parte do URL. A função usa `find_recipe(name)` do módulo `recipe_search`, que
+    devolve a receita cujo nome mais se aproxima do nome pedido, ignorando acentos, maiúsculas e pequenos erros.
 
     @param name O nome da receita a ser pesquisada. O nome deve ser passado na URL como uma string.
 
@@ -197,11 +222,9 @@ def fetch_recipe_by_name(name):
 
     @par Exemplo de como utilizar este endpoint:
     \verbatim
-        curl -X GET http://127.0.0.1:5000/recipe/name/Amêijoas à Bulhão Pato
+        curl -X GET http://127.0.0.1:5000/recipe/name/ameijoas%20a%20bulhao%20pato
     \endverbatim
     
-    @warning NOT WORKING
-    
     @retval JSON Exemplo de uma resposta bem-sucedida:
     @code
     {
@@ -216,17 +239,179 @@ def fetch_recipe_by_name(name):
     }
     @endcode
 
-    @note O nome da receita é case-sensitive e deve corresponder exatamente ao valor na base de dados para que a ID
-    seja retornada. Este endpoint retorna um status HTTP 404 se a receita não for encontrada.
+    @note Este endpoint retorna um status HTTP 404 se nenhuma receita tiver um nome suficientemente parecido.
+    Para obter várias receitas ordenadas por semelhança, usar `/recipes/search`.
 
-    @see recipedb_queries.getRecipe(`name`)
+    @see recipe_search.find_recipe(`name`)
     """
-    recipe_id = db.getRecipe(name)
+    recipe_id = rs.find_recipe(name)
     if recipe_id:
         return jsonify({'recipe_id': recipe_id})
     else:
         return jsonify({'error': 'Recipe not found'}), 404
 
+# ----------------------------------------------------------------------------------------- > SEARCH RECIPES BY NAME
+@app.route('/recipes/search', methods=['GET'])
+def search_recipes():
+    """
+    @brief Pesquisa receitas por nome, tolerante a acentos, maiúsculas e erros de escrita.
+
+    @details Este endpoint devolve as receitas cujo nome mais se aproxima do texto pesquisado, ordenadas por
+    pontuação (0 a 1). Utiliza a função `search(query, limit)` do módulo `recipe_search`, que consulta um índice
+    de trigramas em memória construído a partir do catálogo de receitas.
+
+    @param q (query string) O texto a pesquisar.
+    @param limit (query string, opcional) Número máximo de resultados (por omissão 5).
+
+    @return JSON Retorna uma lista de resultados; 400 se o parâmetro `q` estiver em falta.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/recipes/search?q=amejoas%20bulhao&limit=3"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {"recipe_id": 62, "name": "Amêijoas à Bulhão Pato", "score": 0.79}
+        ]
+    @endcode
+
+    @see recipe_search.search(`query`, `limit`)
+    """
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'Missing search query'}), 400
+    limit = request.args.get('limit', rs.DEFAULT_LIMIT, type=int)
+    return jsonify(rs.search(query, max(1, min(limit, 50))))
+
+# ----------------------------------------------------------------------------------------- > FACETED RECIPE SEARCH
+@app.route('/recipes/facets/search', methods=['GET'])
+def search_recipes_by_facets():
+    """
+    @brief Pesquisa receitas combinando tags, ingredientes, utensílios, tempo de confeção e porções.
+
+    @details Este endpoint responde a pedidos como "sobremesa, com chocolate, sem forno, em menos de 30 minutos"
+    com interseções de índices em memória, através da função `search(...)` do módulo `recipe_facets`.
+    Os filtros de texto aceitam vários valores separados por vírgulas (ou o parâmetro repetido) e ignoram
+    acentos e maiúsculas:
+    - `tag`, `ingredient`, `tool`: a receita tem de ter todos os valores indicados.
+    - `without_tag`, `without_ingredient`, `without_tool`: a receita não pode ter nenhum dos valores indicados.
+    - `min_time`, `max_time`: tempo de confeção em minutos.
+    - `min_servings`, `max_servings`: número de porções.
+    - `limit`: número máximo de resultados.
+
+    @return JSON Retorna a lista de receitas encontradas, por ordem de ID.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/recipes/facets/search?tag=sobremesa&ingredient=chocolate&without_tool=forno&max_time=30"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {
+                "recipe_id": 76,
+                "name": "Mousse de Chocolate Negro sem adição de açúcares",
+                "cooking_time": 15,
+                "number_of_servings": 6
+            }
+        ]
+    @endcode
+
+    @see recipe_facets.search()
+    """
+    def values(param):
+        return [v.strip() for arg in request.args.getlist(param) for v in arg.split(',') if v.strip()]
+
+    filters = {
+        'tags': values('tag'),
+        'ingredients': values('ingredient'),
+        'tools': values('tool'),
+        'without_tags': values('without_tag'),
+        'without_ingredients': values('without_ingredient'),
+        'without_tools': values('without_tool'),
+    }
+    for param in ('min_time', 'max_time', 'min_servings', 'max_servings'):
+        filters[param] = request.args.get(param, type=int)
+    return jsonify(rf.search(limit=request.args.get('limit', type=int), **filters))
+
+# ----------------------------------------------------------------------------------------- > LIST FACET VALUES
+@app.route('/recipes/facets', methods=['GET'])
+def fetch_recipe_facets():
+    """
+    @brief Lista os valores de cada faceta (tags, ingredientes, utensílios) e o número de receitas de cada um.
+
+    @details Útil para mostrar filtros na interface ou para validar os valores reconhecidos por voz.
+    Utiliza a função `facet_counts()` do módulo `recipe_facets`.
+
+    @return JSON Retorna um objeto com uma entrada por faceta.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET http://127.0.0.1:5000/recipes/facets
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "tags": {"doce": 3, "sobremesa": 3, ...},
+            "ingredients": {"chocolate": 2, "chocolate negro": 1, ...},
+            "tools": {"forno": 6, ...}
+        }
+    @endcode
+
+    @see recipe_facets.facet_counts()
+    """
+    return jsonify(rf.facet_counts())
+
+# ----------------------------------------------------------------------------------------- > FETCH RECIPE SUMMARIES
+@app.route('/recipes/summary', methods=['GET'])
+def fetch_recipe_summaries():
+    """
+    @brief Obtém o resumo de todas as receitas (ou de uma só) a partir da tabela materializada `recipe_summary`.
+
+    @details O resumo é calculado na ingestão das receitas, por isso este endpoint lê apenas uma tabela,
+    sem juntar ingredientes, passos e utensílios. Utiliza as funções `getRecipeSummaries()` e
+    `getRecipeSummary()` do módulo `recipedb_queries`.
+
+    @param id (query, opcional) ID de uma receita; sem ele são devolvidas todas, ordenadas pelo nome.
+
+    @return JSON Retorna a lista de resumos (ou o resumo da receita pedida, 404 se não existir).
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET http://127.0.0.1:5000/recipes/summary
+        curl -X GET "http://127.0.0.1:5000/recipes/summary?id=57"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {
+                "recipe_id": 57,
+                "name": "Pica-Pau de Entremeada",
+                "number_of_servings": 4,
+                "cooking_minutes": 40,
+                "calories_per_portion": 612.5,
+                "ingredient_count": 11,
+                "step_count": 6,
+                "tool_count": 3
+            }
+        ]
+    @endcode
+
+    @see recipedb_queries.getRecipeSummaries(), recipedb_queries.getRecipeSummary()
+    """
+    recipe_id = request.args.get('id', type=int)
+    if recipe_id is not None:
+        summary = db.getRecipeSummary(recipe_id)
+        if summary is None:
+            return jsonify({"error": "Recipe not found"}), 404
+        return jsonify(summary)
+    return jsonify(db.getRecipeSummaries())
+
 # ----------------------------------------------------------------------------------------- > FETCH INGREDIENTS FOR A GIVEN RECIPE ID
 @app.route('/recipe/<int:recipe_id>/ingredients', methods=['GET'])
 def fetch_ingredients(recipe_id):
@@ -234,7 +419,7 @@ def fetch_ingredients(recipe_id):
     @brief Obtém os ingredientes para uma dada ID de receita.
 
     @details Este endpoint é utilizado para recuperar a lista de ingredientes de uma receita específica.
-    A função consulta a base de dados através da função `getIngredients(recipe_id)` do módulo `recipedb_queries`,
+    A função consulta o catálogo em memória através da função `get_ingredients(recipe_id)` do módulo `recipe_catalog`,
     que retorna uma lista de ingredientes associados à ID da receita.
 
     @param recipe_id A ID da receita para a qual os ingredientes são solicitados. A ID é passada na URL como um inteiro.
@@ -265,9 +450,9 @@ def fetch_ingredients(recipe_id):
     
     @note Se a receita não for encontrada, o endpoint retorna um array vazio.
     
-    @see recipedb_queries.getIngredients(`recipe_id`)
+    @see recipe_catalog.get_ingredients(`recipe_id`)
     """
-    ingredients = db.getIngredients(recipe_id)
+    ingredients = rc.get_ingredients(recipe_id)
     return jsonify(ingredients)
 
 # ----------------------------------------------------------------------------------------- > FETCH TOOLS FOR A GIVEN RECIPE ID
@@ -277,7 +462,7 @@ def fetch_tools(recipe_id):
     @brief Obtém as ferramentas para uma dada ID de receita.
 
     @details Este endpoint é utilizado para recuperar a lista de ferramentas necessárias para preparar uma receita.
-    A função consulta a base de dados através da função `getTools(recipe_id)` do módulo `recipedb_queries`,
+    A função consulta o catálogo em memória através da função `get_tools(recipe_id)` do módulo `recipe_catalog`,
     que retorna uma lista de ferramentas associadas à ID da receita.
 
     @param recipe_id A ID da receita para a qual as ferramentas são solicitadas. A ID é passada na URL como um inteiro.
@@ -304,9 +489,9 @@ def fetch_tools(recipe_id):
     
     @note Se a receita não for encontrada, o endpoint retorna um array vazio.
     
-    @see recipedb_queries.getTools(`recipe_id`)
+    @see recipe_catalog.get_tools(`recipe_id`)
     """
-    tools = db.getTools(recipe_id)
+    tools = rc.get_tools(recipe_id)
     return jsonify(tools)
 
 # ----------------------------------------------------------------------------------------- > FETCH A RANDOM RECIPE
@@ -315,15 +500,19 @@ def fetch_random_recipe():
     """
     @brief Obtém uma receita aleatória.
 
-    @details Este endpoint seleciona uma receita aleatória da base de dados e retorna a sua ID, nome e imagem associada.
-    A função utiliza a `getRandomRecipe()` para obter uma ID de receita aleatória e posteriormente recupera o nome e a imagem usando
-    `getRecipeName(recipe_id)` e `getImg_url(recipe_id)` respectivamente, do módulo `recipedb_queries`.
+    @details Este endpoint seleciona uma receita aleatória do catálogo em memória e retorna a sua ID, nome e imagem associada,
+    numa só chamada à função `random_recipe(session_id)` do módulo `recipe_catalog`.
+    Se for indicado o parâmetro opcional `session`, as sugestões dessa sessão não se repetem até todas as receitas
+    do catálogo terem sido sugeridas.
+
+    @param session (query string, opcional) Identificador da sessão para sugestões sem repetição.
 
     @return JSON Retorna um objeto JSON contendo a ID da receita, nome e URL da imagem. Se nenhuma receita for encontrada, retorna nulo.
     
     @par Exemplo de como utilizar este endpoint:
     \verbatim
-        curl -X POST http://127.0.0.1:5000/recipe/random
+        curl -X GET http://127.0.0.1:5000/recipe/random
+        curl -X GET "http://127.0.0.1:5000/recipe/random?session=USER1"
     \endverbatim
     
     @retval JSON Exemplo de uma resposta bem-sucedida:
@@ -337,16 +526,9 @@ def fetch_random_recipe():
     
     @note Se a receita não for encontrada, o endpoint retorna um objeto JSON com valores nulos, apenas quando não existem receitas na base de dados.
     
-    @see recipedb_queries.getRandomRecipe()
-    @see recipedb_queries.getRecipeName(`recipe_id`)
-    @see recipedb_queries.getImg_url(`recipe_id`)
+    @see recipe_catalog.random_recipe(`session_id`)
     """
-    recipe_id = db.getRandomRecipe()
-    #print("recipe_id", recipe_id)
-    recipe_name = db.getRecipeName(recipe_id) if recipe_id else None
-    recipe_img = db.getImg_url(recipe_id) if recipe_id else None
-    #print("recipe_name", recipe_name)
-    return jsonify({'recipe_id': recipe_id, 'recipe_name': recipe_name, 'recipe_img': recipe_img})
+    return jsonify(rc.random_recipe(request.args.get('session')))
 
 # ----------------------------------------------------------------------------------------- > FETCH NEXT INSTRUCTION FOR A GIVEN RECIPE ID AND CURRENT STEP
 @app.route('/recipe/<int:recipe_id>/next-instruction/<int:step>', methods=['GET'])
@@ -355,7 +537,7 @@ def fetch_next_instruction(recipe_id, step):
     @brief Obtém a próxima instrução para uma dada ID de receita e passo atual.
 
     @details Este endpoint é usado para obter a descrição do próximo passo de uma receita específica.
-    Utiliza a função `getNextInstruction(recipe_id, step)` do módulo `recipedb_queries` para recuperar a próxima instrução com base no passo atual.
+    As instruções da receita são lidas de uma só vez pelo módulo `cooking_session` e o próximo passo é obtido em memória.
 
     @param recipe_id A ID da receita cuja próxima instrução é solicitada.
     @param step O número do passo atual dentro da receita.
@@ -381,9 +563,13 @@ def fetch_next_instruction(recipe_id, step):
         }
     @endcode
     
-    @see recipedb_queries.getNextInstruction(`recipe_id`, `step`)
+    @see cooking_session.get_steps(`recipe_id`)
     """
-    next_instruction = db.getNextInstruction(recipe_id, step)
+    steps = cs.get_steps(recipe_id)
+    if steps is None:
+        next_instruction = db.getNextInstruction(recipe_id, step)
+    else:
+        next_instruction = steps.description(step + 1)
     return jsonify({'next_instruction': next_instruction})
 
 # ----------------------------------------------------------------------------------------- > FETCH PREVIOUS INSTRUCTION FOR A GIVEN RECIPE ID AND CURRENT STEP
@@ -393,7 +579,7 @@ def fetch_previous_instruction(recipe_id, step):
     @brief Obtém a instrução anterior para uma dada ID de receita e passo atual.
 
     @details Este endpoint é usado para obter a descrição do passo anterior de uma receita específica.
-    Utiliza a função `getPreviousInstruction(recipe_id, step)` do módulo `recipedb_queries` para recuperar a instrução anterior com base no passo atual.
+    As instruções da receita são lidas de uma só vez pelo módulo `cooking_session` e o passo anterior é obtido em memória.
 
     @param recipe_id A ID da receita cuja instrução anterior é solicitada.
     @param step O número do passo atual dentro da receita.
@@ -419,9 +605,13 @@ def fetch_previous_instruction(recipe_id, step):
         }
     @endcode
     
-    @see recipedb_queries.getPreviousInstruction(`recipe_id`, `step`)
+    @see cooking_session.get_steps(`recipe_id`)
     """
-    previous_instruction = db.getPreviousInstruction(recipe_id, step)
+    steps = cs.get_steps(recipe_id)
+    if steps is None:
+        previous_instruction = db.getPreviousInstruction(recipe_id, step)
+    else:
+        previous_instruction = steps.description(step - 1) if step > 1 else None
     return jsonify({'previous_instruction': previous_instruction})
 
 # ----------------------------------------------------------------------------------------- > FETCH ACTUAL INSTRUCTION FOR A GIVEN RECIPE ID AND CURRENT STEP
@@ -431,7 +621,7 @@ def fetch_actual_instruction(recipe_id, step):
     @brief Obtém a instrução atual para uma dada ID de receita e passo atual.
 
     @details Este endpoint é usado para obter a descrição do passo atual de uma receita específica.
-    Utiliza a função `getActualInstruction(recipe_id, step)` do módulo `recipedb_queries` para recuperar a instrução atual com base no passo fornecido.
+    As instruções da receita são lidas de uma só vez pelo módulo `cooking_session` e o passo atual é obtido em memória.
 
     @param recipe_id A ID da receita cuja instrução atual é solicitada.
     @param step O número do passo atual dentro da receita.
@@ -457,11 +647,128 @@ def fetch_actual_instruction(recipe_id, step):
         }
     @endcode
     
-    @see recipedb_queries.getActualInstruction(`recipe_id`, `step`)
+    @see cooking_session.get_steps(`recipe_id`)
     """
-    actual_instruction = db.getActualInstruction(recipe_id, step)
+    steps = cs.get_steps(recipe_id)
+    if steps is None:
+        actual_instruction = db.getActualInstruction(recipe_id, step)
+    else:
+        actual_instruction = steps.description(step) if step > 0 else None
     return jsonify({'actual_instruction': actual_instruction})
 
+# ----------------------------------------------------------------------------------------- > START A COOKING SESSION
+@app.route('/cooking-session/<session_id>', methods=['POST'])
+def start_cooking_session(session_id):
+    """
+    @brief Inicia uma sessão de confeção para uma receita.
+
+    @details Este endpoint carrega de uma só vez todas as instruções (e utensílios por passo) da receita indicada
+    e guarda um cursor de passos para a sessão. A navegação seguinte é feita com `/cooking-session/<session_id>/<action>`
+    sem novas consultas à base de dados. Iniciar uma sessão já existente recomeça a receita.
+
+    @param session_id Identificador da sessão: o `sender` do Rasa, também usado pela interface.
+
+    @return JSON Retorna o estado da sessão, um erro 400 se `recipe_id` faltar ou não for um número inteiro, ou um erro
+    503 se as instruções não puderem ser carregadas.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/cooking-session/USER1 \
+        -H "Content-Type: application/json" \
+        -d '{"recipe_id": 62}'
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "position": 0,
+            "recipe_id": 62,
+            "step": null,
+            "total_steps": 4
+        }
+    @endcode
+
+    @see cooking_session.start_session(`session_id`, `recipe_id`)
+    """
+    data = request.get_json(silent=True)
+    recipe_id = data.get('recipe_id') if isinstance(data, dict) else None
+
+    if recipe_id is None:
+        return jsonify({'error': 'Missing required field: "recipe_id".'}), 400
+    try:
+        if isinstance(recipe_id, (bool, float)):
+            raise ValueError
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid recipe id: "recipe_id" must be an integer.'}), 400
+
+    session = cs.start_session(session_id, recipe_id)
+    if session is None:
+        return jsonify({'error': 'Failed to load recipe instructions.'}), 503
+    return jsonify(session.state()), 201
+
+# ----------------------------------------------------------------------------------------- > MOVE THE COOKING SESSION CURSOR
+@app.route('/cooking-session/<session_id>/<action>', methods=['GET'])
+def move_cooking_session(session_id, action):
+    """
+    @brief Navega nos passos de uma sessão de confeção.
+
+    @details As ações disponíveis são `next` (próximo passo), `previous` (passo anterior), `repeat` (repete o passo atual,
+    ou o primeiro se a receita ainda não começou) e `current` (passo atual sem mover o cursor).
+    Todas são leituras em memória sobre as instruções carregadas no início da sessão.
+    O cursor vive neste processo; a interface e o servidor de ações do Rasa usam como `session_id` o `sender` do Rasa,
+    pelo que navegam na mesma sessão.
+
+    @param session_id Identificador da sessão.
+    @param action Uma de `next`, `previous`, `repeat` ou `current`.
+    @param recipe_id (query, opcional) Receita da sessão; se a sessão não existir ou for de outra receita, é iniciada
+    uma sessão nova para esta receita.
+
+    @return JSON Retorna o estado da sessão com o passo obtido; `step` é nulo quando não há passo nessa direção.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET http://127.0.0.1:5000/cooking-session/USER1/next
+        curl -X GET "http://127.0.0.1:5000/cooking-session/USER1/repeat?recipe_id=62"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "position": 1,
+            "recipe_id": 62,
+            "step": {
+                "description": "Deite as amêijoas num recipiente grande, encha de água e coloque sal...",
+                "step": 1,
+                "tools": ["Recipiente grande"]
+            },
+            "total_steps": 4
+        }
+    @endcode
+
+    @note Se a sessão não existir e não for indicado `recipe_id`, o endpoint retorna um erro com status 404.
+
+    @see cooking_session.CookingSession
+    """
+    recipe_id = request.args.get('recipe_id', type=int)
+    session = cs.get_session(session_id, recipe_id)
+    if session is None:
+        if recipe_id is not None:
+            return jsonify({'error': 'Failed to load recipe instructions.'}), 503
+        return jsonify({'error': 'Cooking session not found'}), 404
+
+    moves = {
+        'next': session.next,
+        'previous': session.previous,
+        'repeat': session.repeat,
+        'current': session.current,
+    }
+    if action not in moves:
+        return jsonify({'error': f'Unknown action "{action}".'}), 400
+
+    step = moves[action]()
+    return jsonify({**session.state(), 'step': step})
+
 # ----------------------------------------------------------------------------------------- > FETCH RECIPE NAME BY ID
 @app.route('/recipe/<int:recipe_id>/name', methods=['GET'])
 def fetch_recipe_name(recipe_id):
@@ -469,7 +776,7 @@ def fetch_recipe_name(recipe_id):
     @brief Obtém o nome de uma receita dado o seu ID.
 
     @details Este endpoint é usado para obter o nome de uma receita específica utilizando a sua ID.
-    Utiliza a função `getRecipeName(recipe_id)` do módulo `recipedb_queries`. Se o nome da receita for encontrado,
+    Utiliza a função `get_recipe_name(recipe_id)` do módulo `recipe_catalog`. Se o nome da receita for encontrado,
     ele será retornado, caso contrário, uma mensagem de erro será retornada indicando que a receita não foi encontrada.
 
     @param recipe_id A ID da receita cujo nome é solicitado.
@@ -495,9 +802,9 @@ def fetch_recipe_name(recipe_id):
         }
     @endcode
     
-    @see recipedb_queries.getRecipeName(`recipe_id`)
+    @see recipe_catalog.get_recipe_name(`recipe_id`)
     """
-    recipe_name = db.getRecipeName(recipe_id)
+    recipe_name = rc.get_recipe_name(recipe_id)
     if recipe_name:
         return jsonify({'recipe_name': recipe_name})
     else:
@@ -509,7 +816,7 @@ def fetch_recipe_image(recipe_id):
     """
     @brief Obtém a URL da imagem para uma dada ID de receita.
 
-    @details Este endpoint é usado para obter a URL da imagem associada a uma receita específica, utilizando a função `getImg_url(recipe_id)` do módulo `recipedb_queries`. Se a imagem estiver disponível, a URL é retornada, caso contrário, retorna um erro indicando que a imagem não foi encontrada.
+    @details Este endpoint é usado para obter a URL da imagem associada a uma receita específica, utilizando a função `get_image_url(recipe_id)` do módulo `recipe_catalog`. Se a imagem estiver disponível, a URL é retornada, caso contrário, retorna um erro indicando que a imagem não foi encontrada.
 
     @param recipe_id A ID da receita cuja imagem é solicitada.
 
@@ -534,14 +841,132 @@ def fetch_recipe_image(recipe_id):
         }
     @endcode
     
-    @see recipedb_queries.getImg_url(`recipe_id`)
+    @see recipe_catalog.get_image_url(`recipe_id`)
     """
-    img_url = db.getImg_url(recipe_id)
+    img_url = rc.get_image_url(recipe_id)
     if img_url:
         return jsonify({'img_url': img_url})
     else:
         return jsonify({'error': 'Image not found for the specified recipe'}), 404
 
+# ----------------------------------------------------------------------------------------- > FETCH A WHOLE RECIPE (OR SELECTED FIELDS) BY ID
+@app.route('/recipe/<int:recipe_id>/full', methods=['GET'])
+def fetch_recipe_full(recipe_id):
+    """
+    @brief Obtém uma receita completa num só pedido.
+
+    @details Este endpoint junta numa única resposta o que antes exigia um pedido por parte da receita
+    (`/name`, `/image`, `/ingredients`, `/tools` e as instruções). Utiliza a função `get_recipe_full(recipe_id, fields)`
+    do módulo `recipe_catalog`, que serve os dados a partir do catálogo em memória.
+    O parâmetro opcional `fields` limita a resposta aos campos pedidos, separados por vírgulas:
+    `name`, `servings`, `cooking_time`, `image`, `ingredients`, `tools`, `steps`. Sem `fields`, são devolvidos todos.
+
+    @param recipe_id A ID da receita.
+
+    @return JSON Retorna a receita com os campos pedidos; 404 se a receita não existir; 400 se algum campo for desconhecido.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/recipe/62/full?fields=name,image,ingredients,tools"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "recipe_id": 62,
+            "name": "Amêijoas à Bulhão Pato",
+            "img_url": "https://www.saborintenso.com/attachments/...jpg",
+            "ingredients": [
+                {"name": "amêijoas", "quantity": "1.00", "unit": "kg"},
+                ...
+            ],
+            "tools": ["tacho", "colher de pau"]
+        }
+    @endcode
+
+    @see recipe_catalog.get_recipe_full(`recipe_id`, `fields`)
+    """
+    try:
+        recipe = rc.get_recipe_full(recipe_id, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if recipe:
+        return jsonify(recipe)
+    else:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+# ----------------------------------------------------------------------------------------- > FETCH SEVERAL WHOLE RECIPES (OR SELECTED FIELDS) BY ID
+@app.route('/recipes/full', methods=['GET'])
+def fetch_recipes_full():
+    """
+    @brief Obtém várias receitas completas num só pedido.
+
+    @details Variante de `/recipe/<recipe_id>/full` para listas de receitas. Os IDs são passados no parâmetro `ids`,
+    separados por vírgulas, e o parâmetro opcional `fields` funciona como no endpoint de uma só receita.
+    As receitas são devolvidas pela ordem dos IDs pedidos; IDs inexistentes são omitidos.
+
+    @return JSON Retorna uma lista de receitas; 400 se `ids` não for válido ou se algum campo for desconhecido.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/recipes/full?ids=62,63,64&fields=name,image"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {"recipe_id": 62, "name": "Amêijoas à Bulhão Pato", "img_url": "https://..."},
+            {"recipe_id": 63, "name": "Arroz de Pato", "img_url": "https://..."}
+        ]
+    @endcode
+
+    @see recipe_catalog.get_recipes_full(`recipe_ids`, `fields`)
+    """
+    try:
+        recipe_ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'error': 'Invalid recipe ids'}), 400
+    try:
+        recipes = rc.get_recipes_full(recipe_ids, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(recipes)
+
+# ----------------------------------------------------------------------------------------- > RELOAD THE IN-MEMORY RECIPE CATALOG
+@app.route('/recipes/catalog/refresh', methods=['POST'])
+def refresh_recipe_catalog():
+    """
+    @brief Recarrega o catálogo de receitas em memória.
+
+    @details Este endpoint é chamado pelo script de ingestão (`insertRecipeDB.py`) depois de inserir receitas,
+    para que os endpoints de leitura passem a servir os dados novos imediatamente. Sem esta chamada, o catálogo
+    deteta a alteração sozinho na próxima verificação de versão.
+    Se a base de dados não estiver disponível, o catálogo anterior continua a ser servido e o endpoint retorna 503.
+
+    @return JSON Retorna o estado do catálogo após a recarga.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/recipes/catalog/refresh
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "loaded": true,
+            "loaded_at": 1717430000.12,
+            "recipes": 15,
+            "version": [15, 79, 160, 15, 98, 120, 72]
+        }
+    @endcode
+
+    @see recipe_catalog.refresh()
+    """
+    cs.clear_cache()
+    if rc.refresh():
+        return jsonify(rc.catalog.status()), 200
+    return jsonify(rc.catalog.status()), 503
+
 # ----------------------------------------------------------------------------------------- > CONVERT TEXT NUMBERS TO DIGITS    
 @app.route('/convert-text', methods=['POST'])
 def convert_text():
@@ -591,6 +1016,7 @@ def format_date():
     @brief Formata uma data fornecida para o padrão ISO 8601.
 
     @details Recebe uma data em texto através de um pedido JSON e utiliza a função `parse_date` do módulo `format_date` para converter a data para o formato ISO 8601.
+    Além das datas absolutas ("25 de Maio de 2050", "25/05/2050"), aceita datas relativas ao dia de hoje ("amanhã", "daqui a cinco dias", "fim do mês").
 
     @return JSON Retorna a data formatada em JSON ou um erro se a formatação falhar.
 
@@ -732,6 +1158,109 @@ def get_unit():
     except Exception as e:
         return jsonify({'error': f'Failed to get unit: {e}'}), 500
 
+# ----------------------------------------------------------------------------------------- > FETCH EVERY PRODUCT AND UNIT FROM A SENTENCE
+@app.route('/get-products', methods=['POST'])
+def get_products():
+    """
+    @brief Obtém todos os ingredientes e unidades de uma frase, com a posição de cada um.
+    
+    @details Este endpoint analisa a frase recebida via JSON numa só passagem com a função `find_products` do módulo `get_product`, em vez de chamar `/get-ingredient` e `/get-unit` separadamente.
+    
+    @return JSON Retorna a lista de ocorrências encontradas (vazia se não houver nenhuma).
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/get-products \
+        -H "Content-Type: application/json" \
+        -d '{"sentence": "adiciona 5 kg de massa e 2 latas de atum"}'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "message": [
+                {"label": "unit", "value": "kg", "text": "kg", "start": 11, "end": 13},
+                {"label": "ingredient", "value": "massa", "text": "massa", "start": 17, "end": 22},
+                {"label": "unit", "value": "lata", "text": "latas", "start": 27, "end": 32},
+                {"label": "ingredient", "value": "atum", "text": "atum", "start": 36, "end": 40}
+            ]
+        }
+    @endcode
+    
+    @see get_product.find_products(`sentence`)
+    """
+    data = request.json or {}
+    sentence = data.get('sentence')
+    if not sentence:
+        return jsonify({'error': 'Missing required fields.'}), 400
+    
+    try:
+        return jsonify({'message': gp.find_products(sentence)}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to get products: {e}'}), 500
+
+# ----------------------------------------------------------------------------------------- > EXTRACT QUANTITY, PRODUCT, UNIT AND DATE FROM AN UTTERANCE
+@app.route('/extract-utterance', methods=['POST'])
+def extract_utterance():
+    """
+    @brief Extrai a quantidade, o ingrediente, a unidade e a data de validade de uma ou várias frases.
+    
+    @details Este endpoint substitui a sequência `/convert-text`, `/get-ingredient`, `/get-unit` e `/format-date`: cada frase é analisada uma única vez pela função `extract` do módulo `utterance_extractor`.
+    Com "text" devolve o resultado de uma frase; com "texts" (lista, até `utterance_extractor.MAX_BATCH` frases) devolve uma lista de resultados pela mesma ordem.
+    
+    @return JSON Retorna o resultado da extração ou um erro se o pedido for inválido.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/extract-utterance \
+        -H "Content-Type: application/json" \
+        -d '{"text": "adiciona duas latas de atum com validade 21 de Maio de 2030"}'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "message": {
+                "text": "adiciona duas latas de atum com validade 21 de Maio de 2030",
+                "normalized": "adiciona duas latas de atum com validade 21 de maio de 2030",
+                "quantity": {"value": 2, "text": "duas", "start": 9, "end": 13, "confidence": 0.9},
+                "ingredient": {"value": "atum", "text": "atum", "start": 23, "end": 27, "confidence": 1.0},
+                "unit": {"value": "lata", "text": "latas", "start": 14, "end": 19, "confidence": 1.0},
+                "expiration_date": {"value": "2030-05-21", "text": "21 de maio de 2030", "start": 41, "end": 59, "confidence": 1.0}
+            }
+        }
+    @endcode
+    
+    @retval JSON Exemplo de uma resposta mal-sucedida:
+    @code
+        {
+            "error": "Request must be JSON and contain a \"text\" or \"texts\" field."
+        }
+    @endcode
+    
+    @see utterance_extractor.extract(`utterance`)
+    @see utterance_extractor.extract_many(`utterances`)
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if texts is not None:
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': '"texts" must be a list of strings.'}), 400
+        if len(texts) > ue.MAX_BATCH:
+            return jsonify({'error': f'At most {ue.MAX_BATCH} texts per request.'}), 400
+        try:
+            return jsonify({'message': ue.extract_many(texts)}), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to extract utterances: {e}'}), 500
+    
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'Request must be JSON and contain a "text" or "texts" field.'}), 400
+    try:
+        return jsonify({'message': ue.extract(text)}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to extract utterance: {e}'}), 500
+
 # ----------------------------------- > [ PANTRY DATABASE -> ENDPOINTS]
 
 # ----------------------------------------------------------------------------------------- > INSERT PRODUCT INTO PANTRY
@@ -792,6 +1321,55 @@ def insert_stock():
     except Exception as e:
         return jsonify({'error': f'Failed to insert stock: {e}'}), 500
 
+# ----------------------------------------------------------------------------------------- > INSERT SEVERAL PRODUCTS INTO PANTRY
+@app.route('/pantry/insert-stock/bulk', methods=['POST'])
+def insert_stock_bulk():
+    """
+    @brief Insere vários produtos na despensa num único pedido.
+    
+    @details Pensado para sessões de leitura de códigos de barras (descarregar as compras) e para povoar a despensa.
+    Todos os produtos são inseridos numa única transação com a função `insertStockBulk(items)` do módulo
+    `pantrydb_queries`. O corpo do pedido pode ser a lista de produtos ou um objeto {"items": [...]}.
+    
+    @return JSON Retorna o resultado de cada produto, pela ordem do pedido.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/pantry/insert-stock/bulk \
+        -H "Content-Type: application/json" \
+        -d '{
+            "items": [
+                {"name": "Azeite", "quantity": "1", "unit": "l", "expiration_date": "2024-04-23"},
+                {"name": "Arroz", "quantity": "2", "unit": "kg", "expiration_date": "2025-01-10"}
+            ]
+        }'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "inserted": 2,
+            "results": [
+                {"name": "Azeite", "status": "inserted", "stock_id": 4},
+                {"name": "Arroz", "status": "inserted", "stock_id": 9}
+            ]
+        }
+    @endcode
+    
+    @note Produtos com campos em falta ou inválidos aparecem com "status": "error" e não impedem os restantes.
+    Se nenhum produto for inserido, o endpoint retorna o status 400.
+    
+    @see pantrydb_queries.insertStockBulk(`items`)
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of items.'}), 400
+    
+    results = pdb.insertStockBulk(items)
+    inserted = sum(1 for result in results if result['status'] == 'inserted')
+    return jsonify({'inserted': inserted, 'results': results}), 201 if inserted else 400
+
 # ----------------------------------------------------------------------------------------- > REMOVE PRODUCT FROM PANTRY
 @app.route('/pantry/remove-stock', methods=['POST'])
 def remove_stock():
@@ -855,34 +1433,266 @@ def remove_stock():
 @app.route('/pantry/stock', methods=['GET'])
 def get_pantry_stock():
     """
-    @brief Obtém todos os produtos na despensa.
+    @brief Obtém os produtos na despensa, um lote por entrada.
+    
+    @details Por omissão devolve uma página de lotes estruturados (JSON), com paginação por chave: a resposta
+    inclui `next_cursor`, a passar em `cursor` para obter a página seguinte (null na última página).
+    Utiliza as funções `getStockLots()`, `iterStockLots()` e `getStockDetails()` do módulo `pantrydb_queries`.
     
-    @details Este endpoint recupera todos os produtos na despensa chamando a função `getStockDetails()` do módulo `pantrydb_queries`.
+    @param format (query string, opcional) "json" (por omissão), "ndjson" para receber todos os lotes em streaming
+    (um objeto JSON por linha) ou "legacy" para a lista de strings antiga.
+    @param limit (query string, opcional) Lotes por página (por omissão 100, máximo 1000).
+    @param cursor (query string, opcional) `next_cursor` da página anterior.
+    @param name_prefix (query string, opcional) Só produtos cujo nome começa por este texto.
+    @param unit (query string, opcional) Só lotes nesta unidade.
+    @param expires_after, expires_before (query string, opcional) Intervalo de validades (AAAA-MM-DD).
     
-    @return JSON Retorna uma lista de produtos na despensa.
+    @return JSON Retorna uma página de lotes da despensa.
     
     @par Exemplo de como utilizar este endpoint:
     \verbatim
-        curl -X GET http://127.0.0.1:5000/pantry/stock
+        curl -X GET "http://127.0.0.1:5000/pantry/stock?limit=2"
+        curl -X GET "http://127.0.0.1:5000/pantry/stock?limit=2&cursor=7&name_prefix=ba"
+        curl -X GET "http://127.0.0.1:5000/pantry/stock?format=ndjson&expires_before=2025-09-30"
+        curl -X GET "http://127.0.0.1:5000/pantry/stock?format=legacy"
     \endverbatim
     
     @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "items": [
+                {"lot_id": 3, "name": "Arroz", "quantity": 3.0, "unit": "kg", "expiration_date": "2025-08-07"},
+                {"lot_id": 7, "name": "Bacalhau", "quantity": 1.0, "unit": "kg", "expiration_date": "2025-09-27"}
+            ],
+            "next_cursor": 7
+        }
+    @endcode
+    
+    @retval JSON Exemplo da resposta com format=legacy:
     @code
         [
             "Arroz 3.0 kg, Data de Validade : 2025/08/07",
             "Bacalhau 1.0 kg, Data de Validade : 2025/09/27",
-            "Bananas 2.0 kg, Data de Validade : 2025/11/01",
-            "bife de vaca 2.0 kg, Data de Validade : 2025/08/24",
             ...
         ]
     @endcode
     
-    @note Se a despensa estiver vazia, o endpoint retorna uma lista vazia.
+    @note Se a despensa estiver vazia, `items` é uma lista vazia.
     
-    @see pantrydb_queries.getStockDetails()
+    @see pantrydb_queries.getStockLots(), pantrydb_queries.iterStockLots(), pantrydb_queries.getStockDetails()
     """
-    pantry_list = pdb.getStockDetails()
-    return jsonify(pantry_list)
+    response_format = request.args.get('format', 'json')
+    if response_format == 'legacy':
+        pantry_list = pdb.getStockDetails()
+        return jsonify(pantry_list)
+    
+    try:
+        filters = {
+            'name_prefix': request.args.get('name_prefix'),
+            'unit': request.args.get('unit'),
+            'expires_after': date.fromisoformat(request.args['expires_after']) if request.args.get('expires_after') else None,
+            'expires_before': date.fromisoformat(request.args['expires_before']) if request.args.get('expires_before') else None,
+        }
+    except ValueError:
+        return jsonify({'error': 'Invalid date: use the YYYY-MM-DD format.'}), 400
+    limit = min(max(request.args.get('limit', pdb.STOCK_PAGE_SIZE, type=int), 1), 1000)
+    
+    if response_format == 'ndjson':
+        lines = (json.dumps(lot, ensure_ascii=False) + "\n" for lot in pdb.iterStockLots(page_size=limit, **filters))
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    
+    lots = pdb.getStockLots(after=request.args.get('cursor', type=int), limit=limit, **filters)
+    if lots is None:
+        return jsonify({'error': 'Failed to fetch stock.'}), 500
+    next_cursor = lots[-1]['lot_id'] if len(lots) == limit else None
+    return jsonify({'items': lots, 'next_cursor': next_cursor})
+
+# ----------------------------------------------------------------------------------------- > FETCH PRODUCTS NEAR THE EXPIRATION DATE
+@app.route('/pantry/expiring', methods=['GET'])
+def get_expiring_stock():
+    """
+    @brief Obtém os produtos da despensa cuja validade termina nos próximos dias.
+
+    @details Em vez de descarregar toda a despensa e comparar as datas no browser, este endpoint lê apenas os lotes
+    no intervalo de datas pedido (consulta indexada sobre a validade) e agrupa-os por produto, com o total
+    convertido para uma só unidade. Utiliza a função `getExpiringStock(days, include_expired)` do módulo
+    `pantrydb_queries`.
+
+    @param days (query string, opcional) Número de dias a partir de hoje (por omissão 3).
+    @param include_expired (query string, opcional) "false" para excluir os produtos já fora de validade.
+
+    @return JSON Retorna a lista de produtos, pela validade mais próxima.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/pantry/expiring?days=3"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {
+                "name": "leite",
+                "total_quantity": 1.5,
+                "unit": "l",
+                "expiration_date": "2024-05-02",
+                "days_left": 1,
+                "lots": [
+                    {"lot_id": 12, "quantity": 1.0, "unit": "l", "expiration_date": "2024-05-02"},
+                    {"lot_id": 15, "quantity": 500.0, "unit": "ml", "expiration_date": "2024-05-04"}
+                ]
+            }
+        ]
+    @endcode
+
+    @see pantrydb_queries.getExpiringStock(`days`, `include_expired`)
+    """
+    days = request.args.get('days', 3, type=int)
+    include_expired = request.args.get('include_expired', 'true').lower() != 'false'
+    expiring = pdb.getExpiringStock(max(0, days), include_expired)
+    if expiring is None:
+        return jsonify({'error': 'Failed to fetch expiring stock.'}), 500
+    return jsonify(expiring)
+
+# ----------------------------------------------------------------------------------------- > FETCH PANTRY AND SHOPPING LIST CHANGES
+@app.route('/pantry/changes', methods=['GET'])
+def get_pantry_changes():
+    """
+    @brief Obtém as alterações à despensa e à lista de compras desde uma versão.
+
+    @details Os clientes guardam a última versão aplicada e pedem apenas os eventos seguintes, em vez das listas
+    completas. Sem `since`, devolve só a versão atual (para começar a acompanhar o feed depois de carregar as listas).
+    Utiliza o feed `feed` do módulo `change_feed`.
+
+    @param since (query string, opcional) Última versão aplicada pelo cliente.
+    @param epoch (query string, opcional) `epoch` devolvido no pedido anterior.
+
+    @return JSON Retorna {epoch, version, events, resync}. Com `resync` a true o cliente tem de recarregar as listas
+    completas (a versão já não está no histórico ou o servidor foi reiniciado).
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/pantry/changes?epoch=3f9c1a2b7d4e&since=41"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "epoch": "3f9c1a2b7d4e",
+            "version": 43,
+            "resync": false,
+            "events": [
+                {"version": 42, "type": "lot_changed", "lot_id": 12, "name": "leite", "quantity": 0.5, "time": 1714557600.1},
+                {"version": 43, "type": "grocery_added", "name": "ovos", "time": 1714557601.4}
+            ]
+        }
+    @endcode
+
+    @see change_feed.ChangeFeed.since(`epoch`, `version`)
+    """
+    epoch, version, events = cf.feed.since(request.args.get('epoch'), request.args.get('since', type=int))
+    return jsonify({'epoch': epoch, 'version': version, 'events': events or [], 'resync': events is None})
+
+# ----------------------------------------------------------------------------------------- > STREAM PANTRY AND SHOPPING LIST CHANGES
+@app.route('/pantry/changes/stream', methods=['GET'])
+def stream_pantry_changes():
+    """
+    @brief Envia as alterações à despensa e à lista de compras em tempo real (Server-Sent Events).
+
+    @details Cada alteração chega como um evento SSE `change` com o identificador "epoch:versão"; ao voltar a ligar,
+    o browser envia esse identificador no cabeçalho `Last-Event-ID` e recebe só os eventos que perdeu.
+    Quando isso já não é possível, é enviado um evento `resync` e o cliente recarrega as listas completas.
+
+    @param since, epoch (query string, opcional) Versão a partir da qual enviar eventos, como em /pantry/changes.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -N "http://127.0.0.1:5000/pantry/changes/stream?epoch=3f9c1a2b7d4e&since=41"
+    \endverbatim
+
+    @retval text/event-stream Exemplo de mensagens enviadas:
+    @code
+        id: 3f9c1a2b7d4e:42
+        event: change
+        data: {"version": 42, "type": "lot_changed", "lot_id": 12, "name": "leite", "quantity": 0.5, ...}
+
+        : keepalive
+    @endcode
+
+    @see change_feed.ChangeFeed.wait(`epoch`, `version`)
+    """
+    epoch, version = cf.parse_event_id(request.headers.get('Last-Event-ID'))
+    if epoch is None:
+        epoch, version = request.args.get('epoch'), request.args.get('since', type=int)
+    if version is None:
+        epoch, version, _ = cf.feed.since(None, None)
+
+    def events():
+        current_epoch, current_version = epoch, version
+        while True:
+            new_epoch, new_version, changes = cf.feed.wait(current_epoch, current_version)
+            if changes is None:
+                data = json.dumps({'epoch': new_epoch, 'version': new_version})
+                yield f"id: {new_epoch}:{new_version}\nevent: resync\ndata: {data}\n\n"
+            elif not changes:
+                yield ": keepalive\n\n"
+            for change in changes or []:
+                yield f"id: {new_epoch}:{change['version']}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+            current_epoch, current_version = new_epoch, new_version
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ----------------------------------------------------------------------------------------- > SUGGEST RECIPES FROM THE PANTRY
+@app.route('/pantry/what-can-i-cook', methods=['GET'])
+def what_can_i_cook():
+    """
+    @brief Sugere receitas com o que existe na despensa.
+
+    @details Este endpoint ordena todas as receitas pela fração dos seus ingredientes que a despensa cobre
+    (com conversão de unidades), dando um bónus às receitas que usam ingredientes perto da validade.
+    Utiliza a função `suggest(limit, min_coverage)` do módulo `pantry_matcher`.
+
+    @param limit (query string, opcional) Número máximo de sugestões (por omissão 5).
+    @param min_coverage (query string, opcional) Cobertura mínima entre 0 e 1 (por omissão 0).
+
+    @return JSON Retorna a lista de sugestões, da melhor para a pior.
+
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET "http://127.0.0.1:5000/pantry/what-can-i-cook?limit=3&min_coverage=0.5"
+    \endverbatim
+
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        [
+            {
+                "recipe_id": 63,
+                "name": "Arroz de Pato",
+                "score": 1.125,
+                "coverage": 1.0,
+                "missing": [],
+                "expiring": ["pato"]
+            },
+            {
+                "recipe_id": 76,
+                "name": "Mousse de Chocolate Negro sem adição de açúcares",
+                "score": 0.833,
+                "coverage": 0.833,
+                "missing": [{"name": "chocolate negro", "quantity": "200.00", "unit": "g", "coverage": 0.5}],
+                "expiring": []
+            }
+        ]
+    @endcode
+
+    @see pantry_matcher.suggest(`limit`, `min_coverage`)
+    """
+    limit = request.args.get('limit', pm.DEFAULT_LIMIT, type=int)
+    min_coverage = request.args.get('min_coverage', 0.0, type=float)
+    try:
+        return jsonify(pm.suggest(max(1, limit), min_coverage))
+    except Exception as e:
+        return jsonify({'error': f'Failed to suggest recipes: {e}'}), 500
 
 # ----------------------------------------------------------------------------------------- > REMOVE ALL <GIVEN PRODUCT> FROM PANTRY
 @app.route('/pantry/remove-all-stock/<name>', methods=['DELETE'])
@@ -1060,6 +1870,99 @@ def insert_grocery():
     except Exception as e:
         return jsonify({'error': f'Failed to insert grocery item: {str(e)}'}), 500
 
+# ----------------------------------------------------------------------------------------- > ADD PRODUCTS INTO GROCERY LIST (BULK)
+@app.route('/pantry/insert-grocery/bulk', methods=['POST'])
+def insert_grocery_bulk():
+    """
+    @brief Acrescenta ou atualiza vários produtos na lista de compras num único pedido.
+    
+    @details Todos os produtos são gravados numa única transação com a função `insertGroceryBulk(items)` do módulo
+    `pantrydb_queries`. Cada produto pode ser só o nome ou um objeto com nome, quantidade e unidade; um produto que
+    já está na lista fica com a nova quantidade. O corpo do pedido pode ser a lista de produtos ou um objeto
+    {"items": [...]}.
+    
+    @return JSON Retorna o resultado de cada produto, pela ordem do pedido.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/pantry/insert-grocery/bulk \
+        -H "Content-Type: application/json" \
+        -d '{"items": ["azeite", {"name": "arroz", "quantity": "500", "unit": "g"}]}'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "saved": 2,
+            "results": [
+                {"name": "azeite", "quantity": null, "unit": null, "status": "added"},
+                {"name": "arroz", "quantity": 500.0, "unit": "g", "status": "updated"}
+            ]
+        }
+    @endcode
+    
+    @note Produtos sem nome ou com quantidade inválida aparecem com "status": "error" e não impedem os restantes.
+    Se nenhum produto for gravado, o endpoint retorna o status 400.
+    
+    @see pantrydb_queries.insertGroceryBulk(`items`)
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of items.'}), 400
+    
+    results = pdb.insertGroceryBulk(items)
+    saved = sum(1 for result in results if result['status'] != 'error')
+    return jsonify({'saved': saved, 'results': results}), 201 if saved else 400
+
+# ----------------------------------------------------------------------------------------- > ADD MISSING RECIPE INGREDIENTS INTO GROCERY LIST
+@app.route('/pantry/insert-grocery/recipe', methods=['POST'])
+def insert_grocery_recipe():
+    """
+    @brief Acrescenta à lista de compras os ingredientes de uma receita que faltam na despensa.
+    
+    @details Compara os ingredientes da receita com o stock dentro da validade e acrescenta à lista de compras a
+    quantidade em falta de cada um, com a função `addMissingIngredients(recipe_id, servings)` do módulo
+    `pantrydb_queries`. O campo opcional "servings" ajusta as quantidades ao número de porções pretendido.
+    
+    @return JSON Retorna os produtos acrescentados (ou atualizados) na lista de compras.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X POST http://127.0.0.1:5000/pantry/insert-grocery/recipe \
+        -H "Content-Type: application/json" \
+        -d '{"recipe_id": 12, "servings": 4}'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "recipe_id": 12,
+            "added": [
+                {"name": "farinha", "quantity": 150.0, "unit": "g"},
+                {"name": "ovos", "quantity": 2.0, "unit": "uni"}
+            ]
+        }
+    @endcode
+    
+    @note Se "recipe_id" estiver em falta ou "servings" for inválido, o endpoint retorna um erro com status 400.
+    
+    @see pantrydb_queries.addMissingIngredients(`recipe_id`, `servings`)
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        recipe_id = int(data['recipe_id'])
+        servings = int(data['servings']) if data.get('servings') is not None else None
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Expected an integer "recipe_id" and optional integer "servings".'}), 400
+    if servings is not None and servings < 1:
+        return jsonify({'error': '"servings" must be at least 1.'}), 400
+    
+    added = pdb.addMissingIngredients(recipe_id, servings)
+    if added is None:
+        return jsonify({'error': f'Failed to add the missing ingredients of recipe {recipe_id}.'}), 500
+    return jsonify({'recipe_id': recipe_id, 'added': added}), 200
+
 # ----------------------------------------------------------------------------------------- > REMOVE PRODUCT FROM GROCERY LIST
 @app.route('/pantry/remove-grocery', methods=['DELETE'])
 def remove_grocery():
@@ -1102,6 +2005,44 @@ def remove_grocery():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
  
+# ----------------------------------------------------------------------------------------- > REMOVE PRODUCTS FROM GROCERY LIST (BULK)
+@app.route('/pantry/remove-grocery/bulk', methods=['DELETE'])
+def remove_grocery_bulk():
+    """
+    @brief Remove vários produtos da lista de compras num único pedido.
+    
+    @details Os produtos são removidos com um único `DELETE` pela função `removeGroceryBulk(names)` do módulo
+    `pantrydb_queries`. O corpo do pedido pode ser a lista de nomes ou um objeto {"names": [...]}.
+    
+    @return JSON Retorna os produtos removidos e os que não estavam na lista de compras.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X DELETE http://127.0.0.1:5000/pantry/remove-grocery/bulk \
+        -H "Content-Type: application/json" \
+        -d '{"names": ["azeite", "arroz"]}'
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "removed": ["azeite"],
+            "not_found": ["arroz"]
+        }
+    @endcode
+    
+    @see pantrydb_queries.removeGroceryBulk(`names`)
+    """
+    data = request.get_json(silent=True)
+    names = data.get('names') if isinstance(data, dict) else data
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        return jsonify({'error': 'Expected a non-empty list of names.'}), 400
+    
+    result = pdb.removeGroceryBulk(names)
+    if result is None:
+        return jsonify({'error': 'Failed to remove the grocery items.'}), 500
+    return jsonify(result), 200
+
 # ----------------------------------------------------------------------------------------- > FETCH ALL GROCERY LIST
 @app.route('/pantry/shopping-list', methods=['GET'])
 def get_grocery_list():
@@ -1280,6 +2221,48 @@ def send_email():
         return jsonify({'error': result}), 500
     
 
+
+# ----------------------------------- > [ MONITORING -> ENDPOINTS]
+
+# ----------------------------------------------------------------------------------------- > DATABASE CONNECTION POOL METRICS
+@app.route('/db/pool-stats', methods=['GET'])
+def get_pool_stats():
+    """
+    @brief Obtém as métricas dos pools de conexões às bases de dados.
+    
+    @details Este endpoint devolve, para cada base de dados já utilizada pelo servidor, os contadores de empréstimos e devoluções
+    de conexões, conexões criadas e descartadas, falhas de verificação, esperas esgotadas e o número de conexões em uso.
+    
+    @return JSON Retorna um objeto com as métricas de cada pool.
+    
+    @par Exemplo de como utilizar este endpoint:
+    \verbatim
+        curl -X GET http://127.0.0.1:5000/db/pool-stats
+    \endverbatim
+    
+    @retval JSON Exemplo de uma resposta bem-sucedida:
+    @code
+        {
+            "recipe_database": {
+                "borrowed": 42,
+                "returned": 42,
+                "created": 3,
+                "discarded": 0,
+                "healthcheck_failures": 0,
+                "timeouts": 0,
+                "wait_seconds": 0.0031,
+                "size": 5,
+                "idle": 5,
+                "in_use": 0
+            }
+        }
+    @endcode
+    
+    @see db_pool.pool_stats()
+    """
+    return jsonify(db_pool.pool_stats())
+    
+
 if __name__ == '__main__':
     """
     @brief Função principal que inicia o servidor Flask.
@@ -1306,6 +2289,7 @@ if __name__ == '__main__':
     @endcode
     
     """
+    rc.refresh() # Load the recipe catalog before serving the first request
     app.run(debug=True, port=5000)
     
     
\ No newline at end of file
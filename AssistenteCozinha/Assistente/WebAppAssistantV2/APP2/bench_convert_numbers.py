@@ -0,0 +1,99 @@
+"""
+@brief Benchmark da conversão de números por extenso do módulo `convert_numbers_to_digit`.
+
+Compara o débito (frases por segundo) da implementação anterior de `extract_and_convert_numeric_phrases()`, que
+separava a frase por espaços e percorria o `numbers_dict` palavra a palavra, com a gramática compilada atual.
+
+@details As frases de teste são os exemplos do `nlu.yml` do Rasa (ver `bench_get_product.load_sentences()`) e uma
+lista de frases faladas (`SPOKEN`) com frações, decimais e dúzias. O script mostra:
+- o débito de cada implementação e a razão entre os dois;
+- as frases faladas convertidas pelas duas implementações, lado a lado;
+- o número de frases do `nlu.yml` com resultado diferente.
+
+@code
+    python bench_convert_numbers.py
+    python bench_convert_numbers.py --repeat 50
+@endcode
+"""
+import argparse
+import time
+
+import convert_numbers_to_digit as convert
+from bench_get_product import NLU_PATH, load_sentences
+
+## @var SPOKEN
+# @brief Frases faladas com as construções que a implementação anterior não reconhecia.
+SPOKEN = [
+    "adiciona dois e meio quilos de batatas",
+    "comprei meio quilo de arroz",
+    "usei um quarto de manteiga",
+    "adiciona 1,5 litros de leite",
+    "comprei uma dúzia de ovos",
+    "usei meia dúzia de ovos",
+    "adiciona dois quilos e meio de farinha",
+    "usei três quartos de litro de natas",
+    "adiciona quarenta e cinco gramas de açúcar",
+    "comprei sal e pimenta",
+]
+
+
+def legacy_convert(sentence):
+    # Previous extract_and_convert_numeric_phrases(), kept as the baseline (without the print on invalid words)
+    words = sentence.split()
+    converted_words = []
+    number_phrase = []
+    for word in words:
+        lower_word = word.lower()
+        if lower_word in convert.numbers_dict or lower_word == "e":
+            number_phrase.append(lower_word)
+        else:
+            if number_phrase:
+                converted_number = convert.convert_number_words_to_digits(number_phrase)
+                if converted_number is not None:
+                    converted_words.append(str(converted_number))
+                number_phrase = []
+            converted_words.append(convert.convert_units(word))
+    if number_phrase:
+        converted_number = convert.convert_number_words_to_digits(number_phrase)
+        if converted_number is not None:
+            converted_words.append(str(converted_number))
+    return ' '.join(converted_words)
+
+
+def throughput(function, sentences, repeat):
+    """
+    @brief Frases processadas por segundo por `function`.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for sentence in sentences:
+            function(sentence)
+    return len(sentences) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de convert_numbers_to_digit: anterior vs. gramática compilada.")
+    parser.add_argument("--nlu", default=NLU_PATH, help="ficheiro nlu.yml com as frases de teste")
+    parser.add_argument("--repeat", type=int, default=20, help="repetições do conjunto de frases")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.nlu) + SPOKEN
+    print(f"{len(sentences)} frases ({len(SPOKEN)} faladas), {args.repeat} repetições")
+
+    legacy = throughput(legacy_convert, sentences, args.repeat)
+    compiled = throughput(convert.extract_and_convert_numeric_phrases, sentences, args.repeat)
+    print(f"anterior   {legacy:12.0f} frases/s   {1e6 / legacy:6.2f} µs/frase")
+    print(f"gramática  {compiled:12.0f} frases/s   {1e6 / compiled:6.2f} µs/frase   ({compiled / legacy:.2f}x)")
+
+    print()
+    for sentence in SPOKEN:
+        print(f"{sentence!r}\n    anterior:  {legacy_convert(sentence)!r}"
+              f"\n    gramática: {convert.extract_and_convert_numeric_phrases(sentence)!r}")
+
+    different = [s for s in load_sentences(args.nlu) if legacy_convert(s) != convert.extract_and_convert_numeric_phrases(s)]
+    print(f"\nresultado diferente em {len(different)} frases do nlu.yml (a anterior convertia qualquer \"e\" "
+          "isolado em 0: \"sal e pimenta\" -> \"sal 0 pimenta\")")
+
+
+if __name__ == "__main__":
+    main()
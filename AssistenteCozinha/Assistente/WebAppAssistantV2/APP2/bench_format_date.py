@@ -0,0 +1,203 @@
+"""
+@brief Benchmark e corpus de propriedades da gramática de datas do módulo `format_date`.
+
+Compara o débito (frases por segundo) da implementação anterior de `parse_date()`, que tentava seis expressões
+regulares não compiladas em sequência, com a gramática compilada atual, com a cache vazia e com a cache cheia.
+
+@details O corpus de propriedades é gerado para um intervalo de dias de referência (`corpus()`); cada entrada é um
+triplo (frase, dia de referência, data esperada) construído a partir do calendário e não do código do módulo:
+- as formas absolutas de uma mesma data ("21/05/2030", "21/05 2030", "21 de maio de 2030", "2030-05-21", por extenso
+  "vinte e um de maio de dois mil e trinta") dão todas essa data;
+- "hoje", "amanhã" e "depois de amanhã" dão o dia de referência mais 0, 1 e 2 dias;
+- "daqui a N dias" e "daqui a N semanas", com N em dígitos ou por extenso, dão o dia de referência mais N dias/semanas;
+- "DD/MM" sem ano é a próxima ocorrência desse dia a partir do dia de referência (no ano seguinte se já passou);
+- "fim do mês" é o último dia do mês de referência e "dia N do próximo mês" é o dia N do mês seguinte;
+- "dia N" sozinho é o próximo dia N, no primeiro mês (a partir do de referência) que tenha esse dia;
+- datas que não existem ("31/02/2030", "30 de fevereiro de 2030", "31/04") e frações com unidade ("1/2 kg") são
+  recusadas.
+
+O script mostra o débito das duas implementações, as frases em que a anterior dava outra data (só nas formas que ela
+suportava) e as entradas do corpus que falham; termina com código 1 se alguma falhar.
+
+@code
+    python bench_format_date.py
+    python bench_format_date.py --days 730 --repeat 5
+@endcode
+"""
+import argparse
+import calendar
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import convert_numbers_to_digit as convert
+import format_date as fd
+
+## @var MONTHS
+# @brief Nome de cada mês (índice 1 a 12), como é dito.
+MONTHS = [None] + [name.lower() for name in sorted(fd.month_to_number, key=fd.month_to_number.get)]
+
+_WORDS = {}
+for _word, _value in convert.numbers_dict.items():
+    _WORDS.setdefault(_value, _word)
+
+
+def spell(number):
+    """
+    @brief Número inteiro por extenso (1 a 9999), a partir do `numbers_dict`: 2030 -> "dois mil e trinta".
+    """
+    parts = []
+    if number >= 1000:
+        parts.append("mil" if number < 2000 else _WORDS[number // 1000] + " mil")
+        number %= 1000
+    if number >= 100:
+        parts.append("cem" if number == 100 else "cento" if number < 200 else _WORDS[number // 100 * 100])
+        number %= 100
+    if number >= 20:
+        parts.append(_WORDS[number // 10 * 10])
+        number %= 10
+    if number:
+        parts.append(_WORDS[number])
+    return " e ".join(parts)
+
+
+def legacy_parse_date(date_string):
+    # Previous format_date.parse_date(), kept as the baseline (returns None for dates that do not exist)
+    patterns = {
+        r"(\d{1,2})/(\d{1,2})\s(\d{4})": "DD/MM YYYY",
+        r"(\d{1,2})/(\d{1,2})/(\d{4})": "DD/MM/YYYY",
+        r"(\d{1,2}) de (\w+) de (\d{4})": "DD de Month de YYYY",
+        r"(\d{1,2}) de (\w+)\s(\d{4})": "DD de Month de YYYY",
+        r"(\d{1,2})\s(\w+) de (\d{4})": "DD de Month de YYYY",
+        r"(\d{1,2})\s(\w+)\s(\d{4})": "DD de Month de YYYY"
+    }
+    try:
+        for pattern, date_format in patterns.items():
+            match = re.match(pattern, date_string.strip())
+            if match:
+                if date_format == "DD/MM/YYYY" or date_format == "DD/MM YYYY":
+                    day, month, year = match.groups()
+                    return datetime(int(year), int(month), int(day)).strftime('%Y-%m-%d')
+                elif date_format == "DD de Month de YYYY":
+                    day, month_name, year = match.groups()
+                    month = fd.month_to_number.get(month_name.capitalize(), None)
+                    if month:
+                        return datetime(int(year), month, int(day)).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+    return "Invalid date format"
+
+
+def absolute_phrases(day):
+    """
+    @brief Formas absolutas de uma data que a implementação anterior também suportava.
+    """
+    month = MONTHS[day.month]
+    return [f"{day.day}/{day.month:02d}/{day.year}", f"{day.day}/{day.month} {day.year}",
+            f"{day.day} de {month} de {day.year}", f"{day.day} {month.capitalize()} {day.year}"]
+
+
+def corpus(start, days):
+    """
+    @brief Corpus de propriedades para `days` dias de referência a partir de `start`.
+
+    @return <list> Triplos (frase, dia de referência, data ISO esperada ou `fd.INVALID_DATE`).
+    """
+    entries = []
+    for offset in range(days):
+        today = start + timedelta(days=offset)
+        last = calendar.monthrange(today.year, today.month)[1]
+        following = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+        for phrase in absolute_phrases(today) + [today.isoformat(),
+                                                 f"{spell(today.day)} de {MONTHS[today.month]} de {spell(today.year)}"]:
+            entries.append((phrase, today, today.isoformat()))
+
+        entries.append(("hoje", today, today.isoformat()))
+        entries.append(("amanhã", today, (today + timedelta(days=1)).isoformat()))
+        entries.append(("depois de amanhã", today, (today + timedelta(days=2)).isoformat()))
+        for count in (1, 2, 5, 10, 15, 21, 30, 45):
+            expected = (today + timedelta(days=count)).isoformat()
+            entries.append((f"daqui a {count} dias", today, expected))
+            entries.append((f"daqui a {spell(count)} dias", today, expected))
+        for count in (1, 2, 3):
+            entries.append((f"dentro de {spell(count)} semanas", today, (today + timedelta(weeks=count)).isoformat()))
+
+        for day in (today, today + timedelta(days=1), today + timedelta(days=40)):
+            entries.append((f"{day.day}/{day.month:02d}", today, day.isoformat()))
+        yesterday = today - timedelta(days=1)
+        if (yesterday.month, yesterday.day) != (2, 29):
+            entries.append((f"{yesterday.day}/{yesterday.month}", today,
+                            yesterday.replace(year=yesterday.year + 1).isoformat()))
+
+        entries.append(("fim do mês", today, today.replace(day=last).isoformat()))
+        for day in (1, 3, 15, 28):
+            entries.append((f"dia {day} do próximo mês", today, following.replace(day=day).isoformat()))
+            entries.append((f"dia {spell(day)} do mês que vem", today, following.replace(day=day).isoformat()))
+        for day in (today.day, 29, 30, 31):
+            year, month = today.year, today.month
+            if day < today.day:
+                year, month = year + month // 12, month % 12 + 1
+            while day > calendar.monthrange(year, month)[1]:
+                year, month = year + month // 12, month % 12 + 1
+            entries.append((f"dia {day}", today, date(year, month, day).isoformat()))
+
+    for year in (2030, 2031):
+        entries.append((f"31/02/{year}", start, fd.INVALID_DATE))
+        entries.append((f"30 de fevereiro de {year}", start, fd.INVALID_DATE))
+    for phrase in ("31/04", "1/2 kg de farinha", "3/4 de litro de leite"):
+        entries.append((phrase, start, fd.INVALID_DATE))
+    return entries
+
+
+def throughput(function, phrases, repeat):
+    """
+    @brief Frases processadas por segundo por `function`.
+    """
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        for phrase in phrases:
+            function(phrase)
+    return len(phrases) * repeat / (time.perf_counter() - begin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark e corpus de propriedades de format_date.")
+    parser.add_argument("--start", default="2030-01-01", help="primeiro dia de referência (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=366, help="número de dias de referência do corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições do conjunto de frases no benchmark")
+    args = parser.parse_args()
+    start = date.fromisoformat(args.start)
+
+    phrases = [phrase for offset in range(args.days) for phrase in absolute_phrases(start + timedelta(days=offset))]
+    print(f"{len(phrases)} datas absolutas, {args.repeat} repetições")
+
+    legacy = throughput(legacy_parse_date, phrases, args.repeat)
+
+    def cold(phrase):
+        fd.clear_cache()
+        return fd.parse_date(phrase, start)
+
+    compiled = throughput(cold, phrases, args.repeat)
+    fd.clear_cache()
+    throughput(lambda phrase: fd.parse_date(phrase, start), phrases, 1)
+    cached = throughput(lambda phrase: fd.parse_date(phrase, start), phrases, args.repeat)
+    print(f"anterior         {legacy:12.0f} frases/s   {1e6 / legacy:6.2f} µs/frase")
+    print(f"gramática        {compiled:12.0f} frases/s   {1e6 / compiled:6.2f} µs/frase   ({compiled / legacy:.2f}x)")
+    print(f"gramática+cache  {cached:12.0f} frases/s   {1e6 / cached:6.2f} µs/frase   ({cached / legacy:.2f}x)")
+
+    different = [phrase for phrase in phrases if legacy_parse_date(phrase) != fd.parse_date(phrase, start)]
+    print(f"resultado diferente da implementação anterior em {len(different)} frases")
+
+    entries = corpus(start, args.days)
+    failures = [(phrase, today, expected, fd.parse_date(phrase, today)) for phrase, today, expected in entries
+                if fd.parse_date(phrase, today) != expected]
+    print(f"\ncorpus de propriedades: {len(entries) - len(failures)}/{len(entries)} corretas")
+    for phrase, today, expected, result in failures[:20]:
+        print(f"    {phrase!r} ({today}): esperado {expected}, obtido {result}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
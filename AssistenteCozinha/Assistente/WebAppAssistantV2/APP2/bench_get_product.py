@@ -0,0 +1,138 @@
+"""
+@brief Benchmark da extração de ingredientes e unidades do módulo `get_product`.
+
+Compara o tempo por pedido da implementação anterior de `get_ingredient()`/`get_unit()` (que voltava a lematizar
+toda a `food_list` com o spaCy em cada chamada) com o `Gazetteer` compilado, usando como frases de teste os exemplos
+do `nlu.yml` do Rasa.
+
+@details O script:
+- lê os exemplos do `nlu.yml` e retira as anotações de entidades ("[2](quantidade)" -> "2");
+- mede a compilação do `Gazetteer` (feita uma só vez por processo);
+- mede, frase a frase, a implementação anterior e a nova, e mostra a média, a mediana e o percentil 95 em ms;
+- conta as frases em que as duas implementações devolvem o mesmo ingrediente e a mesma unidade.
+
+@code
+    python bench_get_product.py
+    python bench_get_product.py --limit 50 --repeat 3
+@endcode
+
+@note Precisa do spaCy e do modelo "pt_core_news_sm" instalados, tal como o `get_product`.
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+
+import get_product as gp
+import nlp_service as ns
+
+## @var NLU_PATH
+# @brief Caminho por omissão para os exemplos de treino do Rasa.
+NLU_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "nlu.yml")
+
+_EXAMPLE = re.compile(r"^\s*-\s+(.+?)\s*$")
+_ENTITY = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+
+
+def load_sentences(path=NLU_PATH):
+    """
+    @brief Lê os exemplos das intenções de um ficheiro `nlu.yml`, sem as anotações de entidades.
+
+    @return <list> Frases em minúsculas, pela ordem do ficheiro (os exemplos de `regex`, `lookup` e `synonym` ficam de fora).
+    """
+    sentences = []
+    in_intent = False
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            match = _EXAMPLE.match(line)
+            if not match:
+                continue
+            if line.startswith("- "):
+                in_intent = match.group(1).startswith("intent:")
+            elif in_intent:
+                sentences.append(_ENTITY.sub(r"\1", match.group(1)).lower())
+    return sentences
+
+
+def legacy_get_ingredient(sentence):
+    # Previous get_product.get_ingredient(), kept verbatim as the baseline
+    nlp = ns.get_nlp()
+    doc = nlp(sentence.lower())
+    lemmatized_list = {nlp(word)[0].lemma_ for word in gp.food_list}
+    original_list = set(gp.food_list)
+    for unit in [unit for unit in gp.food_list if ' ' in unit]:
+        if unit in sentence:
+            return unit
+    for token in doc:
+        if token.lemma_ in lemmatized_list or token.text in original_list:
+            return token.text
+    return None
+
+
+def legacy_get_unit(sentence):
+    # Previous get_product.get_unit(), kept verbatim as the baseline
+    words = sentence.lower().split()
+    for unit in [unit for unit in gp.unit_list if ' ' in unit]:
+        if unit in sentence:
+            return unit
+    for word in words:
+        if word in [unit for unit in gp.unit_list if ' ' not in unit]:
+            return word
+    return None
+
+
+def measure(function, sentences, repeat):
+    """
+    @brief Tempo de cada chamada de `function` (em ms), para todas as frases, `repeat` vezes.
+    """
+    timings = []
+    for _ in range(repeat):
+        for sentence in sentences:
+            start = time.perf_counter()
+            function(sentence)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    """
+    @brief Mostra a média, a mediana e o percentil 95 de uma lista de tempos.
+    """
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    print(f"{name:<10} mean {statistics.mean(timings):9.3f} ms   "
+          f"median {statistics.median(timings):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de get_product: implementação anterior vs. Gazetteer.")
+    parser.add_argument("--nlu", default=NLU_PATH, help="ficheiro nlu.yml com as frases de teste")
+    parser.add_argument("--limit", type=int, default=100, help="número máximo de frases (a anterior é lenta)")
+    parser.add_argument("--repeat", type=int, default=1, help="repetições de cada frase")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.nlu)[:args.limit]
+    print(f"{len(sentences)} frases de {args.nlu}")
+
+    start = time.perf_counter()
+    ns.get_nlp()
+    print(f"carregamento do modelo spaCy: {(time.perf_counter() - start) * 1000:.1f} ms ({ns.MODEL}, {ns.pipe_names()})")
+
+    start = time.perf_counter()
+    gp.get_gazetteer()
+    print(f"compilação do Gazetteer: {(time.perf_counter() - start) * 1000:.1f} ms (uma vez por processo)")
+
+    legacy = measure(lambda s: (legacy_get_ingredient(s), legacy_get_unit(s)), sentences, args.repeat)
+    compiled = measure(lambda s: (gp.get_ingredient(s), gp.get_unit(s)), sentences, args.repeat)
+    report("anterior", legacy)
+    report("gazetteer", compiled)
+    print(f"speedup (média): {statistics.mean(legacy) / statistics.mean(compiled):.0f}x")
+
+    same = sum(1 for s in sentences
+               if (legacy_get_ingredient(s), legacy_get_unit(s)) == (gp.get_ingredient(s), gp.get_unit(s)))
+    print(f"mesmo resultado em {same}/{len(sentences)} frases "
+          "(as diferenças vêm sobretudo de plurais e sinónimos de unidades que a versão anterior não reconhecia)")
+
+
+if __name__ == "__main__":
+    main()
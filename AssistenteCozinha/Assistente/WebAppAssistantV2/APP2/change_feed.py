@@ -0,0 +1,117 @@
+"""
+@brief Módulo do feed de alterações da despensa e da lista de compras.
+
+Em vez de os clientes voltarem a pedir a despensa e a lista de compras inteiras depois de cada alteração, o backend
+publica eventos incrementais com uma versão sempre crescente. Um cliente guarda a última versão que aplicou e pede
+(ou recebe por Server-Sent Events) apenas os eventos seguintes, mesmo depois de perder a ligação.
+
+@details Eventos publicados pelo `pantrydb_queries` (campo `type`):
+- `lot_added`: {lot_id, name, quantity, unit, expiration_date}
+- `lot_changed`: {lot_id, name, quantity}
+- `lot_removed`: {lot_id, name}
+- `item_emptied`: {name} - todos os lotes de um item foram removidos
+- `stock_cleared`: {} - a despensa foi limpa
+- `grocery_added`: {name, quantity, unit} - item acrescentado ou com a quantidade atualizada
+- `grocery_removed`: {name}
+- `grocery_cleared`: {} - a lista de compras foi limpa
+
+Cada evento recebe também `version`. O feed guarda os últimos `HISTORY_SIZE` eventos em memória; um cliente cuja
+versão já não está no histórico, ou que vem de outra execução do servidor (`epoch` diferente), recebe um pedido de
+`resync` e volta a carregar as listas completas uma vez.
+
+@code
+    import change_feed as cf
+    epoch, version, events = cf.feed.since(None)
+    # ... o cliente carrega as listas completas ...
+    epoch, version, events = cf.feed.wait(epoch, version, timeout=15)
+    for event in events or []:
+        print(event['version'], event['type'], event.get('name'))
+@endcode
+"""
+import threading
+import time
+import uuid
+from collections import deque
+
+import pantrydb_queries as pdb
+
+## @var HISTORY_SIZE
+# @brief Número de eventos mantidos em memória para os clientes que retomam a partir de uma versão.
+HISTORY_SIZE = 1000
+
+## @var HEARTBEAT_SECONDS
+# @brief Intervalo máximo sem mensagens numa ligação SSE (o cliente recebe um comentário para manter a ligação).
+HEARTBEAT_SECONDS = 15
+
+
+class ChangeFeed:
+    """
+    @brief Histórico em memória dos eventos de alteração, com versão sempre crescente.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._events = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+
+    def publish(self, events):
+        """
+        @brief Acrescenta eventos ao feed e acorda os clientes à espera.
+
+        @param events Lista de dicionários com pelo menos a chave 'type'.
+
+        @return <int> Versão do último evento publicado.
+        """
+        with self._condition:
+            for event in events:
+                self.version += 1
+                self._events.append(dict(event, version=self.version, time=time.time()))
+            self._condition.notify_all()
+            return self.version
+
+    def _since(self, epoch, version):
+        if version is None:
+            return self.epoch, self.version, []
+        oldest = self._events[0]['version'] if self._events else self.version + 1
+        if epoch != self.epoch or version > self.version or version < oldest - 1:
+            return self.epoch, self.version, None
+        return self.epoch, self.version, [e for e in self._events if e['version'] > version]
+
+    def since(self, epoch, version):
+        """
+        @brief Eventos publicados depois de uma versão.
+
+        @param epoch Identificador da execução do servidor que o cliente conhece.
+        @param version Última versão aplicada pelo cliente; None para obter só a versão atual.
+
+        @return <tuplo> (epoch, versão atual, eventos). Os eventos são None quando o cliente tem de recarregar as
+        listas completas (versão fora do histórico ou servidor reiniciado).
+        """
+        with self._condition:
+            return self._since(epoch, version)
+
+    def wait(self, epoch, version, timeout=HEARTBEAT_SECONDS):
+        """
+        @brief Como `since()`, mas espera até `timeout` segundos por eventos novos.
+        """
+        with self._condition:
+            if epoch == self.epoch and version is not None:
+                self._condition.wait_for(lambda: self.version != version, timeout)
+            return self._since(epoch, version)
+
+
+## @var feed
+# @brief Feed partilhado pelo processo, alimentado pelos eventos do `pantrydb_queries`.
+feed = ChangeFeed()
+pdb.addEventListener(feed.publish)
+
+
+def parse_event_id(value):
+    """
+    @brief Lê um identificador "epoch:versão" (por exemplo o cabeçalho SSE `Last-Event-ID`).
+
+    @return <tuplo> (epoch, versão), ou (None, None) se o valor for inválido.
+    """
+    epoch, _, version = (value or "").partition(":")
+    return (epoch, int(version)) if epoch and version.isdigit() else (None, None)
@@ -7,18 +7,42 @@ Este processo facilita outras tarefas de processamento de texto que dependam de
 @details As funções principais deste módulo lidam com a conversão de palavras para números e de unidades completas para as suas abreviações. 
 Os dicionários `numbers_dict` e `uni_dict` contêm as correspondências usadas nas conversões.
 
+A frase é lida uma única vez por uma gramática compilada (`_GRAMMAR`, uma só expressão regular com todos os números,
+frações, dúzias e unidades numa árvore de prefixos, mais a tabela `_WORD_KINDS` com o tipo de cada palavra) e um
+pequeno autómato (`parse()`) junta os tokens em quantidades com a respetiva unidade. Além dos números inteiros por extenso, são reconhecidos:
+- decimais com vírgula ou ponto: "1,5 litros" -> 1.5 l;
+- frações: "meio quilo" -> 0.5 kg, "um quarto" -> 0.25, "três quartos de litro" -> 0.75 l, "1/2" -> 0.5;
+- meios acrescentados: "dois e meio" -> 2.5, "dois quilos e meio" -> 2.5 kg;
+- dúzias: "uma dúzia" -> 12, "meia dúzia" -> 6.
+
+@code
+    import convert_numbers_to_digit as convert
+    print(convert.extract_and_convert_numeric_phrases("Adiciona dois quilos e meio de batatas"))
+    //Output:
+    Adiciona 2.5 kg de batatas
+
+    for quantity in convert.parse_quantities("uma dúzia de ovos e meio litro de leite"):
+        print(quantity['value'], quantity['unit'], quantity['text'])
+    //Output:
+    12 None uma dúzia
+    0.5 l meio litro
+@endcode
+
 @note Este módulo pode ser utilizado em conjunto com outros módulos ou scripts que envolvam processamento de texto em Português,
 para facilitar a manipulação de números e unidades de medida em diferentes contextos.
+
+@see bench_convert_numbers.py para comparar o débito com a implementação anterior.
 """
 import re
 import sys
+from fractions import Fraction
 # working with numbers in Portuguese based on a exercicie made in the course "Compiladores"
 
 def convert_number_words_to_digits(words):
     """
     @brief Converte uma lista de palavras que representam números por extenso em Português para um valor numérico inteiro.
     @details Esta função itera sobre cada palavra na lista, somando os valores conforme necessário para construir o número final. A função ignora a palavra 'e'. 
-    Se uma palavra inválida for encontrada, a função imprime uma mensagem de erro e retorna None.
+    Se uma palavra inválida for encontrada, a função retorna None.
     
     @param words Lista de strings, onde cada string é uma palavra representando um número ou a conjunção 'e'.
     
@@ -39,7 +63,6 @@ def convert_number_words_to_digits(words):
             else:
                 temp_number += number
         else:
-            print(f"Palavra inválida: {word}")
             return None
     return result + temp_number
 
@@ -60,35 +83,153 @@ def convert_units(word):
 def extract_and_convert_numeric_phrases(sentence):
     """
     @brief Extrai frases numéricas de uma frase e converte as palavras numéricas e unidades de medida para seus respectivos valores numéricos e abreviações.
-    @details Esta função divide a frase em palavras e processa-as individualmente. 
-    As palavras reconhecidas como parte de uma frase numérica são acumuladas e convertidas num conjunto.
+    @details A frase é analisada uma única vez por `parse()`: cada quantidade é substituída pelo seu valor em dígitos (com ponto decimal)
+    seguido da abreviação da unidade, e as restantes unidades são abreviadas. O resto do texto, incluindo os espaços e a pontuação, fica igual.
     
     @param sentence Uma string com a frase em Português.
     
     @return Uma string com os números e unidades de medida convertidos.
     """
-    words = sentence.split()
-    converted_words = []
-    number_phrase = []
-    for word in words:
-        lower_word = word.lower()
-        if lower_word in numbers_dict or lower_word == "e":
-            number_phrase.append(lower_word)
+    tokens = parse(sentence)
+    if not tokens:
+        return sentence
+    parts = []
+    position = 0
+    for token in tokens:
+        if token['type'] == 'quantity':
+            if token['unit'] is None and token['text'].isdigit():
+                continue  # already in digits ("21/05/2030" keeps its zeros)
+            text = format_number(token['value'])
+            if token['unit']:
+                text += " " + token['unit']
+        elif token['type'] == 'unit':
+            text = token['unit']
         else:
-            if number_phrase:
-                converted_number = convert_number_words_to_digits(number_phrase)
-                if converted_number is not None:
-                    converted_words.append(str(converted_number))
-                number_phrase = []
-            converted_words.append(convert_units(word))
-    
-    # Check if sentence ends with a number phrase
-    if number_phrase:
-        converted_number = convert_number_words_to_digits(number_phrase)
-        if converted_number is not None:
-            converted_words.append(str(converted_number))
-    
-    return ' '.join(converted_words)
+            continue
+        parts.append(sentence[position:token['start']])
+        parts.append(text)
+        position = token['end']
+    parts.append(sentence[position:])
+    return ''.join(parts)
+
+
+def format_number(value):
+    """
+    @brief Escreve um número com ponto decimal e no máximo três casas decimais ("2.5", "0.333", "12").
+    """
+    if value == int(value):
+        return str(int(value))
+    return f"{float(value):.3f}".rstrip("0").rstrip(".")
+
+
+def _number(value):
+    # int or Fraction -> int when whole, float otherwise
+    return int(value) if value.denominator == 1 else float(value)
+
+
+def _follows(sentence, tokens, j, kinds, gap=""):
+    # tokens[j] is one of `kinds` and only whitespace (or the word `gap`) separates it from tokens[j - 1]
+    if j >= len(tokens) or tokens[j][0] not in kinds:
+        return False
+    between = sentence[tokens[j - 1][3]:tokens[j][2]]
+    return not between.strip() or (gap and between.strip().lower() == gap and between[0].isspace())
+
+
+def _read_count(sentence, tokens, i):
+    # A bare count at tokens[i]: digits, a fraction in digits, a run of number words or "meio"/"meia" before a unit
+    kind, text = tokens[i][0], tokens[i][1].lower()
+    if kind == 'decimal':
+        return Fraction(text.replace(",", ".")), i + 1
+    if kind == 'ratio':
+        numerator, denominator = text.split("/")
+        return Fraction(int(numerator), int(denominator)), i + 1
+    if kind == 'integer':
+        return int(text), i + 1
+    if kind == 'number':
+        words, j = [text], i + 1
+        while True:
+            if _follows(sentence, tokens, j, ('number',)):
+                words.append(tokens[j][1].lower())
+                j += 1
+            elif _follows(sentence, tokens, j, ('conj',)) and _follows(sentence, tokens, j + 1, ('number',)):
+                j += 1
+            else:
+                break
+        return convert_number_words_to_digits(words), j
+    if kind == 'fraction' and text in HALVES and _follows(sentence, tokens, i + 1, ('unit', 'group')):
+        return Fraction(1, 2), i + 1
+    return None, i
+
+
+def _plus_half(sentence, tokens, j):
+    # "e meio" / "e meia" after a count or a unit
+    return (_follows(sentence, tokens, j, ('conj',)) and _follows(sentence, tokens, j + 1, ('fraction',))
+            and tokens[j + 1][1].lower() in HALVES)
+
+
+def parse(sentence):
+    """
+    @brief Analisa uma frase numa só passagem e devolve as quantidades e as unidades, já com tipo.
+
+    @param sentence Uma string com a frase em Português.
+
+    @return <list> Dicionários com 'type', 'text', 'start' e 'end' (posições na frase), pela ordem da frase:
+    - 'quantity': uma quantidade, com 'value' (int ou float) e 'unit' (abreviação ou None);
+    - 'unit': uma unidade sem quantidade antes, com 'unit' (abreviação).
+    """
+    tokens = _tokenize(sentence or "")
+    if not tokens:
+        return []
+    result = []
+    i = 0
+    while i < len(tokens):
+        value, j = _read_count(sentence, tokens, i)
+        if value is None:
+            kind, text, start, end = tokens[i]
+            if kind == 'unit':
+                result.append({'type': 'unit', 'unit': convert_units(" ".join(text.lower().split())),
+                               'text': text, 'start': start, 'end': end})
+            i += 1
+            continue
+        halved, fraction = False, tokens[i][0] == 'ratio'
+        # "um quarto", "três quartos", "dois terços"
+        if tokens[i][0] in ('number', 'integer') and _follows(sentence, tokens, j, ('fraction',)) \
+                and tokens[j][1].lower() not in HALVES:
+            value *= fractions_dict[tokens[j][1].lower()]
+            fraction = True
+            j += 1
+        # "dois e meio"
+        if _plus_half(sentence, tokens, j):
+            value += Fraction(1, 2)
+            halved = True
+            j += 2
+        # "uma dúzia", "meia dúzia", "2 dúzias"
+        if _follows(sentence, tokens, j, ('group',)):
+            value *= groups_dict[tokens[j][1].lower()]
+            j += 1
+        unit = None
+        # "três quartos de litro"
+        if _follows(sentence, tokens, j, ('unit',), gap="de" if fraction else ""):
+            unit = convert_units(" ".join(tokens[j][1].lower().split()))
+            j += 1
+            # "dois quilos e meio"
+            if not halved and _plus_half(sentence, tokens, j):
+                value += Fraction(1, 2)
+                j += 2
+        start, end = tokens[i][2], tokens[j - 1][3]
+        result.append({'type': 'quantity', 'value': _number(value), 'unit': unit,
+                       'text': sentence[start:end], 'start': start, 'end': end})
+        i = j
+    return result
+
+
+def parse_quantities(sentence):
+    """
+    @brief Quantidades de uma frase (as entradas 'quantity' de `parse()`).
+
+    @return <list> Dicionários {'type', 'value', 'unit', 'text', 'start', 'end'}.
+    """
+    return [token for token in parse(sentence) if token['type'] == 'quantity']
 
 
 ## @var numbers_dict
@@ -134,9 +275,97 @@ uni_dict = {
     "unidades" : "uni", "latas" : "lata", "pacotes" : "pacote", "tabletes" : "tablete",
     "dentes" : "dente", "folhas" : "folha", "ramos" : "ramo", "talos" : "talo",
     "copos" : "copo", "garrafas" : "garrafa", "capsulas" : "capsula", "saquetas" : "saqueta",
-    "colheres de sopa" : "colher de sopa", "colheres de chá" : "colher de chá"
+    "colheres de sopa" : "colher de sopa", "colheres de chá" : "colher de chá",
+    "litro" : "l", "mililitro" : "ml", "centilitro" : "cl", "decilitro" : "dl",
+    "grama" : "g", "quilograma" : "kg", "quilo" : "kg", "kilo" : "kg", "kilos" : "kg", "miligrama" : "mg",
+    "unidade" : "uni", "cápsulas" : "cápsula"
+}
+
+## @var fractions_dict
+#  @brief Dicionário que mapeia as palavras de frações para o seu valor ("meio quilo", "um quarto", "dois terços").
+fractions_dict = {
+    "meio": Fraction(1, 2), "meia": Fraction(1, 2),
+    "terço": Fraction(1, 3), "terços": Fraction(1, 3), "terco": Fraction(1, 3), "tercos": Fraction(1, 3),
+    "quarto": Fraction(1, 4), "quartos": Fraction(1, 4)
 }
 
+## @var HALVES
+#  @brief Frações que valem meio, as únicas que podem ser acrescentadas com "e" ("dois e meio") ou aparecer sem número antes ("meio quilo").
+HALVES = frozenset(("meio", "meia"))
+
+## @var groups_dict
+#  @brief Dicionário que mapeia as palavras de grupos para o número de unidades ("uma dúzia" -> 12).
+groups_dict = {
+    "dúzia": 12, "dúzias": 12, "duzia": 12, "duzias": 12, "dezena": 10, "dezenas": 10
+}
+
+
+## @var _WORD_KINDS
+#  @brief Tipo de cada palavra conhecida (number, unit, fraction, group ou conj); as restantes são 'word'.
+_WORD_KINDS = dict(
+    [(word, 'unit') for word in set(uni_dict) | set(uni_dict.values()) if ' ' not in word]
+    + [(word, 'number') for word in numbers_dict]
+    + [(word, 'fraction') for word in fractions_dict]
+    + [(word, 'group') for word in groups_dict]
+    + [('e', 'conj')]
+)
+
+def _trie(words):
+    # Regex of a prefix tree of the words ("d(?:ois|uas|ez)"), so the engine never tries the words one by one
+    tree = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        optional = '' in node
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+    return tree, build
+
+
+def _grammar_pattern():
+    words = set(_WORD_KINDS) | {unit for unit in set(uni_dict) | set(uni_dict.values()) if ' ' in unit}
+    tree, build = _trie(words)
+    # Every top-level branch starts with a literal character, which lets the regex engine skip straight to the
+    # characters that can start a token; the word boundaries are checked after that first character
+    branches = [digit + r"(?:\d*[.,]\d+|/[2-9](?![/\d]|\s+\d{4})|\d*)" for digit in "0123456789"]
+    for char, child in sorted(tree.items()):
+        branches.append(re.escape(char) + r"(?<![^\W\d_]" + re.escape(char) + ")" + build(child) + r"(?![^\W\d_])")
+    return "|".join(branches).replace(r"\ ", r"\s+")
+
+
+## @var _GRAMMAR
+#  @brief Expressão regular compilada que lê a frase (em minúsculas) numa só passagem, usada por `parse()`.
+#  @details Só encontra os tokens que interessam: números em dígitos ("3", "1,5", "1/2") e as palavras de
+#  `_WORD_KINDS` ou unidades com várias palavras, compiladas numa árvore de prefixos. O tipo de cada token é depois
+#  lido em `_WORD_KINDS` (ou na forma dos dígitos). As frações em dígitos não podem fazer parte de uma data
+#  ("1/5/2030", "1/5 2030").
+_GRAMMAR = re.compile(_grammar_pattern())
+
+
+def _tokenize(sentence):
+    lowered = sentence.lower()
+    if len(lowered) != len(sentence):  # rare characters whose lower case is longer; keep the offsets right
+        lowered = sentence
+    first = _GRAMMAR.search(lowered)
+    if first is None:  # most sentences have no number or unit at all
+        return []
+    tokens = []
+    for match in _GRAMMAR.finditer(lowered, first.start()):
+        text = match.group()
+        start, end = match.span()
+        if text[0].isdigit():
+            kind = 'ratio' if '/' in text else 'decimal' if ',' in text or '.' in text else 'integer'
+        else:
+            kind = _WORD_KINDS.get(text, 'unit')  # multi-word units are not in the table
+        tokens.append((kind, sentence[start:end], start, end))
+    return tokens
+
 def main(argv):
     """
     @brief Função principal que processa a linha de comando para converter frases.
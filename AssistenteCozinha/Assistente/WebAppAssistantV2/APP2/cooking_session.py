@@ -0,0 +1,265 @@
+"""
+@brief Módulo de sessões de confeção: cursor de passos por utilizador sobre as instruções de uma receita.
+
+Quando uma receita é selecionada, todas as linhas de `recipe_instructions` (e os utensílios de cada passo,
+de `instructions_tools`) são lidas numa única consulta e guardadas em memória. A partir daí "próximo passo",
+"passo anterior" e "repete" são apenas leituras num tuplo, sem consultas à base de dados.
+
+@details As sessões vivem no processo do servidor Flask (`app.py`) e são identificadas pelo `sender` do Rasa: a interface
+(`recipeSessionId`) e o servidor de ações do Rasa (`actions/actions.py`, com `tracker.sender_id`) navegam nelas através
+de `/cooking-session/<session_id>/<action>` com a mesma chave, pelo que partilham o mesmo cursor:
+- `get_steps(recipe_id)`: instruções de uma receita, em cache por receita.
+- `get_steps_many(recipe_ids)`: instruções de várias receitas, com uma só consulta para as que faltam na cache.
+- `CookingSession`: cursor sobre os passos de uma receita.
+- `start_session(session_id, recipe_id)` / `get_session(session_id)`: sessões ativas por utilizador/sessão.
+
+@code
+    import cooking_session as cs
+    session = cs.start_session("USER1", 62)
+    print(session.next())     # passo 1
+    print(session.next())     # passo 2
+    print(session.repeat())   # passo 2 outra vez
+    print(session.previous()) # passo 1
+@endcode
+
+@note As instruções só mudam com a ingestão de receitas; `clear_cache()` descarta as instruções em cache.
+"""
+import threading
+from collections import OrderedDict
+
+from mysql.connector import Error
+
+import recipedb_queries as db
+
+## @var MAX_SESSIONS
+# @brief Número máximo de sessões de confeção guardadas; as menos usadas recentemente são esquecidas.
+MAX_SESSIONS = 1000
+
+
+class RecipeSteps:
+    """
+    @brief Instruções de uma receita carregadas de uma só vez.
+    @details `steps` é um tuplo de dicionários {'step', 'description', 'tools'} ordenado pelo número do passo;
+    `by_number` indexa os mesmos passos pelo número do passo.
+    """
+
+    def __init__(self, recipe_id, steps):
+        self.recipe_id = recipe_id
+        self.steps = tuple(steps)
+        self.by_number = {step['step']: step for step in self.steps}
+
+    def description(self, step_number):
+        """
+        @brief Descrição do passo com o número indicado, ou None se não existir.
+        """
+        step = self.by_number.get(step_number)
+        return step['description'] if step else None
+
+
+_steps_cache = {}
+_steps_lock = threading.Lock()
+
+
+def _load_steps(recipe_ids):
+    """
+    @brief Lê as instruções (e os utensílios de cada passo) de várias receitas numa única consulta.
+
+    @return <dict> recipe_id -> `RecipeSteps`, com uma entrada para cada ID pedido.
+    """
+    conn = db.create_connection()
+    if conn is None:
+        raise Error("Failed to connect to recipe_database")
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    query = f"""
+    SELECT ri.recipe_id, ri.step_number, ri.description, t.name
+    FROM recipe_instructions ri
+    LEFT JOIN instructions_tools it ON it.recipe_instruction_id = ri.recipe_instruction_id
+    LEFT JOIN tools t ON t.tool_id = it.tool_id
+    WHERE ri.recipe_id IN ({placeholders})
+    ORDER BY ri.recipe_id, ri.step_number
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, tuple(recipe_ids))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    steps = {recipe_id: OrderedDict() for recipe_id in recipe_ids}
+    for recipe_id, step_number, description, tool_name in rows:
+        recipe = steps.setdefault(recipe_id, OrderedDict())
+        step = recipe.get(step_number)
+        if step is None:
+            step = recipe[step_number] = {'step': step_number, 'description': description, 'tools': []}
+        if tool_name is not None:
+            step['tools'].append(tool_name)
+    return {recipe_id: RecipeSteps(recipe_id, recipe.values()) for recipe_id, recipe in steps.items()}
+
+
+def get_steps(recipe_id):
+    """
+    @brief Obtém as instruções de uma receita, carregando-as da base de dados apenas na primeira vez.
+
+    @param recipe_id ID da receita.
+
+    @return <RecipeSteps> Instruções da receita, ou None se a base de dados não estiver disponível.
+    """
+    steps = get_steps_many([recipe_id])
+    return steps.get(recipe_id) if steps is not None else None
+
+
+def get_steps_many(recipe_ids):
+    """
+    @brief Obtém as instruções de várias receitas; as que não estão em cache são lidas numa única consulta.
+
+    @param recipe_ids Lista de IDs de receitas.
+
+    @return <dict> recipe_id -> `RecipeSteps`, ou None se a base de dados não estiver disponível.
+    """
+    found = {}
+    missing = []
+    for recipe_id in recipe_ids:
+        steps = _steps_cache.get(recipe_id)
+        if steps is not None:
+            found[recipe_id] = steps
+        elif recipe_id not in missing:
+            missing.append(recipe_id)
+    if not missing:
+        return found
+    try:
+        loaded = _load_steps(missing)
+    except Error as e:
+        print(f"Erro ao carregar as instruções das receitas {missing}: {e}")
+        return None
+    with _steps_lock:
+        for recipe_id, steps in loaded.items():
+            # Recipes without steps are not cached, they may still be mid-ingestion
+            if steps.steps:
+                _steps_cache[recipe_id] = steps
+    found.update(loaded)
+    return found
+
+
+def clear_cache():
+    """
+    @brief Descarta as instruções em cache (por exemplo, depois de uma ingestão de receitas).
+    """
+    with _steps_lock:
+        _steps_cache.clear()
+
+
+class CookingSession:
+    """
+    @brief Cursor sobre os passos de uma receita.
+    @details `position` vale 0 antes do primeiro passo e n quando o passo n-ésimo do tuplo é o atual.
+    Todas as operações são O(1) e devolvem o passo atual como dicionário (ou None quando não há passo para mostrar).
+    """
+
+    def __init__(self, recipe_steps):
+        self.recipe_id = recipe_steps.recipe_id
+        self.steps = recipe_steps.steps
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        """
+        @brief Passo atual, ou None se a receita ainda não começou.
+        """
+        if self.position == 0:
+            return None
+        return self.steps[self.position - 1]
+
+    def next(self):
+        """
+        @brief Avança para o próximo passo. No último passo, mantém o cursor e devolve None.
+        """
+        with self.lock:
+            if self.position >= len(self.steps):
+                return None
+            self.position += 1
+            return self.current()
+
+    def previous(self):
+        """
+        @brief Recua para o passo anterior. No primeiro passo, mantém o cursor e devolve None.
+        """
+        with self.lock:
+            if self.position <= 1:
+                return None
+            self.position -= 1
+            return self.current()
+
+    def repeat(self):
+        """
+        @brief Repete o passo atual; se a receita ainda não começou, devolve o primeiro passo.
+        """
+        if self.position == 0:
+            return self.next()
+        return self.current()
+
+    def state(self, step=None):
+        """
+        @brief Estado da sessão para respostas JSON.
+
+        @param step Passo a reportar (por omissão, o passo atual).
+
+        @return <dict> ID da receita, número total de passos, posição do cursor e o passo.
+        """
+        return {
+            'recipe_id': self.recipe_id,
+            'total_steps': len(self.steps),
+            'position': self.position,
+            'step': step if step is not None else self.current(),
+        }
+
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def start_session(session_id, recipe_id):
+    """
+    @brief Inicia (ou reinicia) a sessão de confeção de um utilizador para uma receita.
+
+    @param session_id Identificador da sessão (utilizador do IM, sender_id do Rasa, ...).
+    @param recipe_id ID da receita selecionada.
+
+    @return <CookingSession> A nova sessão, ou None se as instruções não puderem ser carregadas.
+    """
+    recipe_steps = get_steps(recipe_id)
+    if recipe_steps is None:
+        return None
+    session = CookingSession(recipe_steps)
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+        _sessions[session_id] = session
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session
+
+
+def get_session(session_id, recipe_id=None):
+    """
+    @brief Obtém a sessão de confeção ativa.
+
+    @param session_id Identificador da sessão.
+    @param recipe_id Se indicado e diferente da receita da sessão ativa, é iniciada uma sessão nova para esta receita.
+
+    @return <CookingSession> A sessão, ou None se não existir (e não tiver sido indicado recipe_id).
+    """
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is not None:
+            _sessions.move_to_end(session_id)
+    if recipe_id is not None and (session is None or session.recipe_id != recipe_id):
+        return start_session(session_id, recipe_id)
+    return session
+
+
+def end_session(session_id):
+    """
+    @brief Termina a sessão de confeção de um utilizador.
+    """
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
@@ -0,0 +1,251 @@
+"""
+@brief Módulo com o pool de conexões MySQL partilhado pelas bases de dados de receitas e da despensa.
+
+Em vez de abrir uma conexão nova (TCP + autenticação) em cada função de consulta, os módulos
+`recipedb_queries`, `pantrydb_queries`, a cópia usada pelas ações do Rasa e os scripts de ingestão
+pedem uma conexão a este pool e devolvem-na no fim com `conn.close()`.
+
+@details O pool é criado de forma preguiçosa, um por base de dados, na primeira vez que é pedido.
+Cada conexão emprestada é um `PooledConnection`, que se comporta como uma conexão normal do
+`mysql.connector` mas cujo `close()` devolve a conexão ao pool em vez de a fechar.
+
+- Tamanho do pool, tempo máximo de espera e intervalo de verificação são configuráveis por variáveis de ambiente.
+- Conexões inativas há mais de `DB_POOL_HEALTHCHECK_INTERVAL` segundos são verificadas com `ping()` antes de serem emprestadas.
+- O pool mantém métricas de empréstimos/devoluções, acessíveis através de `pool_stats()`.
+
+Variáveis de ambiente suportadas:
+- `DB_HOST`, `DB_USER`, `DB_PASSWORD`: credenciais (por omissão `localhost`, `admin`, `admin`).
+- `DB_POOL_SIZE`: número máximo de conexões por base de dados (por omissão 5).
+- `DB_POOL_TIMEOUT`: segundos a esperar por uma conexão livre antes de falhar (por omissão 5).
+- `DB_POOL_HEALTHCHECK_INTERVAL`: segundos de inatividade a partir dos quais a conexão é verificada (por omissão 30).
+
+@code
+    import db_pool
+    conn = db_pool.get_connection("recipe_database")
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM recipes")
+    print(cursor.fetchall())
+    cursor.close()
+    conn.close()  # devolve a conexão ao pool
+    print(db_pool.pool_stats())
+@endcode
+
+@note Precisa da biblioteca `mysql.connector`:
+- pip install mysql-connector-python
+"""
+import os
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+## @var DB_CONFIG
+# @brief Credenciais de acesso ao servidor MariaDB/MySQL comuns a todas as bases de dados.
+#
+# @warning Estas credenciais por omissão não são seguras e devem ser usadas apenas para demonstração e testes.
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "admin"),
+    "password": os.environ.get("DB_PASSWORD", "admin"),
+}
+
+## @var POOL_SIZE
+# @brief Número máximo de conexões abertas por base de dados.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+
+## @var POOL_TIMEOUT
+# @brief Tempo máximo (segundos) de espera por uma conexão livre.
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+
+## @var HEALTHCHECK_INTERVAL
+# @brief Tempo de inatividade (segundos) a partir do qual uma conexão é verificada com `ping()` antes de ser reutilizada.
+HEALTHCHECK_INTERVAL = float(os.environ.get("DB_POOL_HEALTHCHECK_INTERVAL", 30))
+
+
+class PooledConnection:
+    """
+    @brief Conexão emprestada pelo pool.
+    @details Delega todos os atributos na conexão `mysql.connector` subjacente; apenas `close()` muda de
+    comportamento e devolve a conexão ao pool. Pode ser usada como context manager.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        """
+        @brief Devolve a conexão ao pool. Chamadas repetidas não têm efeito.
+        """
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    @brief Pool de tamanho fixo de conexões para uma base de dados.
+    @details As conexões são abertas apenas quando necessárias. Cada posição livre do pool guarda a conexão
+    (ou None, se ainda não foi aberta) e o instante em que foi devolvida, para decidir se precisa de verificação.
+    """
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT, healthcheck_interval=HEALTHCHECK_INTERVAL):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        # LIFO so that the most recently used (and most likely alive) connection is reused first
+        self._idle = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._idle.put((None, 0.0))
+        self._lock = threading.Lock()
+        self._stats = {
+            "borrowed": 0,
+            "returned": 0,
+            "created": 0,
+            "discarded": 0,
+            "healthcheck_failures": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _connect(self):
+        conn = mysql.connector.connect(database=self.database, **DB_CONFIG)
+        self._count("created")
+        return conn
+
+    def _discard(self, conn):
+        self._count("discarded")
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def _is_healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Error:
+            self._count("healthcheck_failures")
+            return False
+
+    def get_connection(self):
+        """
+        @brief Empresta uma conexão do pool, esperando até `timeout` segundos se estiverem todas ocupadas.
+
+        @return <PooledConnection> Conexão pronta a usar; deve ser devolvida com `close()`.
+
+        @warning PoolError se nenhuma conexão ficar livre a tempo; Error se não for possível abrir a conexão.
+        """
+        start = time.monotonic()
+        try:
+            conn, last_used = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count("timeouts")
+            raise PoolError(f"Pool '{self.database}' esgotado: nenhuma conexão livre após {self.timeout}s")
+
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Error:
+            # Give the slot back so a failed connect does not shrink the pool
+            self._idle.put((None, 0.0))
+            raise
+
+        with self._lock:
+            self._stats["borrowed"] += 1
+            self._stats["wait_seconds"] += time.monotonic() - start
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """
+        @brief Devolve uma conexão ao pool, desfazendo qualquer transação deixada aberta.
+
+        @param conn Conexão `mysql.connector` obtida por `get_connection()`.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            slot = (conn, time.monotonic())
+        except Error:
+            self._discard(conn)
+            slot = (None, 0.0)
+        self._idle.put(slot)
+        self._count("returned")
+
+    def stats(self):
+        """
+        @brief Métricas do pool.
+
+        @return <dict> Contadores de empréstimos, devoluções, conexões criadas/descartadas, falhas de verificação,
+        esperas esgotadas e tempo total de espera, mais o tamanho e o número de conexões em uso.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        idle = self._idle.qsize()
+        stats.update({"size": self.size, "idle": idle, "in_use": self.size - idle})
+        return stats
+
+
+## @var _pools
+# @brief Pools já criados, indexados pelo nome da base de dados.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database):
+    """
+    @brief Obtém (criando se necessário) o pool de uma base de dados.
+
+    @param database <string> Nome da base de dados, por exemplo `recipe_database` ou `pantry_database`.
+
+    @return <ConnectionPool> Pool partilhado por todo o processo.
+    """
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = ConnectionPool(database)
+        return pool
+
+
+def get_connection(database):
+    """
+    @brief Empresta uma conexão do pool da base de dados indicada.
+
+    @param database <string> Nome da base de dados.
+
+    @return <PooledConnection> Conexão que deve ser devolvida com `close()`.
+    """
+    return get_pool(database).get_connection()
+
+
+def pool_stats():
+    """
+    @brief Métricas de todos os pools criados neste processo.
+
+    @return <dict> Dicionário {nome da base de dados: métricas}.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.database: pool.stats() for pool in pools}
@@ -1,93 +1,310 @@
 """
 @brief Módulo para análise e formatação de datas em diferentes formatos em português para o padrão ISO.
 
-Este módulo fornece uma função para analisar strings de datas escritas em vários formatos em português e converte-las para o formato padrão ISO 8601 (YYYY-MM-DD). 
-O módulo utiliza expressões regulares para identificar os formatos e o objeto datetime para a conversão.
+Este módulo fornece uma função para analisar strings de datas escritas em vários formatos em português e converte-las para o formato padrão ISO 8601 (YYYY-MM-DD).
+O módulo utiliza uma única expressão regular compilada (`DATE_GRAMMAR`) para identificar os formatos e o objeto date para a conversão.
 
-@details A função principal do módulo é capaz de interpretar formatos com mês por extenso ou em número, 
+@details A função principal do módulo é capaz de interpretar formatos com mês por extenso ou em número,
 utilizando um dicionário para a tradução dos nomes dos meses. Os formatos suportados incluem:
-- DD/MM/YYYY (ex: 21/05/2024)
+- DD/MM/YYYY (ex: 21/05/2024), DD-MM-YYYY, DD.MM.YY e YYYY-MM-DD
 - DD/MM YYYY (ex: 24/3 2045)
-- DD de Month de YYYY (ex: 21 de Maio de 2030)
-- Outros formatos similares onde o mês pode estar por extenso e o ano pode estar com ou sem a preposição 'de'.
+- DD/MM sem o ano (ex: 21/05), que é o próximo 21 de maio a partir de hoje; uma fração seguida de unidade
+  ("1/2 kg") não é uma data
+- DD de Month de YYYY (ex: 21 de Maio de 2030), com ou sem 'de', com o mês abreviado ("21 mai 2030") ou sem o ano
+  ("dia 3 de junho", que é o próximo 3 de junho a partir de hoje)
+- datas relativas, resolvidas em relação a um dia de referência (por omissão o dia de hoje):
+  - "hoje", "amanhã", "depois de amanhã", "ontem";
+  - "daqui a 5 dias", "dentro de duas semanas", "daqui a um mês", "daqui a um ano";
+  - "próxima semana", "mês que vem", "próximo ano";
+  - "fim da semana", "fim do mês", "final do próximo mês", "fim do ano";
+  - "dia 3" (o próximo dia 3; "dia 31" é o do próximo mês com 31 dias), "dia 3 deste mês", "dia 3 do próximo mês",
+    "dia primeiro do mês que vem".
 
-@note Caso a string de data não corresponda a nenhum dos formatos predefinidos, a função retornará "Invalid date format".
+Os números por extenso são convertidos com `convert_numbers_to_digit.parse_quantities()` antes de a gramática ser
+aplicada ("vinte e um de maio de dois mil e trinta" -> "21 de maio de 2030"). Os resultados ficam numa cache (LRU)
+indexada pela frase e pelo dia de referência: a mesma frase no mesmo dia não volta a ser analisada, e "amanhã" dito
+noutro dia dá outra data.
 
+@code
+    import format_date as fd
+    from datetime import date
+    print(fd.parse_date("21 de Maio de 2030"))
+    print(fd.parse_date("daqui a cinco dias", today=date(2030, 5, 21)))
+    print(fd.parse_date("dia 3 do próximo mês", today=date(2030, 5, 21)))
+    //Output:
+    2030-05-21
+    2030-05-26
+    2030-06-03
+@endcode
+
+@note Caso a string de data não corresponda a nenhum dos formatos predefinidos, ou seja uma data que não existe
+(ex: 31/02/2030), a função retornará "Invalid date format".
+
+@see bench_format_date.py para o benchmark e o corpus de propriedades da gramática.
 """
+import calendar
 import re
 import sys
-from datetime import datetime
+from datetime import date, timedelta
+from functools import lru_cache
+
+import convert_numbers_to_digit as convert
 
 ## @var month_to_number
 # @brief Dicionário que mapeia os nomes dos meses em português para seus respectivos números.
 # @details Este dicionário é utilizado para converter o nome do mês em português para o número correspondente,
-# permitindo a criação de objetos datetime com a data fornecida.
+# permitindo a criação de objetos date com a data fornecida.
 #
 month_to_number = {
     "Janeiro": 1, "Fevereiro": 2, "Março": 3, "Abril": 4, "Maio": 5, "Junho": 6,
     "Julho": 7, "Agosto": 8, "Setembro": 9, "Outubro": 10, "Novembro": 11, "Dezembro": 12
 }
 
-## @var date_patterns
-# @brief Dicionário que mapeia expressões regulares para formatos de datas em português.
-# @details Este dicionário contém as expressões regulares correspondentes a diferentes formatos de datas em português,
-# permitindo a identificação e extração dos componentes da data.
+## @var INVALID_DATE
+# @brief Valor devolvido por `parse_date()` quando a frase não contém nenhuma data válida.
+INVALID_DATE = "Invalid date format"
+
+## @var CACHE_SIZE
+# @brief Número máximo de pares (frase, dia) guardados na cache de resultados.
+CACHE_SIZE = 2048
+
+# Month number by the first three letters of its name, so "mar", "março" and "marco" are the same month
+_MONTHS = {name[:3].lower(): number for name, number in month_to_number.items()}
+
+_MONTH = (r"janeiro|fevereiro|mar[çc]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro"
+          r"|jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez")
+_WORD = re.compile(r"[^\W\d_]+")
+_NUMBER_WORDS = frozenset(convert.numbers_dict)
+
+_DAY = r"\d{1,2}|primeiro"
+_NEXT_MONTH = r"pr[óo]ximo\s+m[êe]s|m[êe]s\s+que\s+vem"
+# Units after a day/month pair make it a fraction ("1/2 kg", "3/4 de litro"), not a date
+_UNIT = "|".join(sorted((re.escape(unit) for unit in set(convert.uni_dict) | set(convert.uni_dict.values())),
+                        key=len, reverse=True))
+
+## @var DATE_GRAMMAR
+# @brief Gramática compilada com todos os formatos de data suportados, numa só alternância.
+# @details Cada alternativa tem os seus grupos com nome; o primeiro prefixo do nome (iso, num, dm, txt, word, off,
+# next, end, rel) indica como a data é resolvida em `_resolve()`. Os números já têm de estar em dígitos.
 #
-date_patterns = {
-    r"(\d{1,2})/(\d{1,2})\s(\d{4})": "DD/MM YYYY",  # 24/3 2045
-    r"(\d{1,2})/(\d{1,2})/(\d{4})": "DD/MM/YYYY",   # 21/05/2024
-    r"(\d{1,2}) de (\w+) de (\d{4})": "DD de Month de YYYY",  # 21 de Maio de 2030
-    r"(\d{1,2}) de (\w+)\s(\d{4})": "DD de Month de YYYY",  # 21 de Maio 2030
-    r"(\d{1,2})\s(\w+) de (\d{4})": "DD de Month de YYYY",  # 21 Maio de 2030
-    r"(\d{1,2})\s(\w+)\s(\d{4})": "DD de Month de YYYY"  # 21 Maio 2030
-}
+DATE_GRAMMAR = re.compile(r"""
+    (?<![\w/.,-])
+    (?:
+        (?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2})
+      | (?P<num_d>\d{1,2})\s*[/.-]\s*(?P<num_m>\d{1,2})(?:\s*[/.-]\s*|\s+)(?P<num_y>\d{4}|\d{2})
+      | (?P<dm_d>\d{1,2})\s*/\s*(?P<dm_m>\d{1,2})(?![/.-]?\d)(?!\s+(?:de\s+)?(?:""" + _UNIT + r""")(?!\w))
+      | (?:dia\s+)?(?P<txt_d>""" + _DAY + r""")(?:\s+de)?\s+(?P<txt_m>""" + _MONTH + r""")\.?
+        (?:(?:\s+de)?\s+(?P<txt_y>\d{4}))?
+      | (?P<word>depois\s+de\s+amanh[ãa]|amanh[ãa]|hoje|ontem)
+      | (?:daqui\s+a|dentro\s+de)\s+(?P<off_n>\d{1,3})\s+(?P<off_u>dias?|semanas?|m[êe]s(?:es)?|anos?)
+      | (?:pr[óo]xim[oa]\s+(?P<next_u>semana|m[êe]s|ano)|(?P<next_v>semana|m[êe]s|ano)\s+que\s+vem)
+      | (?:fim|final)\s+d(?:[aoe]|est[ae])\s+(?:pr[óo]xim[oa]\s+(?P<end_n>semana|m[êe]s|ano)
+                                              |(?P<end_v>semana|m[êe]s|ano)\s+que\s+vem
+                                              |(?P<end_u>semana|m[êe]s|ano))
+      | dia\s+(?P<rel_d>""" + _DAY + r""")(?:\s+d(?:o|este)\s+(?:(?P<rel_next>""" + _NEXT_MONTH + r""")|(?P<rel_this>m[êe]s)))?
+    )
+    (?!\w)
+""", re.IGNORECASE | re.VERBOSE)
+
+
+def _add_months(day, months):
+    # Same day `months` later, clamped to the end of the month (31 January + 1 month -> 28/29 February)
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _shift(today, unit, count):
+    unit = unit.lower()
+    if unit.startswith("dia"):
+        return today + timedelta(days=count)
+    if unit.startswith("semana"):
+        return today + timedelta(weeks=count)
+    if unit.startswith("m"):
+        return _add_months(today, count)
+    return _add_months(today, 12 * count)
+
+
+def _next_date(today, month, day):
+    # Next day/month from today on; 29 February waits for a leap year, 31/04 raises ValueError
+    for year in range(today.year, today.year + 9):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= today:
+            return candidate
+    raise ValueError(f"day {day}/{month} does not exist")
+
+
+def _day_number(text):
+    return 1 if text.lower() == "primeiro" else int(text)
+
+
+def _resolve(match, today):
+    # Date of a DATE_GRAMMAR match; raises ValueError for days that do not exist (31/02, dia 31 in April)
+    group = match.groupdict()
+    if group['iso_y']:
+        return date(int(group['iso_y']), int(group['iso_m']), int(group['iso_d']))
+    if group['num_d']:
+        year = int(group['num_y'])
+        return date(year + 2000 if year < 100 else year, int(group['num_m']), int(group['num_d']))
+    if group['dm_d']:
+        # Without a year, the next occurrence from today on (an expiry date is in the future)
+        return _next_date(today, int(group['dm_m']), int(group['dm_d']))
+    if group['txt_d']:
+        month = _MONTHS[group['txt_m'][:3].lower().replace("ç", "c")]
+        day = _day_number(group['txt_d'])
+        if group['txt_y']:
+            return date(int(group['txt_y']), month, day)
+        return _next_date(today, month, day)
+    if group['word']:
+        word = group['word'].lower()
+        if word.startswith("depois"):
+            return today + timedelta(days=2)
+        return today + timedelta(days={"hoje": 0, "ontem": -1}.get(word, 1))
+    if group['off_n']:
+        return _shift(today, group['off_u'], int(group['off_n']))
+    if group['next_u'] or group['next_v']:
+        return _shift(today, group['next_u'] or group['next_v'], 1)
+    if group['end_n'] or group['end_v'] or group['end_u']:
+        unit = (group['end_n'] or group['end_v'] or group['end_u']).lower()
+        base = today if group['end_u'] else _shift(today, unit, 1)
+        if unit == "semana":
+            return base + timedelta(days=6 - base.weekday())
+        if unit == "ano":
+            return date(base.year, 12, 31)
+        return date(base.year, base.month, calendar.monthrange(base.year, base.month)[1])
+    # "dia 3" alone is the next day 3: this month, or the next one if it has already passed
+    day = _day_number(group['rel_d'])
+    if not 1 <= day <= 31:
+        raise ValueError(f"day {day} does not exist")
+    month = today.replace(day=1)
+    if group['rel_next'] or (group['rel_this'] is None and day < today.day):
+        month = _add_months(month, 1)
+    if group['rel_next'] is None and group['rel_this'] is None:
+        # ... and "dia 31" is in the next month that has 31 days
+        while day > calendar.monthrange(month.year, month.month)[1]:
+            month = _add_months(month, 1)
+    return month.replace(day=day)
+
+
+def _with_digits(text):
+    # Copy of the text with the number words in digits, plus the original span of every character (None if unchanged)
+    if _NUMBER_WORDS.isdisjoint(_WORD.findall(text.lower())):
+        return text, None, None
+    parts, starts, ends = [], [], []
+    position = 0
+    for quantity in convert.parse_quantities(text):
+        if quantity['unit'] is not None or quantity['text'][0].isdigit():
+            continue
+        start, end = quantity['start'], quantity['end']
+        parts.append(text[position:start])
+        starts.extend(range(position, start))
+        ends.extend(range(position + 1, start + 1))
+        digits = convert.format_number(quantity['value'])
+        parts.append(digits)
+        starts.extend([start] * len(digits))
+        ends.extend([end] * len(digits))
+        position = end
+    parts.append(text[position:])
+    starts.extend(range(position, len(text)))
+    ends.extend(range(position + 1, len(text) + 1))
+    return "".join(parts), starts, ends
+
+
+def _find(text, day):
+    # `day` is the reference day in ISO format, so the cache never reuses a relative date on another day
+    today = date.fromisoformat(day)
+    converted, starts, ends = _with_digits(text)
+    found = []
+    for match in DATE_GRAMMAR.finditer(converted):
+        try:
+            value = _resolve(match, today)
+        except ValueError:  # e.g. 31/02/2030
+            continue
+        start, end = match.span()
+        if starts is not None:
+            start, end = starts[start], ends[end - 1]
+        found.append((value.isoformat(), start, end))
+    return tuple(found)
 
-def parse_date(date_string):
+
+_cached_find = lru_cache(maxsize=CACHE_SIZE)(_find)
+
+
+def find_dates(text, today=None):
+    """
+    @brief Procura todas as datas de uma frase, absolutas ou relativas.
+
+    @param text <string> Frase com uma ou mais datas ("o leite expira amanhã e o queijo a 3 de junho").
+    @param today Dia de referência para as datas relativas (`datetime.date`); por omissão o dia de hoje.
+
+    @return <list> Um dicionário {'value', 'text', 'start', 'end'} por data, pela ordem da frase, em que `value` é a
+    data no formato ISO e `start`/`end` são as posições dos caracteres em `text`.
+    """
+    today = today or date.today()
+    return [{'value': value, 'text': text[start:end], 'start': start, 'end': end}
+            for value, start, end in _cached_find(text, today.isoformat())]
+
+
+def parse_date(date_string, today=None):
     """
     @brief Analisa uma string de data em diversos formatos em português e converte para o formato ISO 8601 (YYYY-MM-DD).
-    @details Esta função utiliza expressões regulares para identificar os formatos de datas suportados e extrair os componentes da data.
-    Em seguida, cria um objeto datetime com a data fornecida e a converte para o formato ISO 8601.
-    
+    @details Esta função procura na string a primeira data reconhecida pela gramática `DATE_GRAMMAR` (ver `find_dates()`),
+    resolve-a em relação ao dia de referência se for relativa e converte-a para o formato ISO 8601.
+
     @param date_string <string> contendo a data num dos formatos suportados.
-    
+    @param today Dia de referência para as datas relativas (`datetime.date`); por omissão o dia de hoje.
+
     @return <string> com a data no formato ISO ou uma mensagem indicando formato inválido.
-    
+
     @note Caso a string de data não corresponda a nenhum dos formatos predefinidos, a função retornará "Invalid date format".
     """
-    for pattern, date_format in date_patterns.items():
-        match = re.match(pattern, date_string.strip())
-        if match:
-            if date_format == "DD/MM/YYYY" or date_format == "DD/MM YYYY":
-                day, month, year = match.groups()
-                return datetime(int(year), int(month), int(day)).strftime('%Y-%m-%d')
-            elif date_format == "DD de Month de YYYY":
-                day, month_name, year = match.groups()
-                month = month_to_number.get(month_name.capitalize(), None)
-                if month:
-                    return datetime(int(year), month, int(day)).strftime('%Y-%m-%d')
-    return "Invalid date format"
+    today = today or date.today()
+    found = _cached_find(date_string.strip(), today.isoformat())
+    return found[0][0] if found else INVALID_DATE
+
+
+def cache_info():
+    """
+    @brief Estatísticas da cache de resultados (hits, misses, maxsize, currsize).
+    """
+    return _cached_find.cache_info()
+
+
+def clear_cache():
+    """
+    @brief Esvazia a cache de resultados.
+    """
+    _cached_find.cache_clear()
+
 
 def main():
     """
     @brief Função principal para execução do módulo como script.
-    @details Esta função é utilizada para executar o módulo como um script, recebendo a string de data como argumento da linha de comando.
-    
-    @param argv String de data fornecida como argumento da linha de comando.
-    
+    @details Esta função é utilizada para executar o módulo como um script, recebendo a string de data como argumento da linha de comando
+    e, opcionalmente, o dia de referência para as datas relativas.
+
+    @param argv String de data fornecida como argumento da linha de comando, seguida do dia de referência (YYYY-MM-DD).
+
     @code
     // Exemplo de uso:
     python format_date.py '21 de Maio de 2030'
+    python format_date.py 'daqui a cinco dias' 2030-05-21
     // Output:
     2030-05-21
+    2030-05-26
     @endcode
-    
+
     @note A string de data deve ser fornecida como argumento da linha de comando.
     """
-    if len(sys.argv) != 2:
-        print("Usage: python format_date.py 'date string'")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python format_date.py 'date string' [YYYY-MM-DD]")
         sys.exit(1)
     input_date = sys.argv[1]
-    result = parse_date(input_date)
+    today = date.fromisoformat(sys.argv[2]) if len(sys.argv) == 3 else None
+    result = parse_date(input_date, today)
     print(result)
 
 if __name__ == "__main__":
@@ -4,10 +4,16 @@
 Este módulo define funções para identificar ingredientes e unidades de medida em sentenças, baseando-se em listas predefinidas de alimentos e unidades comuns na culinária. O módulo utiliza o processamento de linguagem natural com o modelo "pt_core_news_sm" do spaCy para lematização e tokenização, aumentando a precisão na identificação de ingredientes em diferentes formas flexionadas.
 
 @details As funções principais do módulo são:
+- `find_products(sentence)`: Devolve todos os ingredientes e unidades da sentença, com a posição de cada um.
 - `get_ingredient(sentence)`: Identifica e retorna o ingrediente presente na sentença, se houver.
 - `get_unit(sentence)`: Identifica e retorna a unidade de medida presente na sentença, se houver.
 
-Os ingredientes e unidades são identificados mesmo que estejam flexionados, graças à lematização feita pelo spaCy, o que permite que o módulo funcione de maneira eficaz em textos reais e variados.
+As listas são compiladas uma única vez num `Gazetteer`: os lemas do spaCy de cada alimento são calculados na
+compilação (e não em cada pedido), e as entradas com várias palavras ("peito de frango", "colher de sopa") ficam
+numa árvore de prefixos percorrida palavra a palavra, sempre com a correspondência mais longa primeiro. Cada
+sentença é lida uma só vez, sem voltar a correr o spaCy. As palavras são comparadas pela chave de
+`ingredients.ingredient_key()` (singular, sem acentos), pelo que "cebolas", "Cebola" e "tomate" encontram as
+entradas "cebola" e "tomates".
 
 @code
     sentence = "Adicione 200g de açúcar e 500ml de leite ao preparo."
@@ -16,15 +22,32 @@ Os ingredientes e unidades são identificados mesmo que estejam flexionados, gra
     print(f"Ingrediente: {ingredient}, Unidade: {unit}")
     //Output: 
     Ingrediente: açúcar, Unidade: g
+
+    for span in find_products(sentence):
+        print(span['label'], span['value'], span['start'], span['end'])
+    //Output:
+    unit g 12 13
+    ingredient açúcar 17 23
+    unit ml 29 31
+    ingredient leite 35 40
 @endcode
 
+O modelo do spaCy é o do `nlp_service`, carregado só quando o vocabulário é compilado e não ao importar este módulo.
+
 @note É necessário instalar o spaCy e baixar o modelo de linguagem português para o funcionamento adequado deste módulo.
     - pip install spacy
     - python -m spacy download pt_core_news_sm
+
+@see bench_get_product.py para comparar o tempo por pedido com a implementação anterior.
 """
-import spacy
-# pip install spacy
-# python -m spacy download pt_core_news_sm
+import re
+import threading
+from functools import lru_cache
+
+from ingredients import ingredient_key
+from recipe_search import fold
+from unit_conversion import UNIT_ALIASES
+import nlp_service as ns
 
 ## @var unit_list
 # @brief Lista de unidades de medida comuns em português.
@@ -118,67 +141,184 @@ food_list = [
 ]
 
 
-## @var nlp
-# @brief Modelo de processamento de linguagem natural do spaCy para o idioma português.
-# @details Este objeto representa o modelo de processamento de linguagem natural do spaCy para o idioma português, que inclui recursos de tokenização, lematização e análise sintática.
-#
-nlp = spacy.load("pt_core_news_sm")
+## @var exact_foods
+# @brief Ingredientes cujo singular é uma palavra comum nos comandos de voz ("passa para o próximo passo").
+# @details Estes ingredientes só são reconhecidos quando escritos como na `food_list`.
+exact_foods = ["passas"]
+
+
+# Words and numbers; "200g" gives "200" and "g", "couve-flor" gives "couve" and "flor"
+_TOKENS = re.compile(r"\d+(?:[.,]\d+)?|[^\W\d_]+")
+
+
+def tokenize(sentence):
+    """
+    @brief Separa uma sentença em palavras e números.
+
+    @return <list> Tuplos (início, fim, palavra em minúsculas), pela ordem da sentença.
+    """
+    return [(m.start(), m.end(), m.group()) for m in _TOKENS.finditer((sentence or "").lower())]
+
+
+@lru_cache(maxsize=4096)
+def _word_key(word):
+    return ingredient_key(word)
+
+
+class Gazetteer:
+    """
+    @brief Vocabulário de ingredientes e unidades compilado numa árvore de prefixos de palavras.
+
+    Cada entrada é guardada pela sequência de chaves das suas palavras (`ingredient_key()` palavra a palavra). Os
+    nós terminais têm o rótulo ('ingredient' ou 'unit') e o valor canónico da entrada.
+    """
+
+    def __init__(self, foods, units, unit_aliases=None, lemmatizer=None, exact=()):
+        """
+        @param foods Lista de ingredientes.
+        @param units Lista de unidades.
+        @param unit_aliases <dict> Sinónimos das unidades (nome -> unidade de `units`), como `UNIT_ALIASES`.
+        @param lemmatizer Função que processa uma lista de textos e devolve os `Doc` do spaCy (como
+        `nlp_service.pipe`), usada para acrescentar o lema de cada ingrediente de uma palavra; None para não usar lemas.
+        @param exact Ingredientes que só são reconhecidos escritos como na lista (ver `exact_foods`).
+        """
+        self._root = {}
+        self._exact = {value: fold(value) for value in exact}
+        self.size = 0
+        for unit in units:
+            self._add(unit, 'unit', unit)
+        for alias, unit in (unit_aliases or {}).items():
+            if unit in units:
+                self._add(alias, 'unit', unit)
+        foods = list(dict.fromkeys(foods))
+        for food in foods:
+            self._add(food, 'ingredient', food)
+        # The first word of a multi-word entry is an ingredient on its own ("açúcar" from "açúcar mascavado")
+        for food in foods:
+            if ' ' in food:
+                head = food.split()[0]
+                self._add(head, 'ingredient', head)
+        if lemmatizer is not None:
+            single = [food for food in foods if ' ' not in food and '-' not in food]
+            for food, doc in zip(single, lemmatizer(single)):
+                if len(doc) == 1:
+                    self._add(doc[0].lemma_, 'ingredient', food)
+
+    def _add(self, phrase, label, value):
+        words = [_word_key(word) for word in _TOKENS.findall(phrase.lower())]
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        # Units win over ingredients with the same words; otherwise the first entry is kept
+        if None not in node or (label == 'unit' and node[None][0] != 'unit'):
+            if None not in node:
+                self.size += 1
+            node[None] = (label, value)
+
+    def find(self, sentence, tokens=None):
+        """
+        @brief Encontra todos os ingredientes e unidades de uma sentença, numa só passagem.
+
+        @param sentence <string> Sentença a analisar.
+        @param tokens Palavras da sentença já separadas com `tokenize()`; None para as separar aqui.
+
+        @return <list> Dicionários {'label', 'value', 'text', 'start', 'end'}, pela ordem da sentença e sem
+        sobreposições: 'label' é 'ingredient' ou 'unit', 'value' a entrada do vocabulário, 'text' o texto tal como
+        aparece na sentença e 'start'/'end' as posições dos caracteres.
+        """
+        if tokens is None:
+            tokens = tokenize(sentence)
+        tokens = [(start, end, _word_key(word)) for start, end, word in tokens]
+        spans = []
+        i = 0
+        while i < len(tokens):
+            node, match, j = self._root, None, i
+            while j < len(tokens) and tokens[j][2] in node:
+                node = node[tokens[j][2]]
+                j += 1
+                if None in node:
+                    match = (j, node[None])
+            if match is None:
+                i += 1
+                continue
+            j, (label, value) = match
+            start, end = tokens[i][0], tokens[j - 1][1]
+            if value in self._exact and fold(sentence[start:end]) != self._exact[value]:
+                i += 1
+                continue
+            spans.append({'label': label, 'value': value, 'text': sentence[start:end], 'start': start, 'end': end})
+            i = j
+        return spans
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """
+    @brief Devolve o `Gazetteer` de `food_list` e `unit_list`, compilado na primeira chamada.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(food_list, unit_list, UNIT_ALIASES, lemmatizer=ns.pipe, exact=exact_foods)
+    return _gazetteer
+
+
+def find_products(sentence, tokens=None):
+    """
+    @brief Devolve todos os ingredientes e unidades de medida mencionados numa sentença.
+
+    @param sentence <string> contendo a sentença a ser analisada.
+    @param tokens Palavras da sentença já separadas com `tokenize()` (opcional).
+
+    @return <list> com um dicionário por ocorrência (ver `Gazetteer.find()`).
+    """
+    return get_gazetteer().find(sentence, tokens)
+
+
+def best_span(spans, label):
+    """
+    @brief Escolhe a ocorrência principal de um tipo: a primeira com várias palavras ou, se não houver, a primeira.
+
+    @param spans Ocorrências devolvidas por `find_products()`.
+    @param label 'ingredient' ou 'unit'.
+
+    @return <dict> A ocorrência escolhida, ou None se não houver nenhuma desse tipo.
+    """
+    spans = [span for span in spans if span['label'] == label]
+    if not spans:
+        return None
+    return next((span for span in spans if ' ' in span['value']), spans[0])
+
 
 def get_ingredient(sentence):
     """
     @brief Processa uma frase para identificar e retornar o ingrediente mencionado.
-    @details Esta função utiliza o modelo de processamento de linguagem natural do spaCy para lematizar e analisar a sentença, identificando o ingrediente mencionado com base em uma lista predefinida de alimentos.
-    A função verifica se a sentença contém ingredientes completos ou suas formas lematizadas, retornando o ingrediente correspondente.
+    @details Procura os ingredientes da sentença com `find_products()`. Os ingredientes com várias palavras ("peito de frango") têm prioridade sobre os de uma só palavra, como na versão anterior desta função.
     
     @param sentence <string> contendo a sentença a ser analisada.
     
-    @return <string> com o ingrediente identificado ou None se nenhum ingrediente for encontrado.
+    @return <string> com o ingrediente identificado, tal como aparece na sentença (em minúsculas), ou None se nenhum ingrediente for encontrado.
     
-    @note Caso não seja encontrado um ingrediente completo, a função tentará identificar ingredientes flexionados ou lematizados.
-    Se mesmo assim nenhum ingrediente for encontrado, a função retornará None.
+    @note Os ingredientes flexionados ("cebolas") são encontrados pelo singular e pelos lemas calculados na compilação do vocabulário.
     """
-    
-    # Process the sentence using spaCy to tokenize and lemmatize the text
-    doc = nlp(sentence.lower())
+    span = best_span(find_products(sentence), 'ingredient')
+    return span['text'].lower() if span else None
+
 
-    # Convert list to lemmas
-    lemmatized_list = {nlp(word)[0].lemma_ for word in food_list}
-    original_list = set(food_list)
-    
-    # Check for multi-word units first (assumes lista is already lemmatized if necessary)
-    for unit in [unit for unit in food_list if ' ' in unit]:
-        if unit in sentence:
-            return unit
-
-    # Check for single-word units using lemmatization
-    for token in doc:
-        if token.lemma_ in lemmatized_list or token.text in original_list:
-            return token.text  # return the original text
-
-    return None  # If no unit is found
-            
 def get_unit(sentence):
     """
-    brief Processa uma frase para identificar e retornar a unidade de medida mencionada, se houver.
-    @details Esta função verifica se a sentença contém uma unidade de medida comum, retornando a unidade identificada.
-    A função verifica primeiro as unidades de medida compostas (com mais de uma palavra) e, em seguida, as unidades de medida simples.
+    @brief Processa uma frase para identificar e retornar a unidade de medida mencionada, se houver.
+    @details Procura as unidades da sentença com `find_products()`. As unidades com várias palavras ("colher de sopa") têm prioridade sobre as simples.
     
     @param sentence <string> contendo a sentença a ser analisada.
     
-    @return <string> com a unidade de medida identificada ou None se nenhuma unidade for encontrada.
-    
-    @note Caso não seja encontrada uma unidade de medida composta, a função tentará identificar unidades de medida simples.
+    @return <string> com a unidade de medida de `unit_list` ("gramas" -> "g", "latas" -> "lata") ou None se nenhuma unidade for encontrada.
     """
-    lower = sentence.lower()
-    words = lower.split() # --------------------------------------- Split the sentence into words
-    multi_word_units = [unit for unit in unit_list if ' ' in unit] # ----- Get multi-word units
-
-    # ---------------------------------------------------------------- Check for multi-word units
-    for unit in multi_word_units:
-        if unit in sentence:
-            return unit
-
-    # ---------------------------------------------------------------- Check for single-word units
-    for word in words:
-        if word in [unit for unit in unit_list if ' ' not in unit]:
-            return word
\ No newline at end of file
+    span = best_span(find_products(sentence), 'unit')
+    return span['value'] if span else None
@@ -0,0 +1,247 @@
+"""
+@brief Módulo da entidade canónica de ingrediente, partilhada pela despensa, pelas receitas e pelo vocabulário.
+
+"batata" no vocabulário do `get_product`, "batatas" na despensa e "Batata" numa receita são o mesmo ingrediente.
+Cada ingrediente tem uma linha na tabela `ingredients` (base de dados `recipe_database`) com uma chave normalizada
+única, e `stock.ingredient_id` e `recipe_ingredients.ingredient_id` apontam para ela. Assim as junções e as
+agregações entre a despensa e as receitas são feitas sobre IDs inteiros indexados, em vez de comparar nomes.
+
+@details Como funciona:
+- `ingredient_key()`: chave de comparação; o nome no singular (`singular()`), sem acentos e em minúsculas
+  ("Camarões" -> "camarao", "Filetes de Pescada" -> "filete de pescada").
+- `ingredient_synonyms`: chaves alternativas que apontam para um ingrediente existente ("abacaxi" -> ananás).
+- `IngredientResolver`: cache em memória chave -> ID, carregada de uma vez na primeira utilização. Os nomes que
+  ainda não existem são criados em lote (`INSERT IGNORE`), com a unidade por omissão e a densidade conhecida.
+
+@code
+    import ingredients as ing
+    print(ing.ingredient_key("Batatas"))                                 # batata
+    ids = ing.resolve_many(["batatas", "Batata", "leite"], units={"leite": "l"})
+    print(ids["batatas"] == ids["Batata"])                               # True
+    print(ing.get(ids["leite"]))                                         # {'name': 'leite', 'default_unit': 'l', ...}
+@endcode
+
+@note As tabelas são criadas pelas migrações `recipe_database/0003_ingredients.sql` e
+`pantry_database/0007_stock_ingredient.sql`.
+"""
+import re
+import threading
+
+from mysql.connector import Error
+
+import db_pool
+from recipe_search import fold
+from unit_conversion import DENSITIES
+
+## @var INGREDIENTS_DATABASE
+# @brief Base de dados onde estão as tabelas `ingredients` e `ingredient_synonyms`.
+INGREDIENTS_DATABASE = "recipe_database"
+
+## @var CONNECTORS
+# @brief Palavras de ligação que não passam para o singular ("filetes de pescada", "lombos com ervas").
+CONNECTORS = frozenset(("de", "da", "do", "das", "dos", "com", "e", "em", "a", "ao", "à", "no", "na"))
+
+# Plural endings, checked in order: (ending, replacement); unaccented forms for text typed without accents
+_PLURALS = (
+    ("ões", "ão"), ("ães", "ão"), ("ãos", "ão"), ("oes", "ao"), ("aes", "ao"),
+    ("ais", "al"), ("éis", "el"), ("eis", "el"), ("óis", "ol"), ("ois", "ol"), ("uis", "ul"),
+    ("ns", "m"),
+)
+_VOWELS = frozenset("aeiouáéíóúâêôãõ")
+_SPACES = re.compile(r"\s+")
+
+_DENSITY_KEYS = None
+
+
+def singular(name):
+    """
+    @brief Passa um nome de ingrediente para o singular, palavra a palavra.
+
+    @param name Nome do ingrediente ("Camarões", "filetes de pescada").
+
+    @return <string> Nome em minúsculas e no singular ("camarão", "filete de pescada"). Palavras com três letras
+    ou menos e as palavras de ligação (`CONNECTORS`) ficam iguais.
+    """
+    return " ".join(_singular_word(word) for word in _SPACES.split((name or "").strip().lower()))
+
+
+def _singular_word(word):
+    if len(word) <= 3 or word in CONNECTORS or not word.endswith("s"):
+        return word
+    for ending, replacement in _PLURALS:
+        if word.endswith(ending):
+            return word[:-len(ending)] + replacement
+    # "colheres" -> "colher", "nozes" -> "noz", but "espinafres" -> "espinafre"
+    if word.endswith(("res", "zes")) and len(word) > 4 and word[-4] in _VOWELS:
+        return word[:-2]
+    return word[:-1]
+
+
+def ingredient_key(name):
+    """
+    @brief Chave normalizada de um ingrediente: singular, sem acentos, em minúsculas e só com letras e dígitos.
+    """
+    return fold(singular(name))
+
+
+def default_density(key):
+    """
+    @brief Densidade conhecida (g/ml) de um ingrediente, a partir de `unit_conversion.DENSITIES`.
+
+    @return <Decimal> Densidade do nome completo ou de uma das suas palavras; None se não for conhecida.
+    """
+    global _DENSITY_KEYS
+    if _DENSITY_KEYS is None:
+        _DENSITY_KEYS = {ingredient_key(name): density for name, density in DENSITIES.items()}
+    density = _DENSITY_KEYS.get(key)
+    if density is None:
+        density = next((_DENSITY_KEYS[word] for word in key.split() if word in _DENSITY_KEYS), None)
+    return density
+
+
+class IngredientResolver:
+    """
+    @brief Cache nome -> ID da tabela `ingredients`, com criação em lote dos ingredientes novos.
+    """
+
+    def __init__(self, database=INGREDIENTS_DATABASE):
+        self.database = database
+        self._lock = threading.Lock()
+        self._ids = None   # ingredient key (and synonym key) -> ingredient_id
+        self._info = {}    # ingredient_id -> {'name', 'key', 'default_unit', 'density'}
+
+    def _load(self, cursor, keys=None):
+        # Whole tables on first use; afterwards only the keys just created
+        query = "SELECT ingredient_id, name_key, name, default_unit, density FROM ingredients"
+        if keys is not None:
+            query += " WHERE name_key IN ({})".format(", ".join(["%s"] * len(keys)))
+        cursor.execute(query, tuple(keys or ()))
+        ids = {} if keys is None else self._ids
+        for ingredient_id, key, name, default_unit, density in cursor.fetchall():
+            ids[key] = ingredient_id
+            self._info[ingredient_id] = {'name': name, 'key': key, 'default_unit': default_unit, 'density': density}
+        if keys is None:
+            cursor.execute("SELECT synonym_key, ingredient_id FROM ingredient_synonyms")
+            for key, ingredient_id in cursor.fetchall():
+                ids.setdefault(key, ingredient_id)
+            self._ids = ids
+
+    def resolve_many(self, names, units=None, create=True):
+        """
+        @brief Obtém o ID de vários ingredientes, criando os que ainda não existem.
+
+        @param names Nomes dos ingredientes, em qualquer forma ("Batatas", "batata").
+        @param units <dict> Unidade de cada nome, guardada como unidade por omissão dos ingredientes criados.
+        @param create Se False, os nomes desconhecidos ficam com None em vez de serem criados.
+
+        @return <dict> nome -> ingredient_id (None para nomes vazios ou desconhecidos com `create=False`).
+
+        @warning mysql.connector.Error Se a base de dados falhar.
+        """
+        units = units or {}
+        keys = {name: ingredient_key(name) for name in names if name}
+        with self._lock:
+            if self._ids is None or (create and any(key not in self._ids for key in keys.values())):
+                conn = db_pool.get_connection(self.database)
+                try:
+                    cursor = conn.cursor()
+                    if self._ids is None:
+                        self._load(cursor)
+                    missing = {}
+                    for name, key in keys.items():
+                        if key and key not in self._ids and create:
+                            missing.setdefault(key, (key, singular(name), units.get(name), default_density(key)))
+                    if missing:
+                        # IGNORE: another process may have created the same key meanwhile
+                        cursor.executemany(
+                            "INSERT IGNORE INTO ingredients (name_key, name, default_unit, density) VALUES (%s, %s, %s, %s)",
+                            list(missing.values()))
+                        conn.commit()
+                        self._load(cursor, list(missing))
+                    cursor.close()
+                finally:
+                    conn.close()
+            return {name: self._ids.get(keys[name]) if name in keys else None for name in names}
+
+    def resolve(self, name, unit=None, create=True):
+        """
+        @brief Obtém o ID de um ingrediente (ver `resolve_many()`).
+        """
+        return self.resolve_many([name], {name: unit}, create)[name]
+
+    def get(self, ingredient_id):
+        """
+        @brief Dados de um ingrediente: {'name', 'key', 'default_unit', 'density'}, ou None se não existir.
+        """
+        with self._lock:
+            if self._ids is None or ingredient_id not in self._info:
+                conn = db_pool.get_connection(self.database)
+                try:
+                    cursor = conn.cursor()
+                    self._load(cursor)
+                    cursor.close()
+                finally:
+                    conn.close()
+            return self._info.get(ingredient_id)
+
+    def add_synonym(self, name, ingredient_id):
+        """
+        @brief Regista um nome alternativo para um ingrediente existente ("abacaxi" -> ananás).
+        """
+        key = ingredient_key(name)
+        conn = db_pool.get_connection(self.database)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO ingredient_synonyms (synonym_key, ingredient_id, name) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE ingredient_id = VALUES(ingredient_id), name = VALUES(name)
+            """, (key, ingredient_id, name))
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        with self._lock:
+            if self._ids is not None:
+                self._ids[key] = ingredient_id
+
+    def invalidate(self):
+        """
+        @brief Esquece a cache; a próxima consulta volta a ler as tabelas.
+        """
+        with self._lock:
+            self._ids = None
+            self._info = {}
+
+
+## @var resolver
+# @brief Resolver partilhado pelo processo.
+resolver = IngredientResolver()
+
+
+def resolve(name, unit=None, create=True):
+    """
+    @brief Atalho para `resolver.resolve()`; devolve None se a base de dados falhar.
+    """
+    try:
+        return resolver.resolve(name, unit, create)
+    except Error as e:
+        print(f"Failed to resolve ingredient '{name}': {e}")
+        return None
+
+
+def resolve_many(names, units=None, create=True):
+    """
+    @brief Atalho para `resolver.resolve_many()`; devolve None para todos os nomes se a base de dados falhar.
+    """
+    try:
+        return resolver.resolve_many(names, units, create)
+    except Error as e:
+        print(f"Failed to resolve ingredients: {e}")
+        return {name: None for name in names}
+
+
+def get(ingredient_id):
+    """
+    @brief Atalho para `resolver.get()`.
+    """
+    return resolver.get(ingredient_id)
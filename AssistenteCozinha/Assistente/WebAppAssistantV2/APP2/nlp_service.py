@@ -0,0 +1,140 @@
+"""
+@brief Módulo com o modelo spaCy partilhado pelo processo, carregado só quando é preciso.
+
+Em vez de cada módulo chamar `spacy.load("pt_core_news_sm")` ao ser importado, com todos os componentes ativos,
+o `get_product`, o `spacy_test` e os scripts de benchmark pedem o modelo a este serviço. O spaCy só é importado e o
+modelo só é carregado na primeira utilização, uma única vez por processo, e sem os componentes que não são usados:
+a aplicação só precisa da tokenização e dos lemas, pelo que o `parser` e o `ner` nem chegam a ser carregados.
+
+@details Funções principais:
+- `get_nlp()`: devolve o modelo partilhado, carregando-o na primeira chamada.
+- `pipe(texts)`: processa várias frases de uma vez com `nlp.pipe` (em lotes de `BATCH_SIZE`).
+- `lemmas(text)` / `lemmas_many(texts)`: lemas das palavras de uma ou várias frases.
+- `configure()`: escolhe outro modelo ou outros componentes; o modelo é recarregado no pedido seguinte.
+
+Variáveis de ambiente suportadas:
+- `SPACY_MODEL`: modelo a carregar (por omissão `pt_core_news_sm`).
+- `SPACY_EXCLUDE`: componentes que não são carregados, separados por vírgulas (por omissão `parser,ner,senter`).
+- `SPACY_COMPONENTS`: se definida, só estes componentes ficam ativos (os restantes são carregados mas não correm).
+- `SPACY_BATCH_SIZE`: número de frases por lote em `pipe()` (por omissão 64).
+
+@code
+    import nlp_service as ns
+    print(ns.lemmas("comi as cebolas"))                   # lemas: comer, o, cebola
+    for doc in ns.pipe(["adiciona leite", "remove ovos"]):
+        print([token.lemma_ for token in doc])
+    print(ns.pipe_names())                                # sem 'parser' nem 'ner'
+@endcode
+
+@note É necessário instalar o spaCy e o modelo de linguagem português:
+    - pip install spacy
+    - python -m spacy download pt_core_news_sm
+"""
+import os
+import threading
+
+## @var MODEL
+# @brief Nome do modelo spaCy a carregar.
+MODEL = os.environ.get("SPACY_MODEL", "pt_core_news_sm")
+
+## @var EXCLUDE
+# @brief Componentes do modelo que não são carregados (a aplicação não usa a análise sintática nem as entidades).
+EXCLUDE = [name for name in os.environ.get("SPACY_EXCLUDE", "parser,ner,senter").split(",") if name.strip()]
+
+## @var COMPONENTS
+# @brief Componentes ativos; None para ativar todos os que foram carregados.
+COMPONENTS = [name for name in os.environ.get("SPACY_COMPONENTS", "").split(",") if name.strip()] or None
+
+## @var BATCH_SIZE
+# @brief Número de frases processadas por lote em `pipe()`.
+BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", 64))
+
+_nlp = None
+_lock = threading.Lock()
+
+
+def configure(model=None, exclude=None, components=None):
+    """
+    @brief Muda o modelo ou os componentes usados; o novo modelo é carregado na próxima utilização.
+
+    @param model Nome do modelo spaCy; None para manter o atual.
+    @param exclude Lista de componentes a não carregar; None para manter a atual.
+    @param components Lista de componentes ativos; None para manter a atual.
+    """
+    global MODEL, EXCLUDE, COMPONENTS, _nlp
+    with _lock:
+        MODEL = model or MODEL
+        EXCLUDE = list(exclude) if exclude is not None else EXCLUDE
+        COMPONENTS = list(components) if components is not None else COMPONENTS
+        _nlp = None
+
+
+def get_nlp():
+    """
+    @brief Devolve o modelo spaCy partilhado, carregando-o na primeira chamada.
+
+    @return <spacy.Language> Modelo `MODEL` sem os componentes de `EXCLUDE`.
+
+    @warning OSError Se o modelo não estiver instalado.
+    """
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                import spacy
+                nlp = spacy.load(MODEL, exclude=EXCLUDE)
+                if COMPONENTS is not None:
+                    nlp.select_pipes(enable=[name for name in COMPONENTS if name in nlp.pipe_names])
+                _nlp = nlp
+    return _nlp
+
+
+def is_loaded():
+    """
+    @brief Indica se o modelo já foi carregado neste processo.
+    """
+    return _nlp is not None
+
+
+def pipe_names():
+    """
+    @brief Componentes ativos do modelo (carrega-o se for preciso).
+    """
+    return list(get_nlp().pipe_names)
+
+
+def process(text):
+    """
+    @brief Processa uma frase.
+
+    @return <spacy.tokens.Doc> Documento com os tokens e os lemas da frase.
+    """
+    return get_nlp()(text)
+
+
+def pipe(texts, batch_size=None):
+    """
+    @brief Processa várias frases de uma vez com `nlp.pipe`.
+
+    @param texts Frases a processar.
+    @param batch_size Frases por lote; None para usar `BATCH_SIZE`.
+
+    @return <list> Um `Doc` por frase, pela mesma ordem.
+    """
+    return list(get_nlp().pipe(texts, batch_size=batch_size or BATCH_SIZE))
+
+
+def lemmas(text):
+    """
+    @brief Lemas das palavras de uma frase, em minúsculas.
+    """
+    return [token.lemma_.lower() for token in process(text)]
+
+
+def lemmas_many(texts, batch_size=None):
+    """
+    @brief Lemas das palavras de várias frases, processadas em lote (ver `pipe()`).
+
+    @return <list> Uma lista de lemas por frase, pela mesma ordem.
+    """
+    return [[token.lemma_.lower() for token in doc] for doc in pipe(texts, batch_size)]
@@ -0,0 +1,319 @@
+"""
+@brief Módulo "o que posso cozinhar agora": ordena as receitas pelo que existe na despensa.
+
+Cruza os ingredientes das receitas do `recipe_catalog` com o stock da despensa (`stock_details`) e devolve as
+receitas mais bem cobertas, com a lista dos ingredientes em falta. Ingredientes prestes a expirar dão um bónus
+às receitas que os usam, para que sejam gastos primeiro.
+
+@details Estruturas pré-calculadas (NumPy), reconstruídas só quando o catálogo de receitas muda:
+- `required`: matriz receitas x ingredientes com a quantidade pedida por cada receita, na unidade base
+  (gramas, via `pantrydb_queries.converter.convert_array`, com a densidade de cada ingrediente); NaN quando a
+  quantidade não é convertível ("q.b.", "dentes").
+- `needed`: máscara booleana dos ingredientes usados por cada receita.
+
+Cada coluna é um ingrediente canónico (`ingredients.ingredient_key()`), por isso "batatas" na despensa cobre
+"batata" nas receitas.
+
+Estado da despensa, por coluna (ingrediente):
+- `available`: quantidade disponível em gramas; `present`: existe stock sem quantidade convertível.
+- `urgency`: 0 a 1, cresce à medida que a validade mais próxima se aproxima (`EXPIRY_HORIZON_DAYS`).
+- `coverage`: matriz receitas x ingredientes com a fração coberta (0 a 1) e as somas por receita.
+
+Quando o stock muda (`pantrydb_queries.notifyChange`), os nomes alterados são apenas registados; na pontuação
+seguinte só esses itens são relidos da base de dados e só as colunas afetadas de `coverage` são recalculadas.
+A pontuação de todas as receitas é depois uma única operação vetorial sobre as somas por receita.
+
+@code
+    import pantry_matcher as pm
+    for suggestion in pm.suggest(limit=3):
+        print(suggestion['name'], suggestion['coverage'], suggestion['missing'])
+@endcode
+
+@note Precisa da biblioteca `numpy`:
+- pip install numpy
+"""
+import datetime
+import threading
+from decimal import Decimal
+
+import numpy as np
+
+import pantrydb_queries as pdb
+import recipe_catalog as rc
+from ingredients import ingredient_key
+
+## @var BASE_UNIT
+# @brief Unidade para a qual todas as quantidades são convertidas antes de serem comparadas.
+BASE_UNIT = "g"
+
+## @var EXPIRY_HORIZON_DAYS
+# @brief Dias antes da validade a partir dos quais um ingrediente começa a dar bónus às receitas que o usam.
+EXPIRY_HORIZON_DAYS = 7
+
+## @var EXPIRY_WEIGHT
+# @brief Peso do bónus de validade na pontuação (a cobertura vale no máximo 1).
+EXPIRY_WEIGHT = 0.25
+
+## @var DEFAULT_LIMIT
+# @brief Número de sugestões devolvidas por omissão.
+DEFAULT_LIMIT = 5
+
+
+def to_base_unit(quantity, unit, ingredient=None):
+    """
+    @brief Converte uma quantidade para a unidade base (gramas).
+
+    @param quantity Quantidade (Decimal, int, float ou string).
+    @param unit Unidade da quantidade.
+    @param ingredient Nome do ingrediente, para converter volumes com a sua densidade.
+
+    @return <float> Quantidade em gramas, ou None se não houver quantidade ou conversão possível.
+    """
+    if quantity is None or not unit:
+        return None
+    try:
+        converted, _ = pdb.converter.convert(Decimal(str(quantity)), unit, BASE_UNIT, ingredient)
+        return float(converted)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def _to_base_units(quantities, units, ingredients):
+    # One vectorized conversion for a whole batch; NaN -> None like to_base_unit()
+    grams = pdb.converter.convert_array(quantities, units, BASE_UNIT, ingredients)
+    return [None if np.isnan(g) else float(g) for g in grams]
+
+
+class PantryMatcher:
+    """
+    @brief Matriz de requisitos das receitas e cobertura pela despensa atual.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._dirty = None  # set of changed stock names, or None when the whole pantry must be reloaded
+        self._stock = {}    # stock name (lower case) -> (ingredient key, grams, has unmeasured stock, earliest expiration)
+
+    # ------------------------------------------------------------------ recipe side (rebuilt with the catalog)
+
+    def _build(self, snapshot):
+        columns = {}
+        rows = []
+        ingredients = [i for recipe in snapshot.recipes.values() for i in recipe.ingredients]
+        converted = iter(_to_base_units([i['quantity'] for i in ingredients], [i['unit'] for i in ingredients],
+                                        [i['name'] for i in ingredients]))
+        for recipe in snapshot.recipes.values():
+            needs = {}
+            for ingredient in recipe.ingredients:
+                grams = next(converted)
+                key = ingredient_key(ingredient['name'])
+                if not key:
+                    continue
+                col = columns.setdefault(key, len(columns))
+                previous = needs.get(col)
+                if previous is not None and grams is not None and not np.isnan(previous):
+                    grams += previous
+                needs[col] = np.nan if grams is None else grams
+            rows.append((recipe, needs))
+
+        self.recipes = [recipe for recipe, _ in rows]
+        self.columns = columns
+        self.column_names = list(columns)
+        self.required = np.zeros((len(rows), len(columns)))
+        self.needed = np.zeros((len(rows), len(columns)), dtype=bool)
+        for r, (_, needs) in enumerate(rows):
+            for col, grams in needs.items():
+                self.required[r, col] = grams
+                self.needed[r, col] = True
+        self.needed_count = np.maximum(self.needed.sum(axis=1), 1)
+
+        # Stock names map to every column whose name contains all of their words ("chocolate" -> "chocolate negro")
+        self._word_columns = {}
+        for key, col in columns.items():
+            for word in key.split():
+                self._word_columns.setdefault(word, set()).add(col)
+        self._stock_columns = {}
+
+        self.available = np.zeros(len(columns))
+        self.present = np.zeros(len(columns), dtype=bool)
+        self.urgency = np.zeros(len(columns))
+        self.coverage = np.zeros(self.required.shape)
+        self.urgent_coverage = np.zeros(self.required.shape)
+        self.coverage_sum = np.zeros(len(rows))
+        self.urgent_sum = np.zeros(len(rows))
+        self._snapshot = snapshot
+        self._dirty = None
+
+    def _columns_for(self, stock_key):
+        columns = self._stock_columns.get(stock_key)
+        if columns is None:
+            words = stock_key.split()
+            if stock_key in self.columns:
+                columns = {self.columns[stock_key]}
+            elif words:
+                columns = set.intersection(*(self._word_columns.get(word, set()) for word in words))
+            else:
+                columns = set()
+            self._stock_columns[stock_key] = columns
+        return columns
+
+    # ------------------------------------------------------------------ pantry side (updated per column)
+
+    def pantry_changed(self, names=None):
+        """
+        @brief Regista que o stock mudou; o recálculo é feito na próxima pontuação.
+
+        @param names Nomes dos itens alterados, ou None se todo o stock foi alterado.
+        """
+        with self._lock:
+            if names is None or self._dirty is None:
+                self._dirty = None
+            else:
+                self._dirty.update(names)
+
+    def _reload_stock(self, today):
+        if self._dirty is None:
+            rows = pdb.getStockRows()
+            if rows is None:
+                return
+            changed_keys = {key for key, *_ in self._stock.values()}
+            self._stock = {}
+        else:
+            if not self._dirty:
+                return
+            rows = pdb.getStockRows(sorted(self._dirty))
+            if rows is None:
+                return
+            # Only the changed items are dropped: "batatas" and "batata" share a column but not an entry
+            changed_keys = {ingredient_key(name) for name in self._dirty}
+            for name in self._dirty:
+                self._stock.pop(name.lower(), None)
+
+        converted_rows = _to_base_units([r[1] for r in rows], [r[2] for r in rows], [r[0] for r in rows])
+        for (name, quantity, unit, expiration_date), converted in zip(rows, converted_rows):
+            key = ingredient_key(name)
+            changed_keys.add(key)
+            _, grams, unmeasured, expires = self._stock.get(name.lower(), (key, 0.0, False, None))
+            if converted is None:
+                unmeasured = True
+            else:
+                grams += converted
+            if expiration_date is not None and (expires is None or expiration_date < expires):
+                expires = expiration_date
+            self._stock[name.lower()] = (key, grams, unmeasured, expires)
+        self._dirty = set()
+
+        affected = set()
+        for key in changed_keys:
+            affected.update(self._columns_for(key))
+        self._update_columns(sorted(affected), today)
+
+    def _update_columns(self, cols, today):
+        if not cols:
+            return
+        for col in cols:
+            self.available[col] = 0.0
+            self.present[col] = False
+            self.urgency[col] = 0.0
+        for key, grams, unmeasured, expires in self._stock.values():
+            for col in self._columns_for(key).intersection(cols):
+                self.available[col] += grams
+                self.present[col] |= unmeasured or grams > 0
+                if expires is not None:
+                    days = (expires - today).days
+                    urgency = min(max(1.0 - days / EXPIRY_HORIZON_DAYS, 0.0), 1.0)
+                    self.urgency[col] = max(self.urgency[col], urgency)
+
+        cols = np.array(cols)
+        required = self.required[:, cols]
+        available = self.available[cols]
+        present = self.present[cols]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            measured = np.minimum(available / required, 1.0)
+        # Unmeasurable amounts ("q.b.") or stock without a convertible unit count as covered when present
+        unmeasured = np.isnan(required) | (present & (available == 0))
+        coverage = np.where(unmeasured, present.astype(float), np.nan_to_num(measured))
+        coverage = np.where(self.needed[:, cols], coverage, 0.0)
+        urgent = coverage * self.urgency[cols]
+
+        self.coverage_sum += coverage.sum(axis=1) - self.coverage[:, cols].sum(axis=1)
+        self.urgent_sum += urgent.sum(axis=1) - self.urgent_coverage[:, cols].sum(axis=1)
+        self.coverage[:, cols] = coverage
+        self.urgent_coverage[:, cols] = urgent
+
+    # ------------------------------------------------------------------ scoring
+
+    def _refresh(self):
+        snapshot = rc.catalog.snapshot()
+        if snapshot is None:
+            return False
+        today = datetime.date.today()
+        if snapshot is not self._snapshot:
+            self._build(snapshot)
+            self._last_day = today
+        elif today != getattr(self, "_last_day", today):
+            # Urgency depends on the date: a new day reloads the whole pantry
+            self._dirty = None
+            self._last_day = today
+        self._reload_stock(today)
+        return True
+
+    def suggest(self, limit=DEFAULT_LIMIT, min_coverage=0.0):
+        """
+        @brief Receitas mais bem cobertas pela despensa atual.
+
+        @param limit Número máximo de sugestões.
+        @param min_coverage Cobertura mínima (0 a 1) para uma receita ser sugerida.
+
+        @return <list> Lista de dicionários {'recipe_id', 'name', 'score', 'coverage', 'missing', 'expiring'}:
+        - `coverage`: fração média dos ingredientes coberta pela despensa.
+        - `missing`: ingredientes em falta ou insuficientes, com a quantidade pedida pela receita.
+        - `expiring`: ingredientes da receita que estão perto da validade.
+        """
+        with self._lock:
+            if not self._refresh() or not self.recipes:
+                return []
+            coverage = self.coverage_sum / self.needed_count
+            score = coverage + EXPIRY_WEIGHT * self.urgent_sum / self.needed_count
+            candidates = np.flatnonzero(coverage >= min_coverage)
+            if len(candidates) > limit:
+                top = np.argpartition(-score[candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            order = candidates[np.argsort(-score[candidates], kind="stable")]
+
+            suggestions = []
+            for r in order:
+                recipe = self.recipes[r]
+                missing = []
+                expiring = []
+                for ingredient in recipe.ingredients:
+                    col = self.columns.get(ingredient_key(ingredient['name']))
+                    if col is None:
+                        continue
+                    if self.coverage[r, col] < 1.0:
+                        missing.append(dict(ingredient, coverage=round(float(self.coverage[r, col]), 2)))
+                    if self.coverage[r, col] > 0 and self.urgency[col] > 0:
+                        expiring.append(ingredient['name'])
+                suggestions.append({
+                    'recipe_id': recipe.recipe_id,
+                    'name': recipe.name,
+                    'score': round(float(score[r]), 3),
+                    'coverage': round(float(coverage[r]), 3),
+                    'missing': missing,
+                    'expiring': expiring,
+                })
+            return suggestions
+
+
+## @var matcher
+# @brief Matcher partilhado pelo processo, avisado pelo `pantrydb_queries` sempre que o stock muda.
+matcher = PantryMatcher()
+pdb.addChangeListener(matcher.pantry_changed)
+
+
+def suggest(limit=DEFAULT_LIMIT, min_coverage=0.0):
+    """
+    @brief Sugere receitas com o que existe na despensa. Ver `PantryMatcher.suggest()`.
+    """
+    return matcher.suggest(limit, min_coverage)
@@ -7,11 +7,25 @@ As operações são realizadas assumindo que todos os itens podem ser convertido
 no sistema métrico e algumas unidades não-padrão com base em fatores de conversão predefinidos.
 
 @details As principais funções do módulo incluem:
-- `connectDatabase()`: Conecta-se à base de dados MySQL.
-- `insertStock()`, `removeStock()`: Funções para inserir e remover itens da despensa.
-- `getStockDetails()`, `searchStock()`: Funções para procurar detalhes dos itens armazenados.
-- `convert_measure()`: Converte quantidades entre diferentes unidades de medida usando fatores de conversão.
+- `connectDatabase()`: Obtém uma conexão à base de dados MySQL a partir do pool partilhado (`db_pool`).
+- `insertStockBulk()`: Insere uma lista de itens de uma vez (sessões de leitura de códigos de barras, povoamento).
+- `insertStock()`, `removeStock()`: Funções para inserir e remover itens da despensa; a remoção consome os lotes
+  por ordem de validade numa única transação (`planConsumption()`).
+- `getStockLots()`, `iterStockLots()`: Lotes em stock estruturados, paginados por chave e com filtros.
+- `getStockDetails()`, `searchStock()`: Funções para procurar detalhes dos itens armazenados (`getStockDetails()`
+  devolve o formato de texto antigo de `/pantry/stock?format=legacy`).
+- `getStockRows()`: Linhas de stock sem formatação, para caches em memória.
+- `getStockTotal()`: Totais por item (quantidade na unidade base, número de lotes, validade mais próxima), mantidos
+  em `stock` a cada escrita (`refreshStockTotals()`) e servidos de uma cache em memória.
+- `getExpiringStock()`: Itens cuja validade termina nos próximos dias, agrupados e com totais convertidos.
+- `addChangeListener()`: Regista funções avisadas sempre que o stock muda.
+- `addEventListener()`: Regista funções que recebem os eventos detalhados de cada alteração (`change_feed`).
+- `convert_measure()`: Converte quantidades entre diferentes unidades de medida usando fatores de conversão
+  pré-compilados (`unit_conversion`).
 - `insertGrocery()`, `removeGrocery()`, `showAllGrocery()`: Gere uma lista de compras separada.
+- `insertGroceryBulk()`, `removeGroceryBulk()`: Acrescenta (ou atualiza) e remove vários itens da lista de compras
+  de uma vez, com `INSERT ... ON DUPLICATE KEY UPDATE`.
+- `addMissingIngredients()`: Acrescenta à lista de compras o que falta na despensa para uma receita.
 
 @code
     result = insertStock("Tomates", 5, "kg", "2025-12-01")
@@ -26,39 +40,113 @@ no sistema métrico e algumas unidades não-padrão com base em fatores de conve
 @see https://pypi.org/project/mysql-connector-python/
 
 """
-import mysql.connector
 from mysql.connector import Error
-from decimal import Decimal
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
+from datetime import date, timedelta
+import threading
+import db_pool
+import unit_conversion as uc
+import ingredients as ing
 
 def connectDatabase():
     """
     @brief Conecção à base de dados 'pantry_database'.
-    @details Tenta conectar-se à base de dados 'pantry_database' usando as credenciais fornecidas. 
-    Retorna o objeto de conexão e cursor se bem sucedido.
+    @details Empresta uma conexão do pool partilhado de 'pantry_database' (ver `db_pool`). 
+    Retorna o objeto de conexão e cursor se bem sucedido; `conn.close()` devolve a conexão ao pool.
     
     @return (conn, cursor) Tuplo contendo o objeto de conexão e o cursor se a conexão for bem sucedida, None caso contrário.
     
-    @note As credenciais de acesso à base de dados estão definidas no corpo da função e podem ser alteradas conforme necessário.
+    @note As credenciais de acesso à base de dados e o tamanho do pool são configurados no módulo `db_pool`.
     
     @warning Esta conecção não é segura e deve ser usada apenas para fins de demonstração e testes. 
     """
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='admin',
-            password='admin',
-            database='pantry_database'
-        )
-        if conn.is_connected():
-            cursor = conn.cursor()
-            print("Connected to pantry database")
-            return conn, cursor
+        conn = db_pool.get_connection('pantry_database')
+        cursor = conn.cursor()
+        print("Connected to pantry database")
+        return conn, cursor
     except Error as e:
         print(e)
         print("Failed to connect to pantry database")
         return None, None
         
 
+## @var change_listeners
+# @brief Funções chamadas depois de cada alteração ao stock, com a lista de nomes alterados (None = todo o stock).
+# @details Permite que caches em memória (por exemplo o `pantry_matcher`) se atualizem só para os itens alterados.
+change_listeners = []
+
+def addChangeListener(callback):
+    """
+    @brief Regista uma função a chamar sempre que o stock da despensa muda.
+    
+    @param callback Função que recebe a lista de nomes alterados, ou None quando todo o stock foi alterado.
+    """
+    if callback not in change_listeners:
+        change_listeners.append(callback)
+
+def notifyChange(names=None):
+    """
+    @brief Avisa as funções registadas de que o stock mudou.
+    
+    @param names <list> Nomes dos itens alterados, ou None se todo o stock foi alterado.
+    """
+    invalidateStockTotals(names)
+    for callback in list(change_listeners):
+        try:
+            callback(names)
+        except Exception as e:
+            print(f"Error notifying pantry change listener: {e}")
+
+## @var event_listeners
+# @brief Funções chamadas com a lista de eventos de cada alteração à despensa ou à lista de compras.
+# @details Os eventos são dicionários com o tipo ('lot_added', 'lot_changed', 'lot_removed', 'item_emptied',
+# 'stock_cleared', 'grocery_added', 'grocery_removed', 'grocery_cleared') e os dados alterados (ver `change_feed`).
+event_listeners = []
+
+def addEventListener(callback):
+    """
+    @brief Regista uma função a chamar com os eventos de cada alteração (por exemplo o `change_feed`).
+    
+    @param callback Função que recebe uma lista de dicionários de eventos.
+    """
+    if callback not in event_listeners:
+        event_listeners.append(callback)
+
+def publishEvents(events):
+    """
+    @brief Entrega eventos de alteração às funções registadas.
+    
+    @param events <list> Dicionários de eventos, pela ordem em que as alterações aconteceram.
+    """
+    if not events:
+        return
+    for callback in list(event_listeners):
+        try:
+            callback(events)
+        except Exception as e:
+            print(f"Error notifying pantry event listener: {e}")
+
+def lotEvent(event_type, lot_id, name, quantity=None, unit=None, expiration_date=None):
+    """
+    @brief Constrói um evento de alteração de um lote de stock, com valores prontos para JSON.
+    """
+    event = {'type': event_type, 'lot_id': lot_id, 'name': name}
+    if event_type == 'lot_removed':
+        return event
+    event['quantity'] = float(quantity) if quantity is not None else None
+    if event_type == 'lot_added':
+        event['unit'] = unit
+        event['expiration_date'] = str(expiration_date) if expiration_date is not None else None
+    return event
+
+def groceryEvent(name, quantity=None, unit=None):
+    """
+    @brief Constrói um evento 'grocery_added' (item acrescentado ou atualizado na lista de compras).
+    """
+    return {'type': 'grocery_added', 'name': name,
+            'quantity': float(quantity) if quantity is not None else None, 'unit': unit}
+
 ## @var conversion_factors
 # @brief Dicionário de fatores de conversão para unidades de volume e peso.
 # @details Este dicionário contém fatores de conversão para unidades de volume e peso,
@@ -99,49 +187,189 @@ conversion_factors = {
 
 # ---------------------------------------------------------------------------------------------- [CONVERT MEASURE]
 
+## @var converter
+# @brief Tabela de conversões compilada a partir de `conversion_factors` (ver `unit_conversion.UnitConverter`).
+converter = uc.UnitConverter(conversion_factors)
+
 # Convert a quantity from one unit to another using a dictionary of conversion factors 
-def convert_measure(quantity, from_unit, to_unit, conversion_factors):
+def convert_measure(quantity, from_unit, to_unit, conversion_factors, ingredient=None):
     """
     @brief Convert Uma quantidade de uma unidade para outra.
-    @details Converte uma quantidade de uma unidade para outra, usando um dicionário de fatores de conversão. 
-    Trata casos diretos e requer conversões recursivas se necessário.
+    @details Converte uma quantidade de uma unidade para outra com a tabela de fatores pré-compilada `converter`,
+    sem percorrer o grafo de conversões em cada chamada. As unidades são normalizadas (plurais e sinónimos).
     
     @param quantity <int> Quantidade a ser convertida.
     @param from_unit <string> Unidade inicial.
     @param to_unit <string> Unidade final.
     @param conversion_factors <dict> Dicionário contendo os fatores de conversão.
+    @param ingredient <string> Nome do ingrediente (opcional), para usar a sua densidade entre massa e volume.
     
     @return <tuplo> contendo a quantidade convertida e a unidade final.
     
-    @note Funcção usada para podermos subtrair/adicionar quantidades em unidades diferentes do mesmo produto
+    @note Funcção usada para podermos subtrair/adicionar quantidades em unidades diferentes do mesmo produto.
+    Um dicionário diferente de `conversion_factors` é compilado na própria chamada.
     
     @warning ValueError Se não encontrar um caminho de conversão válido.
     """
-    from_unit = from_unit.lower().strip('s')  # Normalize the from_unit name
-    to_unit = to_unit.lower().strip('s')  # Normalize the to_unit name
-
-    def find_conversion(current_quantity, current_unit, target_unit, visited_units=set()):
-        # Direct conversion case
-        if target_unit in conversion_factors[current_unit]:
-            return current_quantity * conversion_factors[current_unit][target_unit], target_unit
-
-        # Recursive conversion case: find a path through an intermediary
-        for intermediate_unit in conversion_factors[current_unit]:
-            if intermediate_unit not in visited_units:  # Avoid cycles
-                visited_units.add(intermediate_unit)
-                intermediate_quantity = current_quantity * conversion_factors[current_unit][intermediate_unit]
-                # Recursively convert from intermediate unit to target unit
-                result = find_conversion(intermediate_quantity, intermediate_unit, target_unit, visited_units)
-                if result:
-                    return result
+    table = converter if conversion_factors is converter.conversion_factors else uc.UnitConverter(conversion_factors)
+    return table.convert(quantity, from_unit, to_unit, ingredient)
+
+## @var BASE_UNITS
+# @brief Unidade base inteira de cada item: miligramas para massa e microlitros para volume.
+# @details Cada lote guarda, além da quantidade na unidade original (para mostrar), a quantidade inteira na
+# unidade base do item (`stock.base_unit`, `stock_details.base_quantity`). Somas e comparações de stock passam a
+# ser `SUM` em SQL e operações entre inteiros. O valor é a unidade métrica a partir da qual a base é calculada.
+BASE_UNITS = {'mg': uc.MASS_UNIT, 'ul': uc.VOLUME_UNIT}
+
+## @var BASE_SCALE
+# @brief Número de unidades base por unidade métrica (1 g = 1000 mg, 1 ml = 1000 µl).
+BASE_SCALE = Decimal(1000)
+
+def baseUnit(unit):
+    """
+    @brief Unidade base de um item cujo lote está na unidade dada.
+    
+    @return <string> 'mg' para unidades de massa, 'ul' para unidades de volume, ou None se a unidade não tiver conversão.
+    """
+    dimension = converter.dimensions.get(converter.normalize(unit)) if unit else None
+    return {'mass': 'mg', 'volume': 'ul'}.get(dimension)
+
+def toBaseQuantity(quantity, unit, base_unit, name=None):
+    """
+    @brief Converte uma quantidade para a unidade base inteira de um item.
+    
+    @param quantity Quantidade na unidade `unit`.
+    @param unit <string> Unidade da quantidade.
+    @param base_unit <string> Unidade base do item ('mg' ou 'ul').
+    @param name <string> Nome do item, para usar a sua densidade entre massa e volume.
+    
+    @return <int> Quantidade em unidades base (arredondada), ou None se não houver conversão.
+    """
+    factor = converter.factor(unit, BASE_UNITS[base_unit], name) if base_unit in BASE_UNITS and unit else None
+    if factor is None or quantity is None:
         return None
+    return int((Decimal(str(quantity)) * factor * BASE_SCALE).to_integral_value(ROUND_HALF_UP))
 
-    # Start the conversion process
-    result = find_conversion(quantity, from_unit, to_unit)
-    if result:
-        return result
-    else:
-        raise ValueError("No valid conversion path found from {} to {}".format(from_unit, to_unit))
+def fromBaseQuantity(base_quantity, base_unit, unit, name=None):
+    """
+    @brief Converte uma quantidade em unidades base de volta para uma unidade de apresentação.
+    
+    @return <Decimal> Quantidade na unidade `unit`, ou None se não houver conversão.
+    """
+    factor = converter.factor(BASE_UNITS[base_unit], unit, name) if base_unit in BASE_UNITS and unit else None
+    if factor is None or base_quantity is None:
+        return None
+    return Decimal(base_quantity) / BASE_SCALE * factor
+
+# ---------------------------------------------------------------------------------------------- [STOCK TOTALS]
+
+## @var STOCK_TOTALS_UPDATE
+# @brief Recalcula as colunas de totais de `stock` (migração 0006) a partir dos lotes de cada item.
+# @details `{details}` e `{items}` são substituídos pelo filtro dos itens afetados (vazios para todo o stock).
+# Cada item é recalculado com uma leitura por intervalo do índice (stock_id, expiration_date), por isso os totais
+# nunca ficam desfasados dos lotes, mesmo depois de remoções parciais.
+STOCK_TOTALS_UPDATE = """
+UPDATE stock s
+LEFT JOIN (
+    SELECT sd.stock_id, SUM(sd.base_quantity) AS total_base_quantity, COUNT(*) AS lot_count,
+        COUNT(*) - COUNT(sd.base_quantity) AS unconverted_lots, MIN(sd.expiration_date) AS earliest_expiration
+    FROM stock_details sd
+    {details}
+    GROUP BY sd.stock_id
+) t ON t.stock_id = s.stock_id
+SET s.total_base_quantity = t.total_base_quantity,
+    s.lot_count = COALESCE(t.lot_count, 0),
+    s.unconverted_lots = COALESCE(t.unconverted_lots, 0),
+    s.earliest_expiration = t.earliest_expiration,
+    s.display_unit = (SELECT oldest.unit FROM stock_details oldest WHERE oldest.stock_id = s.stock_id
+                      ORDER BY oldest.detail_id LIMIT 1)
+{items}
+"""
+
+def refreshStockTotals(cursor, stock_ids=None):
+    """
+    @brief Atualiza os totais por item (`stock.total_base_quantity`, `lot_count`, `earliest_expiration`, ...).
+    @details Chamada por todas as funções que alteram lotes, na mesma transação e antes do commit. Não faz commit.
+    
+    @param cursor Cursor de uma transação aberta.
+    @param stock_ids IDs dos itens alterados; None para todo o stock.
+    """
+    if stock_ids is None:
+        cursor.execute(STOCK_TOTALS_UPDATE.format(details="", items=""))
+        return
+    stock_ids = sorted(set(stock_ids))
+    if not stock_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(stock_ids))
+    cursor.execute(STOCK_TOTALS_UPDATE.format(details=f"WHERE sd.stock_id IN ({placeholders})",
+                                              items=f"WHERE s.stock_id IN ({placeholders})"),
+                   (*stock_ids, *stock_ids))
+
+## @var stock_totals
+# @brief Cache em memória dos totais por item (nome em minúsculas -> dicionário, ou None se o item não existir).
+# @details Preenchida na primeira consulta de cada item e invalidada por `notifyChange()` depois de cada escrita,
+# por isso "tenho X?" é uma consulta a um dicionário, qualquer que seja o número de lotes do item.
+stock_totals = {}
+_stock_totals_lock = threading.Lock()
+_stock_totals_generation = 0
+
+def invalidateStockTotals(names=None):
+    """
+    @brief Remove itens da cache `stock_totals`.
+    
+    @param names <list> Nomes dos itens alterados, ou None para limpar toda a cache.
+    """
+    global _stock_totals_generation
+    with _stock_totals_lock:
+        _stock_totals_generation += 1
+        if names is None:
+            stock_totals.clear()
+        else:
+            for name in names:
+                stock_totals.pop(name.lower(), None)
+
+def getStockTotal(name):
+    """
+    @brief Totais de um item em stock, a partir da cache `stock_totals`.
+    
+    @param name <string> Nome do item.
+    
+    @return <dict> {'stock_id', 'name', 'base_unit', 'total_base_quantity', 'lots', 'unconverted_lots',
+    'earliest_expiration', 'unit'}, em que 'unit' é a unidade do lote mais antigo (para mostrar); None se o item
+    não existir.
+    
+    @warning mysql.connector.Error Se a consulta falhar.
+    """
+    key = name.lower()
+    with _stock_totals_lock:
+        if key in stock_totals:
+            return stock_totals[key]
+        generation = _stock_totals_generation
+
+    conn, cursor = connectDatabase()
+    if conn is None or cursor is None:
+        raise Error("Failed to connect to the database.")
+    try:
+        cursor.execute("""
+        SELECT stock_id, name, base_unit, total_base_quantity, lot_count, unconverted_lots, earliest_expiration, display_unit
+        FROM stock
+        WHERE name = %s
+        ORDER BY stock_id
+        LIMIT 1
+        """, (name,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    entry = None
+    if row:
+        entry = dict(zip(('stock_id', 'name', 'base_unit', 'total_base_quantity', 'lots', 'unconverted_lots',
+                          'earliest_expiration', 'unit'), row))
+    with _stock_totals_lock:
+        # A write committed while reading: the row may already be stale, so do not cache it
+        if generation == _stock_totals_generation:
+            stock_totals[key] = entry
+    return entry
 
 # ---------------------------------------------------------------------------------------------- [STOCK List]
 
@@ -187,30 +415,36 @@ def insertStock(name, quantity, unit, expiration_date):
     conn, cursor = connectDatabase()
     if conn is not None and cursor is not None:
         try:
-            cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
+            cursor.execute("SELECT stock_id, base_unit FROM stock WHERE name = %s", (name,))
             stock_id_result = cursor.fetchone()
             if stock_id_result:
-                stock_id = stock_id_result[0]
+                stock_id, base_unit = stock_id_result
+                if base_unit is None and baseUnit(unit):
+                    # First lot with a convertible unit fixes the item's base unit
+                    base_unit = baseUnit(unit)
+                    cursor.execute("UPDATE stock SET base_unit = %s WHERE stock_id = %s", (base_unit, stock_id))
             else:
                 print(f"Stock item '{name}' does not exist in the database, inserting it now.")
-                cursor.execute("INSERT INTO stock (name) VALUES (%s)", (name,))
-                conn.commit()
+                base_unit = baseUnit(unit)
+                # Another request may have inserted the same name meanwhile: reuse its stock_id (uq_stock_name)
+                cursor.execute("""
+                INSERT INTO stock (name, base_unit, ingredient_id) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE stock_id = LAST_INSERT_ID(stock_id)
+                """, (name, base_unit, ing.resolve(name, unit)))
+                stock_id = cursor.lastrowid
                 print(f"Stock item '{name}' inserted successfully.")
-                
-                # Fetch the new stock_id for the just inserted item
-                cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-                new_stock_id_result = cursor.fetchone()
-                print(" STOCK ID FROM THE NEW ADDED PRODUCT",new_stock_id_result)
-                if new_stock_id_result:
-                    stock_id = new_stock_id_result[0]
-                else:
-                    print("Failed to fetch stock_id after insertion.")
-                    return
-
-            # Insert into stock_details
-            cursor.execute("INSERT INTO stock_details (stock_id, quantity, unit, expiration_date) VALUES (%s, %s, %s, %s)", (stock_id, quantity, unit, expiration_date))
+
+            # Insert into stock_details, with the quantity also in the item's integer base unit
+            base_quantity = toBaseQuantity(quantity, unit, base_unit, name)
+            cursor.execute(
+                "INSERT INTO stock_details (stock_id, quantity, unit, expiration_date, base_quantity) VALUES (%s, %s, %s, %s, %s)",
+                (stock_id, quantity, unit, expiration_date, base_quantity))
+            lot_id = cursor.lastrowid
+            refreshStockTotals(cursor, [stock_id])
             conn.commit()
             print(f"Stock item '{name}' with expiration date '{expiration_date}' inserted successfully in the PantryDB.")
+            notifyChange([name])
+            publishEvents([lotEvent('lot_added', lot_id, name, Decimal(str(quantity)), unit, expiration_date)])
         except Error as e:
             print(e)
             print(f"Failed to insert stock item '{name}'")
@@ -221,12 +455,177 @@ def insertStock(name, quantity, unit, expiration_date):
     else:
         print("Failed to connect to the database.")
 
+# Insert many stock items at once (scan sessions, seeding)
+def insertStockBulk(items):
+    """
+    @brief Insere vários itens no stock da despensa numa única transação.
+    @details Usa o índice único `uq_stock_name` (migração 0009); o lote inteiro usa um número constante de pedidos:
+    - um único `INSERT ... ON DUPLICATE KEY UPDATE` com todos os nomes cria os itens que faltam (e fixa a unidade base
+      dos que ainda não a tinham), sem janela para outra transação inserir o mesmo nome;
+    - uma consulta lê o `stock_id`, a unidade base e o ingrediente de todos os nomes; os itens ainda sem ingrediente
+      são ligados de uma vez;
+    - todas as linhas de `stock_details` são inseridas num único `INSERT ... RETURNING detail_id` e um único commit.
+    Os eventos `lot_added` são construídos a partir das linhas inseridas e dos IDs devolvidos pelo `RETURNING`.
+    
+    @note `INSERT ... RETURNING` precisa do MariaDB 10.5 ou posterior.
+    
+    Itens inválidos (campos em falta, quantidade ou data inválidas) são ignorados e reportados no resultado,
+    sem impedir a inserção dos restantes.
+    
+    @param items <list> Lista de dicionários {'name', 'quantity', 'unit', 'expiration_date'} (data "AAAA-MM-DD").
+    
+    @return <list> Um dicionário por item, pela mesma ordem: {'name', 'status': 'inserted', 'stock_id'} ou
+    {'name', 'status': 'error', 'error'}.
+    """
+    results = []
+    rows = []
+    for item in items:
+        name = (item.get('name') or '').strip() if isinstance(item, dict) else ''
+        if not name or not item.get('unit') or item.get('quantity') in (None, '') or not item.get('expiration_date'):
+            results.append({'name': name, 'status': 'error', 'error': "Missing required fields."})
+            continue
+        try:
+            quantity = Decimal(str(item['quantity']))
+            expiration_date = item['expiration_date']
+            if not isinstance(expiration_date, date):
+                expiration_date = date.fromisoformat(str(expiration_date))
+        except (ValueError, ArithmeticError):
+            results.append({'name': name, 'status': 'error', 'error': "Invalid quantity or expiration date."})
+            continue
+        results.append({'name': name, 'status': 'inserted'})
+        rows.append((len(results) - 1, name, quantity, item['unit'], expiration_date))
+    if not rows:
+        return results
+
+    conn, cursor = connectDatabase()
+    if conn is None or cursor is None:
+        for index, *_ in rows:
+            results[index] = {'name': results[index]['name'], 'status': 'error', 'error': "Failed to connect to the database."}
+        return results
+    try:
+        # The first lot with a convertible unit fixes the base unit of new items (and of items still without one)
+        first_units = {}
+        for _, name, _, unit, _ in rows:
+            if baseUnit(unit):
+                first_units.setdefault(name.lower(), baseUnit(unit))
+        names = sorted({name.lower(): name for _, name, *_ in reversed(rows)}.values())
+        cursor.executemany("""
+        INSERT INTO stock (name, base_unit) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE base_unit = COALESCE(base_unit, VALUES(base_unit))
+        """, [(name, first_units.get(name.lower())) for name in names])
+
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(f"SELECT stock_id, name, base_unit, ingredient_id FROM stock WHERE name IN ({placeholders})", names)
+        stock = {name.lower(): (stock_id, base_unit, ingredient_id)
+                 for stock_id, name, base_unit, ingredient_id in cursor.fetchall()}
+        unlinked = [name for name in names if stock[name.lower()][2] is None]
+        if unlinked:
+            units = {name: unit for _, name, _, unit, _ in reversed(rows)}
+            ingredient_ids = ing.resolve_many(unlinked, units)
+            cursor.executemany("UPDATE stock SET ingredient_id = %s WHERE stock_id = %s",
+                               [(ingredient_ids[name], stock[name.lower()][0]) for name in unlinked])
+
+        lot_values = []
+        for index, name, quantity, unit, expiration_date in rows:
+            stock_id, base_unit, _ = stock[name.lower()]
+            results[index]['stock_id'] = stock_id
+            base_quantity = toBaseQuantity(quantity, unit, base_unit, name)
+            lot_values.extend((stock_id, quantity, unit, expiration_date, base_quantity))
+        # RETURNING gives the id of every inserted lot, in the order of the VALUES list
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+        cursor.execute(f"""
+        INSERT INTO stock_details (stock_id, quantity, unit, expiration_date, base_quantity) VALUES {placeholders}
+        RETURNING detail_id
+        """, lot_values)
+        lot_ids = [detail_id for detail_id, in cursor.fetchall()]
+        new_lots = [(lot_id, name, quantity, unit, expiration_date)
+                    for lot_id, (_, name, quantity, unit, expiration_date) in zip(lot_ids, rows)]
+        refreshStockTotals(cursor, [stock_id for stock_id, *_ in stock.values()])
+        conn.commit()
+        print(f"Inserted {len(rows)} stock item(s) in the PantryDB.")
+        notifyChange(names)
+        publishEvents([lotEvent('lot_added', *lot) for lot in new_lots])
+    except Error as e:
+        conn.rollback()
+        print(e)
+        for index, *_ in rows:
+            results[index] = {'name': results[index]['name'], 'status': 'error', 'error': str(e)}
+    finally:
+        cursor.close()
+        conn.close()
+    return results
+
+## @var QUANTITY_STEP
+# @brief Precisão das quantidades guardadas em `stock_details.quantity` (DECIMAL(10, 2)).
+QUANTITY_STEP = Decimal('0.01')
+
+def planConsumption(lots, quantity, unit, name=None, base_unit=None):
+    """
+    @brief Calcula, em memória, quanto retirar de cada lote para consumir uma quantidade (FIFO).
+    @details Os lotes são consumidos pela ordem dada (a validade mais próxima primeiro). A quantidade pedida é
+    convertida uma única vez para a unidade base do item e comparada, em inteiros, com `base_quantity` de cada
+    lote; a quantidade que fica num lote parcialmente consumido mantém a unidade original do lote.
+    Se a unidade pedida não tiver conversão para a base do item, só são consumidos os lotes na mesma unidade.
+    
+    @param lots <list> Tuplos (detail_id, quantidade, unidade, quantidade base) pela ordem de consumo.
+    @param quantity <Decimal> Quantidade a retirar.
+    @param unit <string> Unidade da quantidade a retirar.
+    @param name <string> Nome do item, para usar a sua densidade nas conversões entre massa e volume.
+    @param base_unit <string> Unidade base do item ('mg' ou 'ul'), ou None.
+    
+    @return <tuplo> (deletes, updates, remaining): IDs dos lotes a apagar, tuplos (nova quantidade, nova quantidade
+    base, detail_id) dos lotes a atualizar e a quantidade que ficou por retirar, na unidade pedida.
+    """
+    needed = toBaseQuantity(quantity, unit, base_unit, name)
+    deletes = []
+    updates = []
+    if needed is None:
+        # No conversion to the base unit: consume only lots in the requested unit
+        unit = converter.normalize(unit)
+        remaining = Decimal(quantity).quantize(QUANTITY_STEP)
+        for detail_id, lot_quantity, lot_unit, lot_base in lots:
+            if remaining <= 0:
+                break
+            if converter.normalize(lot_unit) != unit:
+                continue
+            lot_quantity = Decimal(lot_quantity)
+            if remaining >= lot_quantity:
+                deletes.append(detail_id)
+                remaining -= lot_quantity
+            else:
+                updates.append((lot_quantity - remaining, lot_base, detail_id))
+                remaining = Decimal(0)
+        return deletes, updates, max(remaining, Decimal(0))
+
+    for detail_id, lot_quantity, lot_unit, lot_base in lots:
+        if needed <= 0:
+            break
+        if lot_base is None:
+            continue
+        if needed >= lot_base:
+            deletes.append(detail_id)
+            needed -= lot_base
+            continue
+        left = lot_base - needed
+        needed = 0
+        left_quantity = (Decimal(lot_quantity) * left / lot_base).quantize(QUANTITY_STEP)
+        if left_quantity > 0:
+            updates.append((left_quantity, left, detail_id))
+        else:
+            deletes.append(detail_id)
+    return deletes, updates, fromBaseQuantity(needed, base_unit, unit, name)
+
 # Remove [update] stock item from stock_details           
 def removeStock(name, quantity, unit):
     """
     @brief Remove ou atualiza a quantidade de um item.
-    @details Remove ou atualiza a quantidade de um item no stock baseado no nome e na quantidade especificada. 
-    Considera a conversão de unidades se necessário.
+    @details Consome a quantidade pedida dos lotes do item por ordem de validade (FIFO), numa única transação:
+    - uma consulta lê e bloqueia (`FOR UPDATE`) todos os lotes do item, ordenados pela validade;
+    - o consumo de cada lote é calculado em memória, em inteiros na unidade base do item (`planConsumption()`);
+    - os DELETE e UPDATE de todos os lotes afetados são aplicados com `executemany` e um único commit.
+    
+    O número de pedidos à base de dados é constante, qualquer que seja o número de lotes consumidos, e duas
+    remoções em simultâneo (voz e interface) do mesmo item ficam serializadas pelo bloqueio dos lotes.
     
     @param name <string> Nome do item a ser removido.
     @param quantity <string> Quantidade do item a ser removida.
@@ -235,69 +634,50 @@ def removeStock(name, quantity, unit):
     @return <string> Mensagem de sucesso ou falha.
     """
     conn, cursor = connectDatabase()
-    if conn is not None and cursor is not None:
-        try:
-            # Fetch stock_id using the name
-            cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-            stock_id_result = cursor.fetchone()
-            if stock_id_result:
-                stock_id = stock_id_result[0]
-                # Fetch the stock detail with the nearest expiration date for the given unit
-                cursor.execute("""
-                SELECT detail_id, quantity, unit
-                FROM stock_details
-                WHERE stock_id = %s
-                ORDER BY expiration_date ASC
-                LIMIT 1
-                """, (stock_id,))
-                stock_detail = cursor.fetchone()
-                            
-                if stock_detail:
-                    detail_id, stock_quantity, stock_unit = stock_detail
-                    print(f"Found stock detail for '{name}' with quantity {stock_quantity} {stock_unit} in stock_details.")
-                    # If the unit is diferent, convert the quantity to the same unit
-                    if stock_unit != unit:
-                        new_quantity, new_unit = convert_measure(quantity, unit, stock_unit, conversion_factors)
-                        print(f"Converted {quantity} {unit} to {new_quantity} {new_unit}.")
-                    else:
-                        new_quantity, new_unit = quantity, unit
-                        print(f"Units {new_quantity} {new_unit}.")
-                        
-                    if new_quantity == stock_quantity:
-                        # Delete the row if quantity to remove is equal to current quantity
-                        cursor.execute("DELETE FROM stock_details WHERE detail_id = %s", (detail_id,))
-                        print(f"Removed {stock_quantity} {new_unit} of '{name}' from stock_details.")
-                    elif new_quantity < stock_quantity:
-                        # Update the row with the new quantity
-                        updated_quantity = Decimal(stock_quantity) - Decimal(new_quantity)
-                        print(f"Removing {new_quantity} {new_unit} of '{name}' from stock_details.")
-                        print(f"New quantity will be {updated_quantity} {stock_unit}.")
-                        cursor.execute("UPDATE stock_details SET quantity = %s WHERE detail_id = %s", (updated_quantity, detail_id))
-                        print(f"Updated '{name}' quantity to {updated_quantity} {stock_unit} in stock_details.")
-                    elif new_quantity > stock_quantity:
-                        # Search if there is another stock detail with the same name and that we could remove too
-                        cursor.execute("DELETE FROM stock_details WHERE detail_id = %s", (detail_id,))
-                        conn.commit()
-                        print(f"Removed {stock_quantity} {new_unit} of '{name}' from stock_details.")
-                        updated_quantity = Decimal(new_quantity) - Decimal(stock_quantity)
-                        print(f"Searching for another stock in order to remove the remaining {updated_quantity} {new_unit} of '{name}' from stock_details.")
-                        # Fetch the stock detail with the nearest expiration date for the given unit
-                        removeStock(name, updated_quantity, stock_unit)
-                        
-                    conn.commit()
-                else:
-                    print(f"No stock detail found for '{name}' with unit '{unit}'.")
-            else:
-                print(f"Stock item '{name}' does not exist in the database.")
-        except Error as e:
-            print(e)
-            print(f"Failed to remove stock item '{name}'")
-        finally:
-            cursor.close()
-            conn.close()
-            print("Connection closed.")
-    else:
-        print("Failed to connect to the database.")
+    if conn is None or cursor is None:
+        return "Failed to connect to the database."
+    try:
+        # Lots without an expiration date are consumed last
+        cursor.execute("""
+        SELECT sd.detail_id, sd.quantity, sd.unit, sd.base_quantity, s.base_unit, s.stock_id
+        FROM stock s
+        JOIN stock_details sd ON sd.stock_id = s.stock_id
+        WHERE s.name = %s
+        ORDER BY sd.expiration_date IS NULL, sd.expiration_date, sd.detail_id
+        FOR UPDATE
+        """, (name,))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return f"No stock found for '{name}'."
+
+        lots = [row[:4] for row in rows]
+        base_unit = next((row[4] for row in rows if row[4]), None)
+        deletes, updates, remaining = planConsumption(lots, quantity, unit, name, base_unit)
+        if deletes:
+            cursor.executemany("DELETE FROM stock_details WHERE detail_id = %s", [(d,) for d in deletes])
+        if updates:
+            cursor.executemany("UPDATE stock_details SET quantity = %s, base_quantity = %s WHERE detail_id = %s", updates)
+        if deletes or updates:
+            refreshStockTotals(cursor, {row[5] for row in rows})
+        conn.commit()
+        if deletes or updates:
+            notifyChange([name])
+            publishEvents([lotEvent('lot_removed', detail_id, name) for detail_id in deletes] +
+                          [lotEvent('lot_changed', detail_id, name, new_quantity) for new_quantity, _, detail_id in updates])
+
+        message = f"Removed {quantity} {unit} of '{name}' ({len(deletes)} lot(s) emptied, {len(updates)} updated)."
+        if remaining > 0:
+            message += f" {remaining.quantize(QUANTITY_STEP)} {unit} could not be removed: not enough stock."
+        print(message)
+        return message
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return f"Failed to remove stock item '{name}'"
+    finally:
+        cursor.close()
+        conn.close()
 
 # Get all stock details
 def getStockDetails():
@@ -332,51 +712,235 @@ def getStockDetails():
     else:
         return None
 
+## @var STOCK_PAGE_SIZE
+# @brief Número de lotes por página em `getStockLots()` quando não é indicado outro limite.
+STOCK_PAGE_SIZE = 100
+
+# Get one page of stock lots as structured rows (keyset pagination on the lot id)
+def getStockLots(after=None, limit=STOCK_PAGE_SIZE, name_prefix=None, unit=None, expires_after=None, expires_before=None):
+    """
+    @brief Procura uma página de lotes em stock, já estruturados, com filtros opcionais.
+    @details A paginação é feita por chave (keyset) sobre o ID do lote: cada página começa depois do último ID da
+    anterior, por isso o custo de uma página não depende de quantas páginas vêm antes (ao contrário de OFFSET).
+    
+    @param after <int> ID do último lote da página anterior; None para a primeira página.
+    @param limit <int> Número máximo de lotes da página.
+    @param name_prefix <string> Só itens cujo nome começa por este texto.
+    @param unit <string> Só lotes nesta unidade.
+    @param expires_after <date> Só lotes com validade nesta data ou depois.
+    @param expires_before <date> Só lotes com validade nesta data ou antes.
+    
+    @return <list> Lista de dicionários {'lot_id', 'name', 'quantity', 'unit', 'expiration_date'} por ordem de
+    `lot_id` (data no formato ISO), ou None se ocorrer um erro.
+    """
+    conditions = []
+    params = []
+    if after is not None:
+        conditions.append("sd.detail_id > %s")
+        params.append(after)
+    if name_prefix:
+        escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append("s.name LIKE %s")
+        params.append(escaped + "%")
+    if unit:
+        conditions.append("sd.unit = %s")
+        params.append(unit)
+    if expires_after is not None:
+        conditions.append("sd.expiration_date >= %s")
+        params.append(expires_after)
+    if expires_before is not None:
+        conditions.append("sd.expiration_date <= %s")
+        params.append(expires_before)
+    query = """
+    SELECT sd.detail_id, s.name, sd.quantity, sd.unit, sd.expiration_date
+    FROM stock_details sd
+    JOIN stock s ON sd.stock_id = s.stock_id
+    """
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY sd.detail_id LIMIT %s"
+    params.append(int(limit))
+
+    conn, cursor = connectDatabase()
+    if conn is None:
+        return None
+    try:
+        cursor.execute(query, tuple(params))
+        return [
+            {
+                'lot_id': detail_id,
+                'name': name,
+                'quantity': float(quantity) if quantity is not None else None,
+                'unit': unit,
+                'expiration_date': expiration_date.isoformat() if expiration_date else None,
+            }
+            for detail_id, name, quantity, unit, expiration_date in cursor.fetchall()
+        ]
+    except Error as e:
+        print(f"Error fetching stock lots: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+# Iterate over all the stock lots page by page (for streaming large pantries)
+def iterStockLots(page_size=STOCK_PAGE_SIZE, **filters):
+    """
+    @brief Percorre todos os lotes em stock, uma página de cada vez.
+    @details Usa `getStockLots()` com paginação por chave, por isso nunca tem mais do que uma página em memória.
+    
+    @param page_size <int> Número de lotes lidos em cada consulta.
+    @param filters Filtros de `getStockLots()` (name_prefix, unit, expires_after, expires_before).
+    
+    @return <generator> Dicionários no formato de `getStockLots()`.
+    """
+    after = None
+    while True:
+        page = getStockLots(after=after, limit=page_size, **filters)
+        if not page:
+            return
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]['lot_id']
+
+# Get the raw stock rows (optionally only for some items)
+def getStockRows(names=None):
+    """
+    @brief Procura as linhas de stock_details com o nome do item, sem formatação.
+    @details Usado por módulos que mantêm o stock em memória (por exemplo `pantry_matcher`) para recarregar
+    todo o stock ou apenas os itens que mudaram, numa única consulta.
+    
+    @param names <list> Nomes dos itens a procurar; por omissão todo o stock.
+    
+    @return <list> Lista de tuplos (nome, quantidade, unidade, data de validade), ou None se ocorrer um erro.
+    """
+    if names is not None and not names:
+        return []
+    conn, cursor = connectDatabase()
+    if conn is not None:
+        try:
+            query = """
+            SELECT s.name, sd.quantity, sd.unit, sd.expiration_date
+            FROM stock_details sd
+            JOIN stock s ON sd.stock_id = s.stock_id
+            """
+            params = ()
+            if names is not None:
+                query += " WHERE s.name IN ({})".format(", ".join(["%s"] * len(names)))
+                params = tuple(names)
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching stock rows: {e}")
+            return None
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        return None
+
+# Get the stock lots that expire within the next days, grouped per item
+def getExpiringStock(days=3, include_expired=True, today=None):
+    """
+    @brief Procura os itens em stock cuja validade termina nos próximos dias, agrupados por item.
+    @details Uma única consulta por intervalo sobre `stock_details.expiration_date` (indexada) lê apenas os lotes
+    em causa, em vez de todo o stock. Os lotes de cada item são somados numa só unidade (a do lote que expira
+    primeiro), com a tabela de conversões `converter`.
+    
+    @param days <int> Número de dias a partir de hoje.
+    @param include_expired <bool> Se True, inclui também os lotes já fora de validade.
+    @param today <date> Data de referência; por omissão a data atual.
+    
+    @return <list> Lista de dicionários ordenada pela validade mais próxima, ou None se ocorrer um erro:
+    {'name', 'total_quantity', 'unit', 'expiration_date', 'days_left', 'lots': [{'lot_id', 'quantity', 'unit',
+    'expiration_date'}]}. Lotes numa unidade sem conversão possível aparecem em `lots` mas não no total.
+    """
+    today = today or date.today()
+    until = today + timedelta(days=days)
+    conn, cursor = connectDatabase()
+    if conn is None:
+        return None
+    try:
+        query = """
+        SELECT s.name, sd.detail_id, sd.quantity, sd.unit, sd.expiration_date
+        FROM stock_details sd
+        JOIN stock s ON sd.stock_id = s.stock_id
+        WHERE sd.expiration_date <= %s
+        """
+        params = [until]
+        if not include_expired:
+            query += " AND sd.expiration_date >= %s"
+            params.append(today)
+        cursor.execute(query + " ORDER BY sd.expiration_date, sd.detail_id", tuple(params))
+        rows = cursor.fetchall()
+    except Error as e:
+        print(f"Error fetching expiring stock: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    items = {}
+    for name, detail_id, quantity, unit, expiration_date in rows:
+        item = items.get(name)
+        if item is None:
+            item = items[name] = {
+                'name': name,
+                'total_quantity': Decimal(0),
+                'unit': unit,
+                'expiration_date': expiration_date.isoformat(),
+                'days_left': (expiration_date - today).days,
+                'lots': [],
+            }
+        factor = converter.factor(unit, item['unit'], name) if unit != item['unit'] else Decimal(1)
+        if quantity is not None and factor:
+            item['total_quantity'] += Decimal(quantity) * factor
+        item['lots'].append({
+            'lot_id': detail_id,
+            'quantity': float(quantity) if quantity is not None else None,
+            'unit': unit,
+            'expiration_date': expiration_date.isoformat(),
+        })
+    for item in items.values():
+        item['total_quantity'] = float(item['total_quantity'].quantize(QUANTITY_STEP))
+    return list(items.values())
+
 # Search for a stock item in the pantry table
 def searchStock(name):
     """
     @brief Procura por um item específico no stock.
-    @details Procura por um produto específico no stock e retorna a soma total das quantidades numa unidade base, 
-    convertendo as unidades conforme necessário.
+    @details Procura por um produto específico no stock e retorna a soma total das quantidades, lida dos totais
+    por item (`getStockTotal()`, em cache) na unidade base inteira do item e apresentada na unidade do primeiro lote.
     
     @param name <string> Nome do item a ser procurado no stock.
     @return <string> Descrição da quantidade total e unidade do produto, ou mensagem de erro.
     """
+    try:
+        entry = getStockTotal(name)
+        if entry is None:
+            return f"No stock found for '{name}'."
+        if not entry['lots']:
+            return "0 None"
+        if not entry['unconverted_lots']:
+            total = fromBaseQuantity(entry['total_base_quantity'], entry['base_unit'], entry['unit'], name)
+            return f"{total.quantize(QUANTITY_STEP)} {entry['unit']}"
+    except Exception as e:
+        return f"Database error: {str(e)}"
+
+    # Lots in units without conversion can only be summed if they all share the same unit
     conn, cursor = connectDatabase()
     if conn is not None and cursor is not None:
         try:
-            # Fetch stock_id using the name
-            cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-            stock_id_result = cursor.fetchone()
-            if stock_id_result:
-                stock_id = stock_id_result[0]
-
-                # Fetch all stock details for this stock_id
-                cursor.execute("""
-                SELECT quantity, unit
-                FROM stock_details
-                WHERE stock_id = %s
-                """, (stock_id,))
-                
-                total_quantity = Decimal(0)
-                base_unit = None
-                
-                for quantity, unit in cursor.fetchall():
-                    if base_unit is None:
-                        # Initialize base unit if not set
-                        base_unit = unit
-                        total_quantity += Decimal(quantity)
-                    elif unit == base_unit:
-                        # Sum directly if unit is the same
-                        total_quantity += Decimal(quantity)
-                    else:
-                        # Convert and then sum if different units
-                        converted_quantity, _ = convert_measure(Decimal(quantity), unit, base_unit, conversion_factors)
-                        total_quantity += converted_quantity
-
-                return f"{total_quantity} {base_unit}"
-            else:
-                return f"No stock found for '{name}'."
+            cursor.execute("""
+            SELECT COUNT(DISTINCT unit), SUM(quantity)
+            FROM stock_details
+            WHERE stock_id = %s
+            """, (entry['stock_id'],))
+            units, total_quantity = cursor.fetchone()
+            if units > 1:
+                return f"Database error: {entry['unconverted_lots']} lot(s) of '{name}' have no conversion to a common unit"
+            return f"{Decimal(total_quantity)} {entry['unit']}"
         except Exception as e:
             return f"Database error: {str(e)}"
         finally:
@@ -403,7 +967,10 @@ def removeAllStock(name):
             if stock_id_result:
                 stock_id = stock_id_result[0]
                 cursor.execute("DELETE FROM stock_details WHERE stock_id = %s", (stock_id,))
+                refreshStockTotals(cursor, [stock_id])
                 conn.commit()
+                notifyChange([name])
+                publishEvents([{'type': 'item_emptied', 'name': name}])
                 message = f"Removed all stock details for '{name}' from stock_details."
                 print(message)
                 return message
@@ -436,7 +1003,10 @@ def clearStock():
     if conn is not None:
         try:
             cursor.execute("DELETE FROM stock_details")
+            refreshStockTotals(cursor)
             conn.commit()
+            notifyChange()
+            publishEvents([{'type': 'stock_cleared'}])
             print("Cleared all stock details from stock_details.")
         except Error as e:
             print(e)
@@ -450,55 +1020,181 @@ def clearStock():
     
 # ---------------------------------------------------------------------------------------------- [GROCERY List]
 
+## @var MISSING_INGREDIENTS_QUERY
+# @brief Ingredientes de uma receita com o stock por validade ainda não expirada da despensa, por unidade.
+# @details As duas bases de dados estão no mesmo servidor, por isso a diferença entre a receita e a despensa é
+# feita numa única consulta (`recipe_database.recipe_ingredients` juntada a `stock`/`stock_details`). A junção é
+# feita pelo ingrediente canónico (`ingredient_id`, indexado), por isso "batatas" na despensa conta para "batata"
+# na receita. Cada ingrediente aparece uma vez por unidade em stock (ou uma vez com a unidade NULL, se não houver stock).
+MISSING_INGREDIENTS_QUERY = """
+SELECT ri.recipe_ingredient_id, ri.name, ri.quantity, ri.unit, r.number_of_servings, sd.unit, SUM(sd.quantity)
+FROM recipe_database.recipe_ingredients ri
+JOIN recipe_database.recipes r ON r.recipe_id = ri.recipe_id
+LEFT JOIN stock s ON s.ingredient_id = ri.ingredient_id
+LEFT JOIN stock_details sd ON sd.stock_id = s.stock_id
+    AND (sd.expiration_date IS NULL OR sd.expiration_date >= CURDATE())
+WHERE ri.recipe_id = %s
+GROUP BY ri.recipe_ingredient_id, sd.unit
+ORDER BY ri.recipe_ingredient_id
+"""
+
+def _groceryItem(item):
+    """
+    @brief Valida um item da lista de compras: um nome, ou um dicionário {'name', 'quantity', 'unit'}.
+
+    @return <tuplo> (nome, quantidade ou None, unidade ou None).
+
+    @warning ValueError Se o nome estiver em falta ou a quantidade for inválida.
+    """
+    if isinstance(item, str):
+        item = {'name': item}
+    name = (item.get('name') or '').strip() if isinstance(item, dict) else ''
+    if not name:
+        raise ValueError("Missing required field: name.")
+    quantity = item.get('quantity')
+    if quantity in (None, ''):
+        return name, None, None
+    try:
+        quantity = Decimal(str(quantity))
+    except ArithmeticError:
+        raise ValueError("Invalid quantity.")
+    if not quantity.is_finite() or quantity <= 0:
+        raise ValueError("Invalid quantity.")
+    return name, quantity, item.get('unit') or None
+
+def _upsertGrocery(cursor, rows):
+    """
+    @brief Insere ou atualiza linhas da lista de compras com um número constante de pedidos.
+    @details Usa o índice único `uq_grocerylist_name` (migração 0003): um `INSERT ... ON DUPLICATE KEY UPDATE`
+    em lote acrescenta os nomes novos e atualiza a quantidade dos que já estavam na lista. Os nomes que ainda não
+    existem em `stock` também são criados, como em `insertGrocery()`. Não faz commit.
+
+    @param cursor Cursor de uma transação aberta.
+    @param rows Lista de tuplos (nome, quantidade, unidade), sem nomes repetidos.
+
+    @return <set> Nomes (em minúsculas) que não estavam na lista de compras.
+    """
+    names = [name for name, _, _ in rows]
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(f"SELECT name FROM grocerylist WHERE name IN ({placeholders}) FOR UPDATE", names)
+    listed = {name.lower() for name, in cursor.fetchall()}
+    cursor.execute(f"SELECT name FROM stock WHERE name IN ({placeholders})", names)
+    stocked = {name.lower() for name, in cursor.fetchall()}
+
+    missing = [name for name in names if name.lower() not in stocked]
+    if missing:
+        ingredient_ids = ing.resolve_many(missing, {name: unit for name, _, unit in rows})
+        cursor.executemany("INSERT INTO stock (name, ingredient_id) VALUES (%s, %s) ON DUPLICATE KEY UPDATE stock_id = stock_id",
+                           [(name, ingredient_ids[name]) for name in missing])
+    # A new quantity replaces the previous one; a name without quantity keeps what was already listed
+    cursor.executemany("""
+    INSERT INTO grocerylist (name, quantity, unit) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        unit = IF(VALUES(quantity) IS NULL, unit, VALUES(unit)),
+        quantity = COALESCE(VALUES(quantity), quantity)
+    """, rows)
+    return {name.lower() for name in names} - listed
+
+def insertGroceryBulk(items):
+    """
+    @brief Insere ou atualiza vários itens na lista de compras numa única transação.
+    @details Itens inválidos são ignorados e reportados no resultado, sem impedir os restantes. Nomes repetidos
+    (sem distinguir maiúsculas) contam uma vez, com os dados da última ocorrência.
+
+    @param items <list> Nomes, ou dicionários {'name', 'quantity', 'unit'} (quantidade e unidade opcionais).
+
+    @return <list> Um dicionário por item, pela mesma ordem: {'name', 'status': 'added' | 'updated', 'quantity',
+    'unit'} ou {'name', 'status': 'error', 'error'}.
+    """
+    results = []
+    rows = {}
+    for item in items:
+        try:
+            name, quantity, unit = _groceryItem(item)
+        except ValueError as e:
+            name = item if isinstance(item, str) else item.get('name') if isinstance(item, dict) else None
+            results.append({'name': name, 'status': 'error', 'error': str(e)})
+            continue
+        results.append({'name': name, 'quantity': float(quantity) if quantity is not None else None, 'unit': unit})
+        rows[name.lower()] = (name, quantity, unit)
+    if not rows:
+        return results
+
+    conn, cursor = connectDatabase()
+    if conn is None or cursor is None:
+        return [dict(result, status='error', error="Failed to connect to the database.") if 'status' not in result else result
+                for result in results]
+    try:
+        added = _upsertGrocery(cursor, list(rows.values()))
+        conn.commit()
+        invalidateStockTotals([name for name, _, _ in rows.values()])
+        print(f"Upserted {len(rows)} item(s) ({len(added)} new) in the GROCERY LIST.")
+        publishEvents([groceryEvent(*row) for row in rows.values()])
+        for result in results:
+            if 'status' not in result:
+                result['status'] = 'added' if result['name'].lower() in added else 'updated'
+    except Error as e:
+        conn.rollback()
+        print(e)
+        results = [dict(result, status='error', error=str(e)) if 'status' not in result else result for result in results]
+    finally:
+        cursor.close()
+        conn.close()
+    return results
+
 # Insert a new Stock item into grocery_list
 def insertGrocery(name):
     """
     @brief Insere um item na lista de compras.
-    @details Insere um item na lista de compras, verificando primeiro se ele já existe no stock. 
-    Se não existir, o item é adicionado ao estoque e à lista de compras.
+    @details Insere um item na lista de compras (e no stock, se ainda não existir) com `insertGroceryBulk()`.
     
     @param name <string> Nome do item a ser inserido na lista de compras.
     
     @return <string> Mensagem de sucesso ou falha.
     """
-    conn, cursor = connectDatabase()
-    if conn is not None and cursor is not None:
-        try:
-            cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-            stock_id_result = cursor.fetchone()
-            if stock_id_result:
-                print(f"Stock item '{name}' exists in the database.")
-                message = f"Stock item '{name}' exists in the database."
-            else:
-                print(f"Stock item '{name}' does not exist in the database, inserting it now.")
-                cursor.execute("INSERT INTO stock (name) VALUES (%s)", (name,))
-                conn.commit()
-                print(f"Stock item '{name}' inserted successfully.")
-                message = f"Stock item '{name}' inserted successfully."
+    result = insertGroceryBulk([name])[0]
+    if result['status'] == 'added':
+        return f" Stock item '{name}' inserted successfully in the GROCERY LIST."
+    if result['status'] == 'updated':
+        return f" Stock item '{name}' already exists in the GROCERY LIST."
+    print(f"Failed to insert stock item '{name}'")
+    return f"Failed to insert stock item '{name}': {result['error']}"
 
-            # Check id the stock item already exists in the grocery list
-            cursor.execute("SELECT name FROM grocerylist WHERE name = %s", (name,))
-            existing_grocery = cursor.fetchone()
-            
-            if existing_grocery:
-                print(f"Stock item '{name}' already exists in the GROCERY LIST.")
-                message = f" Stock item '{name}' already exists in the GROCERY LIST."
-            else:
-                # Insert into grocery_list
-                cursor.execute("INSERT INTO grocerylist (name) VALUES (%s)", (name,))
-                conn.commit()
-                print(f"Stock item '{name}' inserted successfully in the GROCERY LIST.")
-                message = f" Stock item '{name}' inserted successfully in the GROCERY LIST."
-            return message
-        except Error as e:
-            print(e)
-            print(f"Failed to insert stock item '{name}'")
-        finally:
-            cursor.close()
-            conn.close()
-            print("Connection closed.")
-    else:
+def removeGroceryBulk(names):
+    """
+    @brief Remove vários itens da lista de compras com um único `DELETE`.
+    
+    @param names <list> Nomes dos itens a remover.
+    
+    @return <dict> {'removed': nomes removidos, 'not_found': nomes que não estavam na lista}, ou None se ocorrer
+    um erro.
+    """
+    names = list({name.strip().lower(): name.strip() for name in names if name and name.strip()}.values())
+    if not names:
+        return {'removed': [], 'not_found': []}
+    conn, cursor = connectDatabase()
+    if conn is None or cursor is None:
         print("Failed to connect to the database.")
+        return None
+    try:
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(f"SELECT name FROM grocerylist WHERE name IN ({placeholders}) FOR UPDATE", names)
+        removed = [name for name, in cursor.fetchall()]
+        if removed:
+            cursor.execute(f"DELETE FROM grocerylist WHERE name IN ({placeholders})", names)
+        conn.commit()
+        publishEvents([{'type': 'grocery_removed', 'name': name} for name in removed])
+        found = {name.lower() for name in removed}
+        print(f"Removed {len(removed)} item(s) from the GROCERY LIST.")
+        return {'removed': removed, 'not_found': [name for name in names if name.lower() not in found]}
+    except Error as e:
+        conn.rollback()
+        print(e)
+        print("Failed to remove items from the GROCERY LIST.")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
 
 # Remove a Stock item from grocery_list
 def removeGrocery(name):
@@ -510,23 +1206,91 @@ def removeGrocery(name):
     
     @return <string> Mensagem de sucesso ou falha.
     """
+    if removeGroceryBulk([name]) is None:
+        print(f"Failed to remove stock item '{name}'")
+        return None
+    print(f"Stock item '{name}' removed successfully from the GROCERY LIST.")
+    return f"Stock item '{name}' removed successfully from the GROCERY LIST."
+
+def planShortfall(rows, servings=None):
+    """
+    @brief Calcula o que falta na despensa para cada ingrediente de uma receita.
+    
+    @param rows Linhas de `MISSING_INGREDIENTS_QUERY`.
+    @param servings Número de porções pretendido; None para as porções da receita.
+    
+    @return <list> Tuplos (nome, quantidade em falta ou None, unidade) pela ordem da receita. A quantidade é None
+    para ingredientes sem quantidade na receita que não existem na despensa.
+    """
+    ingredients = {}
+    for ingredient_id, name, quantity, unit, recipe_servings, stock_unit, stock_quantity in rows:
+        if ingredient_id not in ingredients:
+            if quantity is not None and servings and recipe_servings:
+                quantity = quantity * Decimal(servings) / recipe_servings
+            ingredients[ingredient_id] = [name, quantity, unit, Decimal('0'), False]
+        entry = ingredients[ingredient_id]
+        if stock_quantity is None:
+            continue
+        entry[4] = True
+        if entry[1] is None or not unit:
+            continue
+        factor = converter.factor(stock_unit, unit, name)
+        if factor is not None:
+            entry[3] += Decimal(stock_quantity) * factor
+
+    shortfall = []
+    for name, quantity, unit, available, in_stock in ingredients.values():
+        if quantity is None or not unit:
+            if not in_stock:
+                shortfall.append((name, None, None))
+            continue
+        missing = (quantity - available).quantize(QUANTITY_STEP, rounding=ROUND_CEILING)
+        if missing > 0:
+            shortfall.append((name, missing, unit))
+    return shortfall
+
+def addMissingIngredients(recipe_id, servings=None):
+    """
+    @brief Acrescenta à lista de compras o que falta na despensa para fazer uma receita.
+    @details A receita e a despensa são comparadas numa única consulta (`MISSING_INGREDIENTS_QUERY`); as
+    quantidades em stock noutras unidades são convertidas para a unidade da receita (`converter`) e só conta o
+    stock dentro da validade. A diferença é inserida de uma vez com `_upsertGrocery()`, na mesma transação.
+    
+    @param recipe_id <int> ID da receita.
+    @param servings <int> Número de porções pretendido; None para as porções da receita.
+    
+    @return <list> Itens acrescentados ou atualizados: {'name', 'quantity', 'unit'}; None se ocorrer um erro.
+    """
     conn, cursor = connectDatabase()
-    if conn is not None and cursor is not None:
-        try:
-            cursor.execute("DELETE FROM grocerylist WHERE name = %s", (name,))
-            conn.commit()
-            print(f"Stock item '{name}' removed successfully from the GROCERY LIST.")
-            message = f"Stock item '{name}' removed successfully from the GROCERY LIST."
-            return message
-        except Error as e:
-            print(e)
-            print(f"Failed to remove stock item '{name}'")
-        finally:
-            cursor.close()
-            conn.close()
-            print("Connection closed.")
-    else:
+    if conn is None or cursor is None:
         print("Failed to connect to the database.")
+        return None
+    try:
+        cursor.execute(MISSING_INGREDIENTS_QUERY, (recipe_id,))
+        rows = cursor.fetchall()
+        # The same ingredient may appear twice in a recipe; keep one line per name
+        shortfall = {}
+        for name, quantity, unit in planShortfall(rows, servings):
+            previous = shortfall.get(name.lower())
+            if previous and previous[1] is not None and quantity is not None and previous[2] == unit:
+                quantity += previous[1]
+            shortfall[name.lower()] = (name, quantity, unit)
+        shortfall = list(shortfall.values())
+        if shortfall:
+            _upsertGrocery(cursor, shortfall)
+        conn.commit()
+        invalidateStockTotals([name for name, _, _ in shortfall])
+        publishEvents([groceryEvent(*row) for row in shortfall])
+        print(f"Added {len(shortfall)} missing ingredient(s) of recipe {recipe_id} to the GROCERY LIST.")
+        return [{key: value for key, value in groceryEvent(*row).items() if key != 'type'} for row in shortfall]
+    except Error as e:
+        conn.rollback()
+        print(e)
+        print(f"Failed to add the missing ingredients of recipe {recipe_id}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
 
 # Get all items in the grocery list
 def showAllGrocery():
@@ -568,6 +1332,7 @@ def clearGrocery():
         try:
             cursor.execute("DELETE FROM grocerylist")
             conn.commit()
+            publishEvents([{'type': 'grocery_cleared'}])
             print("Cleared all stock details from grocerylist.")
         except Error as e:
             print(e)
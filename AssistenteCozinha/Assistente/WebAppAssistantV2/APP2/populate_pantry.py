@@ -124,9 +124,11 @@ def populate_pantry():
     Cada produto pode ter entre 0 e 1 entradas com quantidades de 1 a 4 e datas de validade
     que variam de 30 a 730 dias a partir da data atual.
     
-    @note Esta função utiliza a função `insertStock` do módulo `pantrydb_queries` para inserir os produtos na base de dados.
+    @note Esta função utiliza a função `insertStockBulk` do módulo `pantrydb_queries` para inserir todos os produtos
+    na base de dados numa única transação.
     """
     today = datetime.now()
+    items = []
     for name, unit in products:
         # Randomize the quantity and create between 1 and 3 entries per product
         for _ in range(random.randint(0, 1)):
@@ -134,8 +136,11 @@ def populate_pantry():
             # Generate a random expiration date within the next two years
             expiration_date = today + timedelta(days=random.randint(30, 730))
             expiration_date_str = expiration_date.strftime('%Y-%m-%d')
-            # Insert the stock item into the database
-            pdb.insertStock(name, quantity, unit, expiration_date_str)
+            items.append({'name': name, 'quantity': quantity, 'unit': unit, 'expiration_date': expiration_date_str})
+    # Insert all the stock items into the database in a single transaction
+    for result in pdb.insertStockBulk(items):
+        if result['status'] != 'inserted':
+            print(f"Failed to insert '{result['name']}': {result['error']}")
             
 def populate_shopping_list():
     """
@@ -0,0 +1,557 @@
+"""
+@brief Módulo com o catálogo de receitas em memória usado pelos endpoints de leitura de receitas.
+
+As tabelas de receitas só mudam quando o script de ingestão (`db/recipe_db/insertRecipeDB.py`) corre,
+por isso o catálogo carrega de uma só vez receitas, imagens, ingredientes, utensílios e tags para estruturas
+compactas por receita e serve as leituras a partir da memória.
+
+@details O catálogo mantém um `CatalogSnapshot` imutável que é substituído por inteiro a cada recarga:
+- Na primeira leitura (ou no arranque do servidor) o snapshot é carregado de forma síncrona.
+- Depois disso, passados `CATALOG_CHECK_INTERVAL` segundos, uma leitura dispara em segundo plano uma verificação
+  da versão do catálogo (contagens e ID máximo das tabelas). Se a versão mudou, o snapshot é recarregado.
+- Enquanto a verificação corre, ou se o MySQL estiver indisponível, continua a ser servido o snapshot anterior
+  (stale-while-revalidate).
+- `refresh()` força a recarga; é chamado pelo endpoint `/recipes/catalog/refresh` no fim da ingestão.
+
+Se o catálogo nunca conseguiu ser carregado, as funções de leitura recorrem diretamente ao `recipedb_queries`.
+No servidor de ações do Rasa esse módulo é a cópia em `Assistente/recipedb_queries.py`, que é importada primeiro;
+as funções usadas aqui têm de existir nas duas cópias.
+
+@code
+    import recipe_catalog as rc
+    print(rc.get_recipe_name(62))
+    print(rc.get_ingredients(62))
+    print(rc.get_recipe_full(62, fields=["name", "ingredients", "tools"]))
+    print(rc.random_recipe(session_id="USER1"))
+    rc.refresh()
+@endcode
+
+@note Variável de ambiente suportada:
+- `CATALOG_CHECK_INTERVAL`: segundos entre verificações de versão (por omissão 30).
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from mysql.connector import Error
+
+import cooking_session as cs
+import recipedb_queries as db
+
+## @var CATALOG_CHECK_INTERVAL
+# @brief Intervalo mínimo (segundos) entre verificações da versão do catálogo na base de dados.
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", 30))
+
+## @var MAX_SHUFFLE_SESSIONS
+# @brief Número máximo de sessões com saco de sorteio guardado; as menos usadas recentemente são esquecidas.
+MAX_SHUFFLE_SESSIONS = 1000
+
+## @var RECIPE_FIELDS
+# @brief Campos que podem ser pedidos a `get_recipe_full()` / `get_recipes_full()` (parâmetro `fields`).
+RECIPE_FIELDS = ("name", "servings", "cooking_time", "image", "ingredients", "tools", "steps")
+
+
+class CatalogRecipe:
+    """
+    @brief Dados de leitura de uma receita guardados no catálogo.
+    """
+    __slots__ = ("recipe_id", "name", "number_of_servings", "cooking_time", "image_url", "ingredients", "tools", "tags")
+
+    def __init__(self, recipe_id, name, number_of_servings, cooking_time):
+        self.recipe_id = recipe_id
+        self.name = name
+        self.number_of_servings = number_of_servings
+        self.cooking_time = cooking_time
+        self.image_url = None
+        self.ingredients = []
+        self.tools = []
+        self.tags = []
+
+
+class CatalogSnapshot:
+    """
+    @brief Fotografia imutável do catálogo de receitas.
+    @details `recipes` mapeia recipe_id -> `CatalogRecipe`, pela ordem de recipe_id; `ids` guarda os mesmos IDs
+    num tuplo para sorteios em O(1).
+    """
+
+    def __init__(self, version, recipes):
+        self.version = version
+        self.recipes = recipes
+        self.ids = tuple(recipes)
+        self.loaded_at = time.time()
+
+
+## @var VERSION_QUERY
+# @brief Consulta leve usada para detetar se a ingestão alterou as tabelas de receitas.
+VERSION_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM recipes),
+    (SELECT COALESCE(MAX(recipe_id), 0) FROM recipes),
+    (SELECT COUNT(*) FROM recipe_ingredients),
+    (SELECT COUNT(*) FROM recipe_images),
+    (SELECT COUNT(*) FROM recipe_instructions),
+    (SELECT COUNT(*) FROM instructions_tools),
+    (SELECT COUNT(*) FROM recipe_tags)
+"""
+
+
+def _fetch_version(cursor):
+    cursor.execute(VERSION_QUERY)
+    return tuple(cursor.fetchone())
+
+
+def _load_recipes(cursor, recipe_ids=None):
+    """
+    @brief Lê receitas, imagens, ingredientes, utensílios e tags com o cursor dado.
+
+    @param cursor Cursor de uma conexão à `recipe_database`.
+    @param recipe_ids Lista opcional de IDs a ler; por omissão são lidas todas as receitas.
+
+    @return <dict> recipe_id -> `CatalogRecipe`, pela ordem de recipe_id.
+    """
+    if recipe_ids is None:
+        where, params = "", ()
+    else:
+        where = "WHERE {column} IN (" + ", ".join(["%s"] * len(recipe_ids)) + ")"
+        params = tuple(recipe_ids)
+
+    cursor.execute(
+        "SELECT recipe_id, name, number_of_servings, cooking_time FROM recipes "
+        + where.format(column="recipe_id") + " ORDER BY recipe_id", params)
+    recipes = {row[0]: CatalogRecipe(*row) for row in cursor.fetchall()}
+
+    cursor.execute(
+        "SELECT recipe_id, image_url FROM recipe_images " + where.format(column="recipe_id") + " ORDER BY image_id",
+        params)
+    for recipe_id, image_url in cursor.fetchall():
+        recipe = recipes.get(recipe_id)
+        if recipe is not None and recipe.image_url is None:
+            recipe.image_url = image_url
+
+    cursor.execute(f"""
+    SELECT recipe_id, name, quantity, unit FROM recipe_ingredients
+    {where.format(column="recipe_id")}
+    ORDER BY recipe_id, recipe_ingredient_id
+    """, params)
+    for recipe_id, name, quantity, unit in cursor.fetchall():
+        recipe = recipes.get(recipe_id)
+        if recipe is not None:
+            recipe.ingredients.append({'name': name, 'quantity': quantity, 'unit': unit})
+
+    cursor.execute(f"""
+    SELECT DISTINCT ri.recipe_id, t.name FROM tools t
+    JOIN instructions_tools it ON t.tool_id = it.tool_id
+    JOIN recipe_instructions ri ON it.recipe_instruction_id = ri.recipe_instruction_id
+    {where.format(column="ri.recipe_id")}
+    """, params)
+    for recipe_id, tool_name in cursor.fetchall():
+        recipe = recipes.get(recipe_id)
+        if recipe is not None:
+            recipe.tools.append(tool_name)
+
+    cursor.execute(f"""
+    SELECT rt.recipe_id, t.name FROM recipe_tags rt
+    JOIN tags t ON t.tag_id = rt.tag_id
+    {where.format(column="rt.recipe_id")}
+    """, params)
+    for recipe_id, tag_name in cursor.fetchall():
+        recipe = recipes.get(recipe_id)
+        if recipe is not None:
+            recipe.tags.append(tag_name)
+
+    for recipe in recipes.values():
+        recipe.ingredients = tuple(recipe.ingredients)
+        recipe.tools = tuple(recipe.tools)
+        recipe.tags = tuple(recipe.tags)
+    return recipes
+
+
+def _load_snapshot():
+    """
+    @brief Lê todas as tabelas de receitas numa única conexão e constrói um novo snapshot.
+
+    @return <CatalogSnapshot> Snapshot carregado.
+
+    @warning Error se a conexão ou alguma consulta falhar.
+    """
+    conn = db.create_connection()
+    if conn is None:
+        raise Error("Failed to connect to recipe_database")
+    try:
+        cursor = conn.cursor()
+        version = _fetch_version(cursor)
+        recipes = _load_recipes(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    return CatalogSnapshot(version, recipes)
+
+
+class RecipeCatalog:
+    """
+    @brief Mantém o snapshot atual do catálogo e coordena as recargas.
+    """
+
+    def __init__(self, check_interval=CATALOG_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._revalidating = False
+
+    def refresh(self):
+        """
+        @brief Recarrega o catálogo de forma síncrona.
+
+        @return <bool> True se o snapshot foi recarregado; False se a base de dados não estava disponível
+        (nesse caso o snapshot anterior continua em uso).
+        """
+        with self._lock:
+            try:
+                self._snapshot = _load_snapshot()
+                return True
+            except Error as e:
+                print(f"Erro ao carregar o catálogo de receitas: {e}")
+                return False
+            finally:
+                self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """
+        @brief Força uma verificação de versão na próxima leitura, sem bloquear o pedido atual.
+        """
+        self._checked_at = 0.0
+
+    def _revalidate(self):
+        try:
+            conn = db.create_connection()
+            if conn is None:
+                return
+            try:
+                cursor = conn.cursor()
+                version = _fetch_version(cursor)
+                cursor.close()
+            finally:
+                conn.close()
+            snapshot = self._snapshot
+            if snapshot is None or version != snapshot.version:
+                self.refresh()
+        except Error as e:
+            # Keep serving the stale snapshot until MySQL is back
+            print(f"Erro ao verificar a versão do catálogo de receitas: {e}")
+        finally:
+            self._checked_at = time.monotonic()
+            self._revalidating = False
+
+    def snapshot(self):
+        """
+        @brief Devolve o snapshot atual, agendando uma revalidação em segundo plano se o intervalo expirou.
+
+        @return <CatalogSnapshot> Snapshot atual, ou None se o catálogo nunca pôde ser carregado.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            return self._snapshot
+        if not self._revalidating and time.monotonic() - self._checked_at >= self.check_interval:
+            self._revalidating = True
+            threading.Thread(target=self._revalidate, daemon=True).start()
+        return snapshot
+
+    def status(self):
+        """
+        @brief Estado do catálogo para diagnóstico.
+
+        @return <dict> Versão, número de receitas e instante (epoch) do último carregamento.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'version': list(snapshot.version),
+            'recipes': len(snapshot.recipes),
+            'loaded_at': snapshot.loaded_at,
+        }
+
+
+## @var catalog
+# @brief Catálogo partilhado pelo processo.
+catalog = RecipeCatalog()
+
+
+def refresh():
+    """
+    @brief Recarrega o catálogo partilhado. Ver `RecipeCatalog.refresh()`.
+    """
+    return catalog.refresh()
+
+
+def get_recipe(recipe_id):
+    """
+    @brief Procura uma receita no catálogo.
+
+    @param recipe_id ID da receita.
+
+    @return <CatalogRecipe> A receita, ou None se não existir ou se o catálogo não estiver disponível.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.recipes.get(recipe_id)
+
+
+def get_recipes():
+    """
+    @brief Lista todas as receitas com nome, número de porções e tempo de confeção.
+
+    @return <list> Lista de dicionários no mesmo formato que `recipedb_queries.getRecipes()`.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return db.getRecipes()
+    return [
+        {'name': r.name, 'number_of_servings': r.number_of_servings, 'cooking_time': r.cooking_time}
+        for r in snapshot.recipes.values()
+    ]
+
+
+def get_ingredients(recipe_id):
+    """
+    @brief Ingredientes de uma receita.
+
+    @param recipe_id ID da receita.
+
+    @return <list> Lista de dicionários com nome, quantidade e unidade; lista vazia se a receita não existir.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return db.getIngredients(recipe_id)
+    recipe = snapshot.recipes.get(recipe_id)
+    return list(recipe.ingredients) if recipe else []
+
+
+def get_tools(recipe_id):
+    """
+    @brief Utensílios usados numa receita.
+
+    @param recipe_id ID da receita.
+
+    @return <list> Lista de tuplos (nome,), no mesmo formato que `recipedb_queries.getTools()`.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return db.getTools(recipe_id)
+    recipe = snapshot.recipes.get(recipe_id)
+    return [(tool,) for tool in recipe.tools] if recipe else []
+
+
+def get_recipe_name(recipe_id):
+    """
+    @brief Nome de uma receita.
+
+    @param recipe_id ID da receita.
+
+    @return <string> Nome da receita, ou None se não existir.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return db.getRecipeName(recipe_id)
+    recipe = snapshot.recipes.get(recipe_id)
+    return recipe.name if recipe else None
+
+
+def get_image_url(recipe_id):
+    """
+    @brief URL da imagem de uma receita.
+
+    @param recipe_id ID da receita.
+
+    @return <string> URL da imagem, ou None se não existir.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return db.getImg_url(recipe_id)
+    recipe = snapshot.recipes.get(recipe_id)
+    return recipe.image_url if recipe else None
+
+
+def parse_fields(fields):
+    """
+    @brief Valida uma seleção de campos, por exemplo o parâmetro `fields=name,image,steps` de um pedido.
+
+    @param fields String separada por vírgulas, lista de nomes, ou None/vazio para todos os campos.
+
+    @return <tuple> Campos pedidos, pela ordem de `RECIPE_FIELDS`.
+
+    @warning ValueError se algum campo não existir.
+    """
+    if not fields:
+        return RECIPE_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    requested = {field.strip() for field in fields if field.strip()}
+    unknown = requested.difference(RECIPE_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+    return tuple(field for field in RECIPE_FIELDS if field in requested) or RECIPE_FIELDS
+
+
+def _recipe_payload(recipe, fields, steps):
+    payload = {'recipe_id': recipe.recipe_id}
+    if "name" in fields:
+        payload['name'] = recipe.name
+    if "servings" in fields:
+        payload['number_of_servings'] = recipe.number_of_servings
+    if "cooking_time" in fields:
+        payload['cooking_time'] = recipe.cooking_time
+    if "image" in fields:
+        payload['img_url'] = recipe.image_url
+    if "ingredients" in fields:
+        payload['ingredients'] = list(recipe.ingredients)
+    if "tools" in fields:
+        payload['tools'] = list(recipe.tools)
+    if "steps" in fields:
+        recipe_steps = steps.get(recipe.recipe_id) if steps else None
+        payload['steps'] = list(recipe_steps.steps) if recipe_steps else []
+    return payload
+
+
+def get_recipes_full(recipe_ids, fields=None):
+    """
+    @brief Devolve várias receitas completas (ou só os campos pedidos) de uma só vez.
+    @details Os dados vêm do catálogo em memória; se o catálogo não estiver disponível, as receitas pedidas são lidas
+    numa única conexão. Os passos só são carregados quando `steps` é pedido, numa única consulta para as receitas
+    que ainda não estão na cache do `cooking_session`.
+
+    @param recipe_ids Lista de IDs de receitas.
+    @param fields Campos a incluir (ver `parse_fields()`); `recipe_id` é sempre incluído.
+
+    @return <list> Lista de dicionários pela ordem dos IDs pedidos; IDs inexistentes são omitidos.
+
+    @warning ValueError se algum campo não existir.
+    """
+    fields = parse_fields(fields)
+    snapshot = catalog.snapshot()
+    if snapshot is not None:
+        recipes = snapshot.recipes
+    else:
+        recipes = {}
+        conn = db.create_connection()
+        if conn is not None:
+            try:
+                cursor = conn.cursor()
+                recipes = _load_recipes(cursor, list(dict.fromkeys(recipe_ids))) if recipe_ids else {}
+                cursor.close()
+            except Error as e:
+                print(f"Erro ao carregar as receitas {recipe_ids}: {e}")
+            finally:
+                conn.close()
+
+    found = [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes]
+    steps = cs.get_steps_many([recipe.recipe_id for recipe in found]) if "steps" in fields and found else None
+    return [_recipe_payload(recipe, fields, steps) for recipe in found]
+
+
+def get_recipe_full(recipe_id, fields=None):
+    """
+    @brief Devolve uma receita completa (metadados, imagem, ingredientes, utensílios e passos) ou só os campos pedidos.
+
+    @param recipe_id ID da receita.
+    @param fields Campos a incluir (ver `parse_fields()`).
+
+    @return <dict> A receita, ou None se não existir.
+
+    @warning ValueError se algum campo não existir.
+    """
+    recipes = get_recipes_full([recipe_id], fields)
+    return recipes[0] if recipes else None
+
+
+class ShuffleBags:
+    """
+    @brief Sacos de sorteio por sessão para sugerir receitas sem repetições.
+    @details Cada sessão recebe uma permutação aleatória dos IDs do catálogo e vai retirando um ID de cada vez.
+    Só quando todas as receitas foram sugeridas é que o saco é baralhado de novo. Se o catálogo mudar a meio,
+    o saco é refeito apenas com as receitas que a sessão ainda não viu.
+    """
+
+    def __init__(self, max_sessions=MAX_SHUFFLE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._bags = OrderedDict()
+        self._lock = threading.Lock()
+
+    def draw(self, session_id, snapshot):
+        """
+        @brief Retira o próximo ID do saco da sessão.
+
+        @param session_id Identificador da sessão.
+        @param snapshot <CatalogSnapshot> Snapshot atual do catálogo.
+
+        @return <int> ID da receita sorteada, ou None se o catálogo estiver vazio.
+        """
+        if not snapshot.ids:
+            return None
+        with self._lock:
+            bag = self._bags.pop(session_id, None)
+            if bag is None:
+                bag = {'version': None, 'remaining': [], 'served': set()}
+            if bag['version'] != snapshot.version:
+                bag['version'] = snapshot.version
+                bag['remaining'] = [i for i in snapshot.ids if i not in bag['served']]
+                random.shuffle(bag['remaining'])
+            if not bag['remaining']:
+                last = bag.get('last')
+                bag['served'] = set()
+                bag['remaining'] = list(snapshot.ids)
+                random.shuffle(bag['remaining'])
+                # Do not start the new round with the recipe that closed the previous one
+                if len(bag['remaining']) > 1 and bag['remaining'][-1] == last:
+                    bag['remaining'][0], bag['remaining'][-1] = bag['remaining'][-1], bag['remaining'][0]
+            recipe_id = bag['remaining'].pop()
+            bag['served'].add(recipe_id)
+            bag['last'] = recipe_id
+
+            self._bags[session_id] = bag
+            while len(self._bags) > self.max_sessions:
+                self._bags.popitem(last=False)
+            return recipe_id
+
+
+## @var shuffle_bags
+# @brief Sacos de sorteio partilhados pelo processo.
+shuffle_bags = ShuffleBags()
+
+
+def random_recipe(session_id=None):
+    """
+    @brief Sorteia uma receita e devolve o ID, o nome e a imagem numa só chamada.
+    @details Sem sessão, o sorteio é uniforme sobre o tuplo de IDs do catálogo. Com sessão, usa o saco de sorteio
+    da sessão, pelo que a mesma receita só se repete depois de todas as outras terem sido sugeridas.
+
+    @param session_id Identificador opcional da sessão (utilizador, separador do browser, conversa do Rasa).
+
+    @return <dict> {'recipe_id', 'recipe_name', 'recipe_img'}, com valores None se não existirem receitas.
+    """
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        recipe_id = db.getRandomRecipe()
+        return {
+            'recipe_id': recipe_id,
+            'recipe_name': db.getRecipeName(recipe_id) if recipe_id else None,
+            'recipe_img': db.getImg_url(recipe_id) if recipe_id else None,
+        }
+
+    if session_id:
+        recipe_id = shuffle_bags.draw(session_id, snapshot)
+    else:
+        recipe_id = random.choice(snapshot.ids) if snapshot.ids else None
+    recipe = snapshot.recipes.get(recipe_id)
+    return {
+        'recipe_id': recipe_id,
+        'recipe_name': recipe.name if recipe else None,
+        'recipe_img': recipe.image_url if recipe else None,
+    }
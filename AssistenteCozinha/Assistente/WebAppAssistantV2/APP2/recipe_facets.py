@@ -0,0 +1,352 @@
+"""
+@brief Módulo de pesquisa facetada de receitas por tags, ingredientes, utensílios, tempo de confeção e porções.
+
+Permite responder a pedidos como "sobremesa, com chocolate, sem forno, em menos de 30 minutos" sem consultas
+à base de dados: cada faceta tem um índice invertido valor -> conjunto de receitas, e uma pesquisa é apenas a
+interseção (e diferença) desses conjuntos.
+
+@details Os conjuntos de receitas são bitmaps guardados em inteiros Python, em que o bit n corresponde à receita
+com recipe_id n. Interseções, uniões e exclusões são operações `&`, `|` e `& ~` sobre esses inteiros.
+- Tags, ingredientes e utensílios são normalizados com `recipe_search.fold()` (sem acentos, minúsculas).
+  Ingredientes e utensílios são indexados pelo nome completo e por cada palavra do nome, para que
+  "chocolate" encontre "chocolate negro".
+- O tempo de confeção e o número de porções são convertidos em números (`parse_minutes()`, `parse_servings()`)
+  e guardados em bitmaps cumulativos por valor, para filtros "até N" / "pelo menos N" com uma pesquisa binária.
+- Quando o `recipe_catalog` carrega um snapshot novo, o índice é atualizado de forma incremental: só as receitas
+  inseridas, removidas ou alteradas mexem nos bitmaps.
+
+@code
+    import recipe_facets as rf
+    print(rf.search(tags=["sobremesa"], ingredients=["chocolate"], without_tools=["forno"], max_time=30))
+    # [{'recipe_id': 76, 'name': 'Mousse de Chocolate Negro sem adição de açúcares', 'cooking_time': 15, ...}]
+    print(rf.facet_counts()["tags"]["sobremesa"])
+@endcode
+"""
+import bisect
+import re
+import threading
+
+import recipe_catalog as rc
+import recipedb_queries as db
+from recipe_search import fold
+
+## @var FACETS
+# @brief Facetas de texto indexadas.
+FACETS = ("tags", "ingredients", "tools")
+
+## @var MIN_WORD_LENGTH
+# @brief Palavras mais curtas do que isto ("de", "q", "b") não são indexadas isoladamente.
+MIN_WORD_LENGTH = 3
+
+_HOURS = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:horas?|hr|h)(?![a-z])")
+_MINUTES = re.compile(r"(\d+)\s*(?:minutos?|mins?|m)(?![a-z])")
+_NUMBER = re.compile(r"\d+")
+
+
+def parse_minutes(value):
+    """
+    @brief Converte um tempo de confeção em minutos.
+
+    @param value Inteiro, ou texto como "30", "30 minutos", "1 hora", "1h30" ou "2 horas e 15 minutos".
+
+    @return <int> Minutos, ou None se o valor não tiver números.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).lower()
+    hours = _HOURS.search(text)
+    minutes = _MINUTES.search(text)
+    if hours or minutes:
+        total = float(hours.group(1).replace(",", ".")) * 60 if hours else 0
+        if minutes:
+            total += int(minutes.group(1))
+        elif hours:
+            # "1h30" -> the number right after the hours are minutes
+            rest = _NUMBER.search(text, hours.end())
+            total += int(rest.group()) if rest else 0
+        return int(total)
+    number = _NUMBER.search(text)
+    return int(number.group()) if number else None
+
+
+def parse_servings(value):
+    """
+    @brief Converte um número de porções em inteiro.
+
+    @param value Inteiro, ou texto como "4" ou "4 pessoas".
+
+    @return <int> Número de porções, ou None se o valor não tiver números.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    number = _NUMBER.search(str(value))
+    return int(number.group()) if number else None
+
+
+def _keys(names, split_words):
+    keys = set()
+    for name in names:
+        folded = fold(name)
+        if not folded:
+            continue
+        keys.add(folded)
+        if split_words:
+            keys.update(word for word in folded.split() if len(word) >= MIN_WORD_LENGTH)
+    return frozenset(keys)
+
+
+def _ids(bitmap):
+    ids = []
+    while bitmap:
+        low = bitmap & -bitmap
+        ids.append(low.bit_length() - 1)
+        bitmap ^= low
+    return ids
+
+
+class _RangeIndex:
+    """
+    @brief Bitmaps cumulativos de um valor numérico (tempo de confeção ou porções).
+    """
+
+    def __init__(self):
+        self.by_value = {}
+        self.values = []
+        self.prefix = []
+
+    def add(self, value, bit):
+        if value is not None:
+            self.by_value[value] = self.by_value.get(value, 0) | bit
+
+    def remove(self, value, bit):
+        if value in self.by_value:
+            self.by_value[value] &= ~bit
+            if not self.by_value[value]:
+                del self.by_value[value]
+
+    def rebuild(self):
+        # prefix[i] = recipes whose value is <= values[i]
+        self.values = sorted(self.by_value)
+        self.prefix = []
+        acc = 0
+        for value in self.values:
+            acc |= self.by_value[value]
+            self.prefix.append(acc)
+
+    def at_most(self, value):
+        i = bisect.bisect_right(self.values, value)
+        return self.prefix[i - 1] if i else 0
+
+    def at_least(self, value):
+        i = bisect.bisect_left(self.values, value)
+        return self.prefix[-1] & ~self.prefix[i - 1] if i else (self.prefix[-1] if self.prefix else 0)
+
+
+class FacetIndex:
+    """
+    @brief Índices invertidos (em bitmaps) das facetas das receitas.
+    """
+
+    def __init__(self):
+        self.all = 0
+        self.postings = {facet: {} for facet in FACETS}
+        self.time = _RangeIndex()
+        self.servings = _RangeIndex()
+        self.entries = {}
+        self.recipes = {}
+
+    @staticmethod
+    def _entry(recipe):
+        return (
+            _keys(recipe.tags, split_words=False),
+            _keys([i['name'] for i in recipe.ingredients], split_words=True),
+            _keys(recipe.tools, split_words=True),
+            parse_minutes(recipe.cooking_time),
+            parse_servings(recipe.number_of_servings),
+        )
+
+    def _add(self, recipe_id, entry):
+        bit = 1 << recipe_id
+        self.all |= bit
+        for facet, keys in zip(FACETS, entry):
+            postings = self.postings[facet]
+            for key in keys:
+                postings[key] = postings.get(key, 0) | bit
+        self.time.add(entry[3], bit)
+        self.servings.add(entry[4], bit)
+        self.entries[recipe_id] = entry
+
+    def _remove(self, recipe_id):
+        entry = self.entries.pop(recipe_id)
+        bit = 1 << recipe_id
+        self.all &= ~bit
+        for facet, keys in zip(FACETS, entry):
+            postings = self.postings[facet]
+            for key in keys:
+                postings[key] &= ~bit
+                if not postings[key]:
+                    del postings[key]
+        self.time.remove(entry[3], bit)
+        self.servings.remove(entry[4], bit)
+
+    def update(self, recipes):
+        """
+        @brief Sincroniza o índice com um conjunto de receitas, mexendo apenas nas que mudaram.
+
+        @param recipes <dict> recipe_id -> `CatalogRecipe` (por exemplo `CatalogSnapshot.recipes`).
+
+        @return <int> Número de receitas inseridas, removidas ou alteradas.
+        """
+        changed = 0
+        for recipe_id in [i for i in self.entries if i not in recipes]:
+            self._remove(recipe_id)
+            changed += 1
+        for recipe_id, recipe in recipes.items():
+            entry = self._entry(recipe)
+            old = self.entries.get(recipe_id)
+            if old == entry:
+                continue
+            if old is not None:
+                self._remove(recipe_id)
+            self._add(recipe_id, entry)
+            changed += 1
+        if changed:
+            self.time.rebuild()
+            self.servings.rebuild()
+        self.recipes = recipes
+        return changed
+
+    def _lookup(self, facet, values, match_all):
+        postings = self.postings[facet]
+        bitmaps = [postings.get(fold(value), 0) for value in values]
+        if match_all:
+            result = self.all
+            for bitmap in bitmaps:
+                result &= bitmap
+            return result
+        result = 0
+        for bitmap in bitmaps:
+            result |= bitmap
+        return result
+
+    def query(self, tags=(), ingredients=(), tools=(), without_tags=(), without_ingredients=(), without_tools=(),
+              min_time=None, max_time=None, min_servings=None, max_servings=None):
+        """
+        @brief Receitas que cumprem todos os filtros indicados.
+        @details Os filtros "com" exigem todos os valores (interseção); os filtros "sem" excluem qualquer receita
+        que tenha algum dos valores.
+
+        @return <list> IDs das receitas por ordem crescente.
+        """
+        result = self.all
+        for facet, values in zip(FACETS, (tags, ingredients, tools)):
+            if values:
+                result &= self._lookup(facet, values, match_all=True)
+        for facet, values in zip(FACETS, (without_tags, without_ingredients, without_tools)):
+            if values:
+                result &= ~self._lookup(facet, values, match_all=False)
+        if max_time is not None:
+            result &= self.time.at_most(max_time)
+        if min_time is not None:
+            result &= self.time.at_least(min_time)
+        if max_servings is not None:
+            result &= self.servings.at_most(max_servings)
+        if min_servings is not None:
+            result &= self.servings.at_least(min_servings)
+        return _ids(result)
+
+    def counts(self):
+        """
+        @brief Número de receitas por valor de cada faceta de texto (incluindo as palavras dos nomes).
+
+        @return <dict> {'tags': {valor: n}, 'ingredients': {...}, 'tools': {...}}
+        """
+        return {
+            facet: {key: bin(bitmap).count("1") for key, bitmap in sorted(self.postings[facet].items())}
+            for facet in FACETS
+        }
+
+
+## @var index
+# @brief Índice facetado partilhado pelo processo.
+index = FacetIndex()
+_index_snapshot = None
+_index_lock = threading.RLock()
+
+
+def get_index():
+    """
+    @brief Obtém o índice facetado, atualizando-o de forma incremental se o catálogo carregou um snapshot novo.
+
+    @return <FacetIndex> Índice atual, ou None se o catálogo não estiver disponível.
+    """
+    global _index_snapshot
+    snapshot = rc.catalog.snapshot()
+    if snapshot is None:
+        return None
+    if snapshot is not _index_snapshot:
+        with _index_lock:
+            if snapshot is not _index_snapshot:
+                changed = index.update(snapshot.recipes)
+                if changed:
+                    print(f"Índice facetado atualizado: {changed} receitas alteradas")
+                _index_snapshot = snapshot
+    return index
+
+
+def search(limit=None, **filters):
+    """
+    @brief Pesquisa facetada de receitas. Ver `FacetIndex.query()` para os filtros aceites.
+
+    @param limit Número máximo de resultados (por omissão, todos).
+
+    @return <list> Lista de dicionários {'recipe_id', 'name', 'cooking_time', 'number_of_servings'};
+    vazia se o catálogo não estiver disponível.
+    """
+    with _index_lock:
+        current = get_index()
+        if current is None:
+            return []
+        recipe_ids = current.query(**filters)
+        recipes = current.recipes
+    if limit is not None:
+        recipe_ids = recipe_ids[:limit]
+    return [
+        {
+            'recipe_id': recipe_id,
+            'name': recipes[recipe_id].name,
+            'cooking_time': parse_minutes(recipes[recipe_id].cooking_time),
+            'number_of_servings': parse_servings(recipes[recipe_id].number_of_servings),
+        }
+        for recipe_id in recipe_ids
+    ]
+
+
+def facet_counts():
+    """
+    @brief Valores disponíveis em cada faceta e número de receitas de cada um.
+
+    @return <dict> Ver `FacetIndex.counts()`; vazio se o catálogo não estiver disponível.
+    """
+    with _index_lock:
+        current = get_index()
+        return current.counts() if current is not None else {}
+
+
+def get_recipe_ids_by_tag(tag):
+    """
+    @brief IDs das receitas com uma tag, ignorando acentos e maiúsculas.
+
+    @param tag Nome da tag.
+
+    @return <list> Lista de IDs, ou None se nenhuma receita tiver a tag (como `recipedb_queries.getRecipeByTag()`).
+    """
+    with _index_lock:
+        current = get_index()
+        if current is None:
+            return db.getRecipeByTag(tag)
+        return current.query(tags=[tag]) or None
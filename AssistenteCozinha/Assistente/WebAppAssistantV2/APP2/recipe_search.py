@@ -0,0 +1,187 @@
+"""
+@brief Módulo de pesquisa aproximada de receitas pelo nome.
+
+O reconhecimento de voz raramente devolve o nome de uma receita exatamente como está na base de dados
+("ameijoas a bulhao pato" em vez de "Amêijoas à Bulhão Pato"), por isso a procura exata de `getRecipe(name)` falha.
+Este módulo mantém em memória um índice de trigramas sobre os nomes do catálogo de receitas, tolerante a acentos,
+maiúsculas e pequenos erros de escrita.
+
+@details Como funciona:
+- Os nomes e as pesquisas são normalizados com `fold()`: sem acentos, em minúsculas e só com letras e dígitos.
+- Cada palavra é partida em trigramas (" am", "ame", "mei", ...); o índice invertido guarda, para cada trigrama,
+  as receitas cujo nome o contém.
+- Uma pesquisa só visita as listas dos trigramas da própria pesquisa e pontua as receitas candidatas pela
+  sobreposição de trigramas (coeficiente de Dice combinado com a fração da pesquisa encontrada no nome).
+- O índice é reconstruído quando o `recipe_catalog` carrega um snapshot novo.
+
+@code
+    import recipe_search as rs
+    print(rs.search("ameijoas bulhao pato"))
+    # [{'recipe_id': 62, 'name': 'Amêijoas à Bulhão Pato', 'score': 0.93}]
+    print(rs.find_recipe("amejoas a bulhao"))
+    # 62
+@endcode
+
+@note Se o catálogo não estiver disponível, `find_recipe()` recorre à procura exata de `recipedb_queries.getRecipe()`.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import recipe_catalog as rc
+import recipedb_queries as db
+
+## @var MIN_SCORE
+# @brief Pontuação mínima (0 a 1) para uma receita ser considerada resultado de uma pesquisa.
+MIN_SCORE = 0.3
+
+## @var DEFAULT_LIMIT
+# @brief Número de resultados devolvidos por omissão.
+DEFAULT_LIMIT = 5
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def fold(text):
+    """
+    @brief Normaliza um texto para comparação: remove acentos, passa a minúsculas e reduz a pontuação a espaços.
+
+    @param text Texto a normalizar.
+
+    @return <string> Texto normalizado, por exemplo "Amêijoas à Bulhão Pato" -> "ameijoas a bulhao pato".
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def trigrams(folded):
+    """
+    @brief Conjunto de trigramas das palavras de um texto já normalizado.
+    @details Cada palavra é delimitada por espaços antes de ser partida, para que o início e o fim das palavras
+    também contem ("pato" -> " pa", "pat", "ato", "to ").
+
+    @param folded Texto normalizado com `fold()`.
+
+    @return <frozenset> Trigramas do texto.
+    """
+    grams = set()
+    for word in folded.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class NameIndex:
+    """
+    @brief Índice invertido de trigramas sobre os nomes das receitas.
+    """
+
+    def __init__(self, recipes):
+        """
+        @param recipes Iterável de pares (recipe_id, nome).
+        """
+        self.names = {}
+        self.exact = {}
+        self.sizes = {}
+        self.postings = {}
+        for recipe_id, name in recipes:
+            folded = fold(name)
+            grams = trigrams(folded)
+            self.names[recipe_id] = name
+            self.exact.setdefault(folded, recipe_id)
+            self.sizes[recipe_id] = len(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(recipe_id)
+
+    def search(self, query, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+        """
+        @brief Procura as receitas cujo nome mais se aproxima da pesquisa.
+
+        @param query Texto da pesquisa (por exemplo, o texto reconhecido pelo ASR).
+        @param limit Número máximo de resultados.
+        @param min_score Pontuação mínima dos resultados.
+
+        @return <list> Lista de dicionários {'recipe_id', 'name', 'score'} por ordem decrescente de pontuação.
+        """
+        folded = fold(query)
+        if not folded:
+            return []
+        query_grams = trigrams(folded)
+
+        common = Counter()
+        for gram in query_grams:
+            common.update(self.postings.get(gram, ()))
+
+        exact_id = self.exact.get(folded)
+        scored = []
+        for recipe_id, shared in common.items():
+            if recipe_id == exact_id:
+                score = 1.0
+            else:
+                dice = 2 * shared / (len(query_grams) + self.sizes[recipe_id])
+                coverage = shared / len(query_grams)
+                # Never let a fuzzy match tie with the exact one
+                score = min(0.5 * dice + 0.5 * coverage, 0.99)
+            if score >= min_score:
+                scored.append((score, recipe_id))
+
+        best = heapq.nlargest(limit, scored)
+        return [
+            {'recipe_id': recipe_id, 'name': self.names[recipe_id], 'score': round(score, 3)}
+            for score, recipe_id in best
+        ]
+
+
+_index = None
+_index_snapshot = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    @brief Obtém o índice de nomes do snapshot atual do catálogo, reconstruindo-o se o catálogo mudou.
+
+    @return <NameIndex> Índice atual, ou None se o catálogo não estiver disponível.
+    """
+    global _index, _index_snapshot
+    snapshot = rc.catalog.snapshot()
+    if snapshot is None:
+        return None
+    if snapshot is _index_snapshot:
+        return _index
+    with _index_lock:
+        if snapshot is not _index_snapshot:
+            _index = NameIndex((r.recipe_id, r.name) for r in snapshot.recipes.values())
+            _index_snapshot = snapshot
+        return _index
+
+
+def search(query, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+    """
+    @brief Pesquisa aproximada de receitas pelo nome. Ver `NameIndex.search()`.
+
+    @return <list> Lista de dicionários {'recipe_id', 'name', 'score'}; vazia se o catálogo não estiver disponível.
+    """
+    index = get_index()
+    if index is None:
+        return []
+    return index.search(query, limit, min_score)
+
+
+def find_recipe(name, min_score=MIN_SCORE):
+    """
+    @brief ID da receita cujo nome mais se aproxima do nome dado.
+
+    @param name Nome da receita, tal como foi dito ou escrito.
+    @param min_score Pontuação mínima aceite.
+
+    @return <int> ID da melhor receita, ou None se nenhuma tiver pontuação suficiente.
+    """
+    index = get_index()
+    if index is None:
+        return db.getRecipe(name)
+    results = index.search(name, 1, min_score)
+    return results[0]['recipe_id'] if results else None
@@ -3,6 +3,8 @@
 
 Este módulo oferece várias funções para aceder e manipular dados armazenados na base de dados de receitas.
 As funções cobrem a procura de receitas, ingredientes, ferramentas usadas nas receitas e instruções de cozinha.
+O resumo de cada receita (calorias por porção, número de ingredientes, passos e utensílios, minutos de confeção)
+está materializado na tabela `recipe_summary`, atualizada na ingestão com `refreshRecipeSummary()`.
 
 @details As funções utilizam a biblioteca `mysql.connector` para conectar-se e realizar consultas na base de dados.
 Cada função é responsável por uma tarefa específica, como buscar receitas por nome ou tag, listar ingredientes de uma
@@ -10,7 +12,7 @@ receita, ou obter a próxima instrução de cozinha para uma receita.
 
 <b>Dependencies:</b>
 - mysql.connector
-- random
+- db_pool
 
 <b>Usage:</b>
 - As funções podem ser importadas e usadas em outros scripts para criar, acessar e manipular dados de receitas.
@@ -31,14 +33,14 @@ Para instalar, utilize um dos comandos a seguir dependendo do seu ambiente:
 - conda install mysql-connector-python
 
 """
-import mysql.connector
 from mysql.connector import Error
-import random
+import db_pool
 
 def create_connection():
     """ 
-    @brief Estabelece conexão com a base de dados MariaDB.
-    @details Esta função cria uma conexão com a base de dados MariaDB utilizando as credenciais fornecidas.
+    @brief Obtém uma conexão à base de dados MariaDB a partir do pool partilhado.
+    @details Esta função empresta uma conexão do pool de `recipe_database` (ver `db_pool`). 
+    Chamar `close()` na conexão devolve-a ao pool em vez de a fechar.
     
     @return Retorna a conexão se bem sucedida; None se houver erro.
     
@@ -47,13 +49,7 @@ def create_connection():
     @warning Esta conneção não é segura e deve ser usada apenas para fins de demonstração e testes.
     """
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="admin",
-            password="admin",
-            database="recipe_database"
-        )
-        return connection
+        return db_pool.get_connection("recipe_database")
     except Error as e:
         print(f"Erro ao conectar ao MariaDB: {e}")
         return None
@@ -217,13 +213,13 @@ def getRandomRecipe():
     conn = create_connection()
     if conn is None:
         return None
-    query = "SELECT recipe_id FROM recipes"
+    # Let the server pick the row so only one id crosses the wire
+    query = "SELECT recipe_id FROM recipes ORDER BY RAND() LIMIT 1"
     try:
         cursor = conn.cursor()
         cursor.execute(query)
-        recipes = cursor.fetchall()
-        random_recipe_id = random.choice(recipes)[0]
-        return random_recipe_id
+        recipe = cursor.fetchone()
+        return recipe[0] if recipe else None
     except Error as e:
         print(f"Erro: {e}")
         return None
@@ -375,6 +371,128 @@ def getImg_url(recipe_id):
     finally:
         cursor.close()
         conn.close()
+
+
+## @var SUMMARY_UPSERT
+# @brief Recalcula as linhas de `recipe_summary` (calorias por porção, contagens e minutos de confeção).
+# @details O marcador `{where}` recebe um filtro opcional sobre `recipes r`; sem filtro recalcula todas as receitas.
+# Os minutos de confeção não são calculados aqui: `recipes.cooking_time` é texto livre ("1 hora", "1h30") e é
+# convertido em Python por `refreshRecipeSummary()`, com as mesmas regras dos filtros (`recipe_facets.parse_minutes`).
+SUMMARY_UPSERT = """
+    INSERT INTO recipe_summary
+        (recipe_id, name, number_of_servings, calories_per_portion,
+         ingredient_count, step_count, tool_count)
+    SELECT
+        r.recipe_id,
+        r.name,
+        r.number_of_servings,
+        (SELECT SUM(ri.calories) FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id)
+            / NULLIF(r.number_of_servings, 0),
+        (SELECT COUNT(*) FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id),
+        (SELECT COUNT(*) FROM recipe_instructions rs WHERE rs.recipe_id = r.recipe_id),
+        (SELECT COUNT(DISTINCT it.tool_id)
+            FROM recipe_instructions rs
+            JOIN instructions_tools it ON it.recipe_instruction_id = rs.recipe_instruction_id
+            WHERE rs.recipe_id = r.recipe_id)
+    FROM recipes r {where}
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name),
+        number_of_servings = VALUES(number_of_servings),
+        calories_per_portion = VALUES(calories_per_portion),
+        ingredient_count = VALUES(ingredient_count),
+        step_count = VALUES(step_count),
+        tool_count = VALUES(tool_count)
+"""
+
+def refreshRecipeSummary(recipe_id=None):
+    """
+    @brief Atualiza o resumo materializado (`recipe_summary`) de uma receita ou de todas.
+    @details Deve ser chamada depois de inserir ou alterar uma receita (ingredientes, passos ou utensílios),
+    para que as listagens não tenham de recalcular calorias e contagens em cada leitura.
+    Os minutos de confeção são convertidos com `recipe_facets.parse_minutes()` e gravados na mesma transação,
+    por isso `/recipes/summary` e os filtros por tempo dão o mesmo valor ("1h30" -> 90).
+    
+    @param recipe_id ID da receita a atualizar; None atualiza todas as receitas.
+    
+    @return Número de linhas afetadas se bem sucedida; None se houver erro.
+    """
+    # recipe_facets imports this module, so it is only imported when needed
+    from recipe_facets import parse_minutes
+
+    conn = create_connection()
+    if conn is None:
+        return None
+    if recipe_id is None:
+        query, params = SUMMARY_UPSERT.format(where=""), ()
+        times_query = "SELECT recipe_id, cooking_time FROM recipes"
+    else:
+        query, params = SUMMARY_UPSERT.format(where="WHERE r.recipe_id = %s"), (recipe_id,)
+        times_query = "SELECT recipe_id, cooking_time FROM recipes WHERE recipe_id = %s"
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        affected = cursor.rowcount
+        cursor.execute(times_query, params)
+        cursor.executemany("UPDATE recipe_summary SET cooking_minutes = %s WHERE recipe_id = %s",
+                           [(parse_minutes(cooking_time), rid) for rid, cooking_time in cursor.fetchall()])
+        conn.commit()
+        return affected
+    except Error as e:
+        print(f"Erro: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def getRecipeSummaries():
+    """
+    @brief Procura o resumo de todas as receitas, ordenado pelo nome.
+    @details Lê apenas a tabela `recipe_summary`, sem juntar ingredientes, passos ou utensílios.
+    
+    @return Lista de dicionários com recipe_id, name, number_of_servings, cooking_minutes, calories_per_portion,
+    ingredient_count, step_count e tool_count; lista vazia se houver erro.
+    """
+    conn = create_connection()
+    if conn is None:
+        return []
+    query = """SELECT recipe_id, name, number_of_servings, cooking_minutes, calories_per_portion,
+                      ingredient_count, step_count, tool_count
+               FROM recipe_summary ORDER BY name"""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query)
+        return cursor.fetchall()
+    except Error as e:
+        print(f"Erro: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
+
+def getRecipeSummary(recipe_id):
+    """
+    @brief Procura o resumo de uma receita.
+    
+    @param recipe_id ID da receita.
+    
+    @return Dicionário com os mesmos campos de `getRecipeSummaries()`; None se não existir ou houver erro.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
+    query = """SELECT recipe_id, name, number_of_servings, cooking_minutes, calories_per_portion,
+                      ingredient_count, step_count, tool_count
+               FROM recipe_summary WHERE recipe_id = %s"""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, (recipe_id,))
+        return cursor.fetchone()
+    except Error as e:
+        print(f"Erro: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
         
 # Exemplo de como utilizar as funções modificadas
 # recipes = getRecipes()
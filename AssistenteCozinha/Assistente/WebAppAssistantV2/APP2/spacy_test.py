@@ -11,7 +11,7 @@ A função principal analisa uma frase e retorna o ingrediente encontrado, basea
 tendo em conta variações lexicais e lematização para melhorar a precisão da correspondência.
 
 <b>Dependencies:</b>
-- spacy
+- spacy (através do módulo `nlp_service`, que carrega o modelo partilhado só na primeira utilização)
 
 <b>Usage:</b>
 - Este módulo pode ser usado em contextos onde é necessário extrair ingredientes de textos, como em sistemas de recomendação de receitas ou análises de listas de compras.
@@ -28,16 +28,7 @@ Os comandos para instalar o modelo são:
 - python -m spacy download pt_core_news_sm
 
 """
-import spacy
-
-## @var nlp
-# @brief Modelo de linguagem do spaCy para processamento de texto em português.
-# @details Este modelo é utilizado para processar o texto da frase e identificar os ingredientes mencionados.
-#
-# @note O modelo 'pt_core_news_sm' deve ser instalado previamente para o funcionamento correto do módulo.
-#     - python -m spacy download pt_core_news_sm
-#
-nlp = spacy.load("pt_core_news_sm")
+import nlp_service as ns
 
 def get_unit(sentence, lista):
     """
@@ -50,10 +41,10 @@ def get_unit(sentence, lista):
     @return O ingrediente identificado na sentença; None se nenhum correspondente for encontrado.
     """
     # Process the sentence using spaCy to tokenize and lemmatize the text
-    doc = nlp(sentence.lower())
+    doc = ns.process(sentence.lower())
 
-    # Convert list to a set of lemmas and original text to improve matching chances
-    lemmatized_list = {nlp(word.lower())[0].lemma_ for word in lista}
+    # Convert list to a set of lemmas and original text to improve matching chances (one batch for the whole list)
+    lemmatized_list = {doc_word[0].lemma_ for doc_word in ns.pipe([word.lower() for word in lista])}
     original_list = set(lista)
 
     # Check for multi-word units first
@@ -150,4 +141,6 @@ food_list = [
 #
 # @note Esta frase pode ser alterada para testar a função com diferentes ingredientes.
 sentence = "confirma se tenho vinagre"
-print(get_unit(sentence, food_list))  
+
+if __name__ == "__main__":
+    print(get_unit(sentence, food_list))  
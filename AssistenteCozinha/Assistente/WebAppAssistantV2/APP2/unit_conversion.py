@@ -0,0 +1,278 @@
+"""
+@brief Módulo de conversão de unidades de medida da despensa e das receitas.
+
+Compila uma única vez o grafo de fatores de conversão (`pantrydb_queries.conversion_factors`) numa tabela com o
+fator de cada par de unidades, para que uma conversão seja apenas uma consulta a um dicionário e uma multiplicação,
+em vez de uma pesquisa recursiva no grafo em cada chamada.
+
+@details Como funciona:
+- As unidades são normalizadas com `normalize_unit()`: minúsculas, sinónimos ("gramas" -> "g", "litros" -> "l")
+  e plurais ("latas" -> "lata", "colheres de sopa" -> "colher de sopa").
+- Cada unidade tem uma dimensão, massa ou volume, herdada das unidades métricas a que está ligada
+  ("tablete" -> g é massa, "lata" -> ml é volume).
+- Para cada unidade é feita uma pesquisa em largura pelas arestas da mesma dimensão; o fator de cada par de
+  unidades é o produto dos fatores do caminho mais curto entre elas.
+- As conversões entre massa e volume passam por g <-> ml com a densidade do ingrediente (`DENSITIES`, em g/ml);
+  sem ingrediente conhecido assume-se a densidade da água (1 g = 1 ml), como nos fatores originais.
+- `UnitConverter.convert_array()` converte listas inteiras de quantidades de uma vez (NumPy), para agregações de
+  stock e para o `pantry_matcher`.
+
+@code
+    import unit_conversion as uc
+    converter = uc.UnitConverter(pdb.conversion_factors)
+    print(converter.convert(Decimal('2'), 'latas', 'l'))                         # (Decimal('0.660'), 'l')
+    print(converter.convert(Decimal('250'), 'ml', 'g', ingredient='farinha'))    # (Decimal('137.50'), 'g')
+    print(converter.convert_array([1, 2, 500], ['kg', 'tabletes', 'g'], 'g'))     # [1000.  400.  500.]
+@endcode
+
+@note Precisa da biblioteca `numpy` para `convert_array()`:
+- pip install numpy
+"""
+import re
+import unicodedata
+from collections import deque
+from decimal import Decimal
+
+import numpy as np
+
+## @var MASS_UNIT
+# @brief Unidade métrica de referência para massa.
+MASS_UNIT = "g"
+
+## @var VOLUME_UNIT
+# @brief Unidade métrica de referência para volume.
+VOLUME_UNIT = "ml"
+
+## @var DIMENSIONS
+# @brief Dimensão das unidades métricas; as restantes unidades herdam a dimensão das unidades a que estão ligadas.
+DIMENSIONS = {
+    'mg': 'mass', 'g': 'mass', 'kg': 'mass',
+    'ml': 'volume', 'cl': 'volume', 'dl': 'volume', 'l': 'volume',
+}
+
+## @var UNIT_ALIASES
+# @brief Sinónimos e abreviaturas das unidades, já em minúsculas.
+UNIT_ALIASES = {
+    'grama': 'g', 'gramas': 'g', 'gr': 'g', 'grs': 'g',
+    'miligrama': 'mg', 'miligramas': 'mg',
+    'quilo': 'kg', 'quilos': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'quilograma': 'kg', 'quilogramas': 'kg',
+    'litro': 'l', 'litros': 'l', 'lt': 'l', 'lts': 'l',
+    'mililitro': 'ml', 'mililitros': 'ml',
+    'centilitro': 'cl', 'centilitros': 'cl',
+    'decilitro': 'dl', 'decilitros': 'dl',
+    'colheres de sopa': 'colher de sopa', 'colheres de chá': 'colher de chá',
+    'unidade': 'uni', 'unidades': 'uni', 'un': 'uni',
+}
+
+## @var DENSITIES
+# @brief Densidade aproximada de alguns ingredientes, em gramas por mililitro.
+# @details Usada nas conversões entre massa e volume ("1 copo de farinha" em gramas). A chave é comparada com o
+# nome do ingrediente sem acentos e em minúsculas, inteiro ou palavra a palavra.
+DENSITIES = {
+    'agua': Decimal('1'),
+    'leite': Decimal('1.03'),
+    'natas': Decimal('1.01'),
+    'azeite': Decimal('0.91'),
+    'oleo': Decimal('0.92'),
+    'manteiga': Decimal('0.96'),
+    'mel': Decimal('1.42'),
+    'farinha': Decimal('0.55'),
+    'acucar': Decimal('0.85'),
+    'sal': Decimal('1.2'),
+    'arroz': Decimal('0.85'),
+    'cacau': Decimal('0.45'),
+}
+
+_WATER = Decimal('1')
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _fold(text):
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def normalize_unit(unit, known_units=()):
+    """
+    @brief Normaliza o nome de uma unidade.
+
+    @param unit Nome da unidade tal como foi escrito ou dito ("Gramas", "latas", "kg").
+    @param known_units Unidades conhecidas; um plural só perde o "s" final se a forma singular for conhecida.
+
+    @return <string> Nome normalizado da unidade.
+    """
+    text = " ".join(str(unit).lower().split())
+    text = UNIT_ALIASES.get(text, text)
+    if text not in known_units and text.endswith("s") and text[:-1] in known_units:
+        return text[:-1]
+    return text
+
+
+class UnitConverter:
+    """
+    @brief Tabela compilada com o fator de conversão de cada par de unidades.
+    """
+
+    def __init__(self, conversion_factors, densities=DENSITIES):
+        """
+        @param conversion_factors <dict> unidade -> {unidade: fator}, em que 1 unidade = fator outra unidade.
+        @param densities <dict> ingrediente -> densidade em g/ml.
+        """
+        self.conversion_factors = conversion_factors
+        self.densities = {_fold(name): Decimal(density) for name, density in densities.items()}
+        self._density_cache = {}
+
+        # Undirected graph: every factor also gives the reverse edge
+        edges = {}
+        for unit, targets in conversion_factors.items():
+            for target, factor in targets.items():
+                if unit == target:
+                    continue
+                edges.setdefault(unit, {})[target] = Decimal(factor)
+                edges.setdefault(target, {}).setdefault(unit, 1 / Decimal(factor))
+        self.units = frozenset(edges) | frozenset(conversion_factors)
+
+        # Dimension of each unit, propagated from the metric units through the non-metric ones
+        self.dimensions = {}
+        for start in DIMENSIONS:
+            if start not in self.units:
+                continue
+            queue = deque([start])
+            while queue:
+                unit = queue.popleft()
+                if unit in self.dimensions:
+                    continue
+                self.dimensions[unit] = DIMENSIONS[start]
+                queue.extend(n for n in edges.get(unit, ()) if n not in DIMENSIONS and n not in self.dimensions)
+
+        # Shortest path (fewest hops) from every unit to every unit of the same dimension
+        self.table = {}
+        for source in self.units:
+            factors = {source: Decimal('1')}
+            queue = deque([source])
+            while queue:
+                unit = queue.popleft()
+                for neighbour, factor in edges.get(unit, {}).items():
+                    if neighbour in factors or not self._same_dimension(unit, neighbour):
+                        continue
+                    factors[neighbour] = factors[unit] * factor
+                    queue.append(neighbour)
+            self.table[source] = factors
+
+        # Float copy of the factors to the reference units, for convert_array()
+        self.index = {unit: i for i, unit in enumerate(sorted(self.units))}
+        self._to_mass = np.full(len(self.index), np.nan)
+        self._to_volume = np.full(len(self.index), np.nan)
+        for unit, i in self.index.items():
+            if MASS_UNIT in self.table[unit]:
+                self._to_mass[i] = float(self.table[unit][MASS_UNIT])
+            if VOLUME_UNIT in self.table[unit]:
+                self._to_volume[i] = float(self.table[unit][VOLUME_UNIT])
+
+    def _same_dimension(self, a, b):
+        return self.dimensions.get(a) == self.dimensions.get(b)
+
+    def normalize(self, unit):
+        """
+        @brief Normaliza uma unidade com `normalize_unit()` usando as unidades desta tabela.
+        """
+        return normalize_unit(unit, self.units)
+
+    def density(self, ingredient):
+        """
+        @brief Densidade de um ingrediente em g/ml.
+
+        @param ingredient Nome do ingrediente, ou None.
+
+        @return <Decimal> Densidade conhecida do nome completo ou de uma das suas palavras; a da água caso contrário.
+        """
+        if not ingredient:
+            return _WATER
+        density = self._density_cache.get(ingredient)
+        if density is None:
+            folded = _fold(ingredient)
+            density = self.densities.get(folded)
+            if density is None:
+                density = next((self.densities[w] for w in folded.split() if w in self.densities), _WATER)
+            self._density_cache[ingredient] = density
+        return density
+
+    def factor(self, from_unit, to_unit, ingredient=None):
+        """
+        @brief Fator de conversão entre duas unidades.
+
+        @param from_unit Unidade inicial.
+        @param to_unit Unidade final.
+        @param ingredient Nome do ingrediente, para as conversões entre massa e volume.
+
+        @return <Decimal> Fator tal que quantidade_final = quantidade * fator; None se não houver conversão.
+        """
+        from_unit = self.normalize(from_unit)
+        to_unit = self.normalize(to_unit)
+        direct = self.table.get(from_unit, {}).get(to_unit)
+        if direct is not None:
+            return direct
+        source, target = self.dimensions.get(from_unit), self.dimensions.get(to_unit)
+        if source is None or target is None:
+            return None
+        if source == 'mass':
+            # mass -> g -> ml -> volume
+            return (self.table[from_unit][MASS_UNIT] / self.density(ingredient)
+                    * self.table[VOLUME_UNIT][to_unit])
+        return self.table[from_unit][VOLUME_UNIT] * self.density(ingredient) * self.table[MASS_UNIT][to_unit]
+
+    def convert(self, quantity, from_unit, to_unit, ingredient=None):
+        """
+        @brief Converte uma quantidade de uma unidade para outra.
+
+        @param quantity Quantidade (Decimal, int, float ou string).
+        @param from_unit Unidade inicial.
+        @param to_unit Unidade final.
+        @param ingredient Nome do ingrediente, para as conversões entre massa e volume.
+
+        @return <tuplo> (quantidade convertida em Decimal, unidade final normalizada).
+
+        @warning ValueError Se não houver conversão entre as duas unidades.
+        """
+        factor = self.factor(from_unit, to_unit, ingredient)
+        if factor is None:
+            raise ValueError("No valid conversion path found from {} to {}".format(from_unit, to_unit))
+        if not isinstance(quantity, Decimal):
+            quantity = Decimal(str(quantity))
+        return quantity * factor, self.normalize(to_unit)
+
+    def convert_array(self, quantities, from_units, to_unit, ingredients=None):
+        """
+        @brief Converte várias quantidades de uma vez para a mesma unidade.
+
+        @param quantities Sequência de quantidades (números, Decimal ou None).
+        @param from_units Sequência com a unidade de cada quantidade.
+        @param to_unit Unidade final, comum a todas.
+        @param ingredients Sequência opcional com o nome do ingrediente de cada quantidade (densidades).
+
+        @return <numpy.ndarray> Quantidades convertidas (float); NaN onde não houver quantidade ou conversão.
+        """
+        count = len(quantities)
+        values = np.array([np.nan if q is None else float(q) for q in quantities], dtype=float)
+        columns = np.array([self.index.get(self.normalize(u), -1) if u else -1 for u in from_units], dtype=int)
+        known = columns >= 0
+        columns = np.where(known, columns, 0)
+
+        to_unit = self.normalize(to_unit)
+        target = self.dimensions.get(to_unit)
+        if target is None:
+            return np.full(count, np.nan)
+        mass = np.where(known, self._to_mass[columns], np.nan)
+        volume = np.where(known, self._to_volume[columns], np.nan)
+        if ingredients is None:
+            density = np.ones(count)
+        else:
+            density = np.array([float(self.density(name)) for name in ingredients], dtype=float)
+
+        if target == 'mass':
+            # units without a factor to g are volumes: ml * density = g
+            grams = np.where(np.isnan(mass), volume * density, mass)
+            return values * grams * float(self.table[MASS_UNIT][to_unit])
+        millilitres = np.where(np.isnan(volume), mass / density, volume)
+        return values * millilitres * float(self.table[VOLUME_UNIT][to_unit])
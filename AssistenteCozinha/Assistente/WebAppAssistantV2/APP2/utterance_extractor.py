@@ -0,0 +1,148 @@
+"""
+@brief Módulo que extrai de uma só vez a quantidade, o ingrediente, a unidade e a data de validade de um comando de voz.
+
+Para adicionar um produto por voz, o cliente chamava `/convert-text`, `/get-ingredient`, `/get-unit` e `/format-date`,
+e cada um destes endpoints voltava a separar a mesma frase em palavras. Este módulo separa a frase uma única vez
+(`get_product.tokenize()`) e, sobre essas palavras:
+- lê as quantidades com `convert_numbers_to_digit.parse_quantities()` ("quarenta e cinco" -> 45, "meio quilo" -> 0.5);
+- procura a data de validade com `format_date.find_dates()`, absoluta ou relativa ao dia de referência ("amanhã",
+  "daqui a cinco dias", "fim do mês");
+- procura os ingredientes e as unidades com o `Gazetteer` do `get_product`.
+
+@details Cada campo do resultado é None ou um dicionário {'value', 'text', 'start', 'end', 'confidence'}:
+- `value`: valor interpretado (número, entrada do vocabulário ou data ISO);
+- `text`: texto da frase que deu origem ao valor;
+- `start`/`end`: posições dos caracteres na frase normalizada (`normalized` no resultado);
+- `confidence`: entre 0 e 1; por exemplo, "um"/"uma" podem ser só artigos e uma unidade longe da quantidade é
+  menos provável.
+
+Os resultados ficam numa cache (LRU) indexada pela frase normalizada (minúsculas, espaços simples) e pelo dia,
+pelo que repetir o mesmo comando não volta a analisar a frase.
+
+@code
+    import utterance_extractor as ue
+    result = ue.extract("Adiciona quarenta e cinco gramas de manteiga com validade 21 de Maio de 2030")
+    print(result['quantity']['value'], result['unit']['value'],
+          result['ingredient']['value'], result['expiration_date']['value'])
+    //Output:
+    45 g manteiga 2030-05-21
+
+    for result in ue.extract_many(["comprei duas latas de atum", "usei 1,5 l de leite"]):
+        print(result['quantity']['value'], result['unit']['value'], result['ingredient']['value'])
+@endcode
+"""
+import copy
+from datetime import date
+from functools import lru_cache
+
+import convert_numbers_to_digit as convert
+import format_date as fd
+import get_product as gp
+from recipe_search import fold
+
+## @var CACHE_SIZE
+# @brief Número máximo de frases guardadas na cache de resultados.
+CACHE_SIZE = 1024
+
+## @var MAX_BATCH
+# @brief Número máximo de frases aceites num pedido em lote.
+MAX_BATCH = 100
+
+## @var ARTICLES
+# @brief Números por extenso que também são artigos ("uma lata" vs. "compra uma manteiga").
+ARTICLES = frozenset(("um", "uma"))
+
+
+def normalize(utterance):
+    """
+    @brief Forma normalizada de uma frase: minúsculas e espaços simples.
+    """
+    return " ".join((utterance or "").lower().split())
+
+
+def _find_date(text, today):
+    found = fd.find_dates(text, today)
+    if not found:
+        return None
+    return dict(found[0], confidence=1.0)
+
+
+def _field(text, start, end, value, confidence):
+    return {'value': value, 'text': text[start:end], 'start': start, 'end': end, 'confidence': confidence}
+
+
+def _extract(text, today):
+    # `today` is the reference day (ISO) for relative dates and part of the cache key
+    tokens = gp.tokenize(text)
+    quantities = convert.parse_quantities(text)
+    expiration = _find_date(text, date.fromisoformat(today))
+
+    def outside_date(start, end):
+        return expiration is None or end <= expiration['start'] or start >= expiration['end']
+
+    quantity = next((q for q in quantities if outside_date(q['start'], q['end'])), None)
+    if quantity is not None:
+        if quantity['text'][0].isdigit():
+            confidence = 1.0
+        else:
+            confidence = 0.6 if quantity['text'] in ARTICLES else 0.9
+        quantity = _field(text, quantity['start'], quantity['end'], quantity['value'], confidence)
+
+    spans = [span for span in gp.find_products(text, tokens) if outside_date(span['start'], span['end'])]
+    ingredient = gp.best_span(spans, 'ingredient')
+    if ingredient is not None:
+        exact = fold(ingredient['text']) == fold(ingredient['value'])
+        ingredient = _field(text, ingredient['start'], ingredient['end'], ingredient['value'], 1.0 if exact else 0.8)
+
+    unit = gp.best_span(spans, 'unit')
+    if unit is not None:
+        # A unit inside or right after the quantity ("2 latas", "200g", "meio quilo") is the quantity's unit
+        adjacent = quantity is not None and (quantity['start'] <= unit['start'] < quantity['end']
+                                             or not text[quantity['end']:unit['start']].strip())
+        unit = _field(text, unit['start'], unit['end'], unit['value'], 1.0 if adjacent else 0.6)
+
+    return {'normalized': text, 'quantity': quantity, 'ingredient': ingredient, 'unit': unit,
+            'expiration_date': expiration}
+
+
+_cached_extract = lru_cache(maxsize=CACHE_SIZE)(_extract)
+
+
+def extract(utterance, today=None):
+    """
+    @brief Extrai a quantidade, o ingrediente, a unidade e a data de validade de uma frase.
+
+    @param utterance <string> Frase reconhecida ("Adiciona três latas de atum que expiram a 2 de Maio de 2030").
+    @param today Dia de referência para as datas relativas (`datetime.date`); por omissão o dia de hoje.
+
+    @return <dict> {'text', 'normalized', 'quantity', 'ingredient', 'unit', 'expiration_date'}, em que cada campo
+    extraído é None ou {'value', 'text', 'start', 'end', 'confidence'} (posições em `normalized`).
+    """
+    today = today or date.today()
+    result = copy.deepcopy(_cached_extract(normalize(utterance), today.isoformat()))
+    result['text'] = utterance
+    return result
+
+
+def extract_many(utterances, today=None):
+    """
+    @brief Extrai os campos de várias frases (ver `extract()`).
+
+    @return <list> Um resultado por frase, pela mesma ordem.
+    """
+    today = today or date.today()
+    return [extract(utterance, today) for utterance in utterances]
+
+
+def cache_info():
+    """
+    @brief Estatísticas da cache de resultados (hits, misses, maxsize, currsize).
+    """
+    return _cached_extract.cache_info()
+
+
+def clear_cache():
+    """
+    @brief Esvazia a cache de resultados (por exemplo depois de alterar o vocabulário do `get_product`).
+    """
+    _cached_extract.cache_clear()
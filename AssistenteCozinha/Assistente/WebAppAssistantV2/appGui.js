@@ -90,6 +90,9 @@ mmiCli_Out.onMessage.on(im1MessageHandler);
 mmiCli_Out.onOpen.on(socketOpenHandler);
 mmiCli_Out.openSocket();
 
+// Keep the pantry and shopping lists up to date with the backend change feed
+start_change_feed();
+
 /**
  * @brief Manipula o evento de abertura de conexão do socket.
  * @details Chamado quando um evento 'open' é disparado no socket. Verifica se o estado do socket é 'OPEN',
@@ -178,6 +181,7 @@ function clearContent() {
     document.getElementById("title").innerHTML = "";
     document.getElementById("image-container").innerHTML = "";
     document.getElementById("table-container").innerHTML = "";
+    pantry_view_visible = false;
     }
 
 /** 
@@ -375,11 +379,12 @@ function addShoopingListTable(lista) {
  * @brief Adiciona uma tabela com os produtos na despensa do utilizador.
  * @details Adiciona uma nova tabela com os produtos na despensa do utilizador à homepage do Assistente, exibindo-a na interface do utilizador.
  * 
- * @param {array} lista - A lista de produtos na despensa do utilizador.
+ * @param {array} lista - A lista de lotes na despensa do utilizador (ver `get_pantry_products()`).
  * 
  * @return {void} É criada uma nova tabela com os produtos na despensa fornecidos, substituindo a tabela existente se houver.
  */
 function addPantryTable(lista) {
+    pantry_view_visible = true;
     let container = document.getElementById("table-container");
     // Verifica e remove a tabela existente da despensa
     let existingTable = container.querySelector("#ingredients-table");
@@ -409,26 +414,19 @@ function addPantryTable(lista) {
     lista.forEach(item => {
         let row = document.createElement("tr");
 
-        // Divide a string pelo padrão: ", Data de Validade : "
-        let [productQuantity, expirationDate] = item.split(', Data de Validade : ');
-        let productDetails = productQuantity.split(' ');
-        let quantity = productDetails.pop(); // Último elemento é a quantidade com unidade
-        let unit = productDetails.pop(); // Penúltimo elemento é a unidade
-        let product = productDetails.join(' '); // O restante é o nome do produto
-
         // Célula do produto
         let productCell = document.createElement("td");
-        productCell.textContent = product;
+        productCell.textContent = item.name;
         row.appendChild(productCell);
 
         // Célula da quantidade
         let quantityCell = document.createElement("td");
-        quantityCell.textContent = ` ${unit} ${quantity}`; // Combina quantidade e unidade
+        quantityCell.textContent = ` ${item.quantity} ${item.unit}`; // Combina quantidade e unidade
         row.appendChild(quantityCell);
 
         // Célula da data de validade
         let dateCell = document.createElement("td");
-        dateCell.textContent = expirationDate;
+        dateCell.textContent = item.expiration_date ? item.expiration_date.replaceAll('-', '/') : '';
         row.appendChild(dateCell);
 
         tbody.appendChild(row);
@@ -550,47 +548,6 @@ function set_expiration_date(ndays){
 }
 
 
-/**
- * @brief Alerta de produtos no final de validade.
- * @details Verifica se a data de validade do produto fornecida está a 3 dias de distância da data atual.
- * 
- * @param {string} expiration_date - A data de validade do produto.
- * 
- * @return {boolean} True se a data de validade estiver a 3 dias, False caso contrário.
- */
-function alert_expiration_date(expiration_date){
-    let today = new Date();
-    expiration_date = new Date(expiration_date);
-    
-    let date_dif = Math.abs(today.getTime() - expiration_date.getTime()); //Diferença de datas em millisegundos
-    date_dif  = Math.ceil(date_dif  / (1000 * 3600 * 24));//Diferença de datas em dias
-    if (date_dif <=3){
-        return true;
-    }
-    return false;
-}
-
-/**
- * @brief Obter produtos na despensa que estão perto do fim da validade.
- * @details Verifica a data de validade de cada produto na lista fornecida e retorna os produtos que estão a 3 dias de distância da data atual.
- * 
- * @param {array} product_list - A lista de produtos na despensa.
- * 
- * @return {array} near_expiration_date_products - Lista de produtos perto do fim da validade.
- */
-function get_near_expiration_date_products(product_list){
-    let near_expiration_date_products = [];
-    for (let i = 0; i < product_list.length; i++){
-        let product = product_list[i].split(":");
-        let product_date = product[product.length-1];
-        let near_expired = alert_expiration_date(product_date);
-        if (near_expired){
-            near_expiration_date_products.push(product_list[i]);
-        }
-    }
-    return near_expiration_date_products;
-}
-
 /**
  * @brief Construir o corpo do email.
  * @details Constrói o corpo do email com base no tipo de alerta fornecido e na lista de produtos.
@@ -809,6 +766,39 @@ async function get_product_name(sentence){
     }
 }
 
+/**
+ * @brief Extrair a quantidade, o produto, a unidade e a data de validade de uma frase num só pedido.
+ * @details Envia um pedido [POST] para o servidor, que analisa a frase uma única vez em vez de chamar
+ * `/get-ingredient`, `/get-unit` e `/format-date` em separado.
+ * 
+ * @param {string} sentence - A frase a ser analisada.
+ * 
+ * @return {object} data - Os campos extraídos {quantity, ingredient, unit, expiration_date}; cada um é null
+ * ou {value, text, start, end, confidence}. Em caso de erro retorna undefined.
+ * 
+ * @see app.extract_utterance(`text`) Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function extract_utterance(sentence){
+    try {
+        const response = await fetch("http://127.0.0.1:5000/extract-utterance", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json"
+            },
+            body: JSON.stringify({ "text": sentence })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            console.error('Response data for error:', data); // Log the error body for debugging
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        console.log("Extracted utterance: ", data);
+        return data["message"];
+    } catch (error) {
+        console.error("Error fetching data: ", error);
+    }
+}
+
 /**
  * @brief Limpar a despensa.
  * @details Limpa a despensa, enviando um pedido [DELETE] para o servidor.
@@ -924,17 +914,51 @@ async function send_email(alertType, list){
 
 /**
  * @brief Obter os produtos na despensa.
- * @details Envia um pedido [GET] para o servidor para obter os produtos na despensa.
+ * @details Envia pedidos [GET] para o servidor, página a página, até obter todos os lotes da despensa.
  * 
- * @return {array} data - A lista de produtos na despensa.
+ * @return {array} data - A lista de lotes na despensa ({lot_id, name, quantity, unit, expiration_date}),
+ * ordenada pelo nome do produto e pela validade.
  * 
  * @see app.get_pantry_stock() Para mais detalhes sobre a função que lida com o pedido.
  */
 async function get_pantry_products(){
-    const response = await fetch('http://127.0.0.1:5000/pantry/stock');
+    let lots = [];
+    let cursor = null;
+    do {
+        const url = 'http://127.0.0.1:5000/pantry/stock?limit=500' + (cursor !== null ? `&cursor=${cursor}` : '');
+        const response = await fetch(url);
+        const data = await response.json();
+        if (!response.ok) {
+            console.error("Error fetching pantry products: ", data);
+            break;
+        }
+        lots = lots.concat(data.items);
+        cursor = data.next_cursor;
+    } while (cursor !== null);
+    lots.sort((a, b) => a.name.localeCompare(b.name) || (a.expiration_date || '').localeCompare(b.expiration_date || ''));
+    return lots;
+}
+
+/**
+ * @brief Obter os produtos na despensa que estão perto do fim da validade.
+ * @details Envia um pedido [GET] para o servidor, que devolve apenas os produtos cuja validade termina nos próximos
+ * `days` dias (incluindo os já fora de validade), agrupados por produto.
+ * 
+ * @param {number} days - Número de dias a partir de hoje.
+ * 
+ * @return {array} data - Lista de strings "Produto quantidade unidade, Data de Validade : AAAA/MM/DD", como na despensa.
+ * 
+ * @see app.get_expiring_stock() Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function get_expiring_products(days = 3){
+    const response = await fetch(`http://127.0.0.1:5000/pantry/expiring?days=${days}`);
     const data = await response.json();
-    console.log("DATA INSIDE GET FUNCTION: ", data);
-    return data;
+    if (!response.ok) {
+        console.error("Error fetching expiring products: ", data);
+        return [];
+    }
+    return data.map(item =>
+        `${item.name} ${item.total_quantity} ${item.unit}, Data de Validade : ${item.expiration_date.replaceAll('-', '/')}`);
 }
 
 /**
@@ -952,6 +976,141 @@ async function get_shopping_list(){
     return data;
 }
 
+/**
+ * @var {Object} change_feed
+ * @brief Estado do feed de alterações da despensa e da lista de compras.
+ * @details Guarda as listas mantidas em memória (`pantry`, `shopping`), o `epoch` do servidor e a última versão
+ * aplicada. As listas são atualizadas com os eventos incrementais do servidor em vez de serem pedidas inteiras.
+ */
+var change_feed = {epoch: null, version: null, pantry: null, shopping: null, source: null};
+
+/**
+ * @var {boolean} pantry_view_visible
+ * @brief Indica se as tabelas da despensa e da lista de compras estão visíveis (para as atualizar em tempo real).
+ */
+var pantry_view_visible = false;
+
+/**
+ * @brief Aplica um evento do feed de alterações às listas em memória.
+ * @details Os eventos podem ser aplicados mais do que uma vez sem alterar o resultado (por exemplo, depois de
+ * recarregar as listas completas).
+ * 
+ * @param {Object} event - Evento recebido do servidor ({version, type, ...}).
+ */
+function apply_change(event) {
+    let pantry = change_feed.pantry;
+    let shopping = change_feed.shopping;
+    switch (event.type) {
+        case "lot_added":
+            pantry = pantry.filter(lot => lot.lot_id !== event.lot_id);
+            pantry.push({lot_id: event.lot_id, name: event.name, quantity: event.quantity,
+                         unit: event.unit, expiration_date: event.expiration_date});
+            break;
+        case "lot_changed":
+            pantry = pantry.map(lot => lot.lot_id === event.lot_id ? {...lot, quantity: event.quantity} : lot);
+            break;
+        case "lot_removed":
+            pantry = pantry.filter(lot => lot.lot_id !== event.lot_id);
+            break;
+        case "item_emptied":
+            pantry = pantry.filter(lot => lot.name !== event.name);
+            break;
+        case "stock_cleared":
+            pantry = [];
+            break;
+        case "grocery_added":
+            if (!shopping.includes(event.name)) shopping = shopping.concat([event.name]);
+            break;
+        case "grocery_removed":
+            shopping = shopping.filter(name => name !== event.name);
+            break;
+        case "grocery_cleared":
+            shopping = [];
+            break;
+    }
+    pantry.sort((a, b) => a.name.localeCompare(b.name) || (a.expiration_date || '').localeCompare(b.expiration_date || ''));
+    change_feed.pantry = pantry;
+    change_feed.shopping = shopping;
+    change_feed.version = Math.max(change_feed.version, event.version);
+}
+
+/**
+ * @brief Carrega as listas completas da despensa e da lista de compras e a versão atual do feed.
+ * @details A versão é lida antes das listas, para que nenhum evento se perca entre os dois pedidos.
+ */
+async function reload_change_feed() {
+    const response = await fetch('http://127.0.0.1:5000/pantry/changes');
+    const data = await response.json();
+    change_feed.pantry = await get_pantry_products();
+    change_feed.shopping = await get_shopping_list();
+    change_feed.epoch = data.epoch;
+    change_feed.version = data.version;
+}
+
+/**
+ * @brief Atualiza as listas em memória com os eventos que ainda não foram aplicados.
+ * @details Pede apenas os eventos depois da última versão aplicada; só recarrega as listas completas na primeira
+ * vez ou quando o servidor pede um `resync`.
+ * 
+ * @see app.get_pantry_changes() Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function sync_changes() {
+    if (change_feed.version === null) {
+        await reload_change_feed();
+        return;
+    }
+    const response = await fetch(`http://127.0.0.1:5000/pantry/changes?epoch=${change_feed.epoch}&since=${change_feed.version}`);
+    const data = await response.json();
+    if (data.resync) {
+        await reload_change_feed();
+        return;
+    }
+    data.events.forEach(apply_change);
+}
+
+/**
+ * @brief Liga o feed de alterações em tempo real (Server-Sent Events).
+ * @details As alterações feitas por outros clientes (por voz ou por outra janela) são aplicadas assim que chegam
+ * e, se as tabelas da despensa estiverem visíveis, estas são redesenhadas.
+ * 
+ * @see app.stream_pantry_changes() Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function start_change_feed() {
+    await sync_changes();
+    change_feed.source = new EventSource(
+        `http://127.0.0.1:5000/pantry/changes/stream?epoch=${change_feed.epoch}&since=${change_feed.version}`);
+    change_feed.source.addEventListener("change", event => {
+        apply_change(JSON.parse(event.data));
+        if (pantry_view_visible) {
+            addPantryTable(change_feed.pantry);
+            addShoopingListTable(change_feed.shopping);
+        }
+    });
+    change_feed.source.addEventListener("resync", async () => {
+        await reload_change_feed();
+    });
+}
+
+/**
+ * @brief Obter os produtos na despensa a partir do feed de alterações.
+ * 
+ * @return {array} Lista de lotes na despensa, no formato de `get_pantry_products()`.
+ */
+async function get_live_pantry_products() {
+    await sync_changes();
+    return change_feed.pantry.slice();
+}
+
+/**
+ * @brief Obter a lista de compras a partir do feed de alterações.
+ * 
+ * @return {array} Lista de produtos na lista de compras, no formato de `get_shopping_list()`.
+ */
+async function get_live_shopping_list() {
+    await sync_changes();
+    return change_feed.shopping.slice();
+}
+
 /**
  * @brief Inserir um produto na despensa.
  * @details Insere um produto na despensa, enviando um pedido [POST] para o servidor com os detalhes do produto.
@@ -992,9 +1151,51 @@ async function remove_stock() {
 }
 
 
+/**
+ * @brief Obter uma receita completa (ou apenas alguns campos) por um ID de receita.
+ * @details Envia um único pedido [GET] para o servidor em vez de um pedido por cada parte da receita
+ * (nome, imagem, ingredientes e utensílios).
+ * 
+ * @param {string} recipeId - O ID da receita.
+ * @param {array} fields - Campos a pedir (`name`, `servings`, `cooking_time`, `image`, `ingredients`, `tools`, `steps`); por omissão todos.
+ * 
+ * @return {object} data - A receita com os campos pedidos.
+ * 
+ * @code
+ *  {
+ *      recipe_id: recipe_id,
+ *      name: recipe_name,
+ *      img_url: img_url,
+ *      ingredients: [{name: ingredient_name, quantity: ingredient_quantity, unit: ingredient_unit}, ...],
+ *      tools: ["tool1", "tool2", ...]
+ *  }
+ * @endcode
+ * 
+ * @see app.fetch_recipe_full(`recipeId`) Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function getRecipeFull(recipeId, fields = []) {
+const query = fields.length ? `?fields=${fields.join(",")}` : "";
+const response = await fetch(`http://127.0.0.1:5000/recipe/${recipeId}/full${query}`);
+const data = await response.json();
+console.log(`Full recipe for recipe ID ${recipeId}: `, data);
+return data;
+}
+
+
+/**
+ * @var {string} recipeSessionId
+ * @brief Identificador do utilizador para as sugestões de receitas e a sessão de confeção.
+ * @details Enviado ao servidor para que pedidos repetidos de receitas aleatórias não repitam receitas
+ * até todo o catálogo ter sido sugerido, e para identificar o cursor de passos da receita atual.
+ * É o mesmo `sender` com que as mensagens chegam ao Rasa, pelo que as ações do Rasa (`tracker.sender_id`) usam a
+ * mesma sessão: por omissão "default", o remetente do canal REST do Rasa quando o pedido não indica nenhum; outro
+ * remetente pode ser indicado no endereço da página (`?sender=USER1`).
+ */
+const recipeSessionId = new URLSearchParams(window.location.search).get("sender") || "default";
+
 /**
  * @brief Obter uma receita aleatória.
- * @details Envia um pedido [GET] para o servidor para obter uma receita aleatória.
+ * @details Envia um pedido [GET] para o servidor para obter uma receita aleatória, sem repetir receitas já sugeridas nesta sessão.
  * 
  * @return {array} data - A receita aleatória.
  * 
@@ -1009,7 +1210,7 @@ async function remove_stock() {
  * @see app.fetch_random_recipe() Para mais detalhes sobre a função que lida com o pedido.
  */
 async function getRandRecipe() {
-    const response = await fetch('http://127.0.0.1:5000/recipe/random');
+    const response = await fetch(`http://127.0.0.1:5000/recipe/random?session=${recipeSessionId}`);
     const data = await response.json();
     console.log("DATA INSIDE GET FUNCTION: ", data);
     return data;
@@ -1201,6 +1402,33 @@ return data;
 }
 
 
+/**
+ * @brief Pesquisar receitas pelo nome.
+ * @details Envia um pedido [GET] para o servidor para obter as receitas com o nome mais parecido com o texto dado,
+ * ignorando acentos, maiúsculas e pequenos erros do reconhecimento de voz.
+ * 
+ * @param {string} query - O texto a pesquisar.
+ * @param {number} limit - Número máximo de resultados.
+ * 
+ * @return {array} data - As receitas encontradas, da mais para a menos parecida.
+ * 
+ * @code
+ *  [
+ *      {recipe_id: recipe_id, name: recipe_name, score: score},
+ *      ...
+ *  ]
+ * @endcode
+ * 
+ * @see app.search_recipes() Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function searchRecipes(query, limit = 5) {
+const response = await fetch(`http://127.0.0.1:5000/recipes/search?q=${encodeURIComponent(query)}&limit=${limit}`);
+const data = await response.json();
+console.log(`Recipes matching ${query}: `, data);
+return data;
+}
+
+
 /**
  * @brief Obter uma receita por um nome.
  * @details Envia um pedido [GET] para o servidor para obter uma receita por um nome.
@@ -1281,78 +1509,89 @@ return data;
 
 
 /**
- * @brief Obter a próxima instrução por um ID de receita e passo.
- * @details Envia um pedido [GET] para o servidor para obter a próxima instrução por um ID de receita e passo.
- * 
- *  - STEP = 0 -> FIRST INSTRUCTION (STEP 1)
- *  - STEP = 1 -> SECOND INSTRUCTION (STEP 2)
- *  - ...
- *  - STEP = N -> N+1 INSTRUCTION (STEP N+1) -> RETURN NULL
+ * @brief Iniciar a sessão de confeção de uma receita.
+ * @details Envia um pedido [POST] para o servidor para carregar de uma só vez os passos da receita e (re)começar o
+ * cursor de passos do utilizador (`recipeSessionId`). O cursor fica no servidor e a chave é o `sender` do Rasa, pelo
+ * que a ação "repete" do Rasa lê o passo em que a interface está.
  * 
  * @param {string} recipeId - O ID da receita.
- * @param {string} step - O passo da receita.
  * 
- * @return {array} data - A próxima instrução da receita.
+ * @return {array} data - O estado da sessão {recipe_id, total_steps, position, step}.
+ * 
+ * @see app.start_cooking_session(`session_id`) Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function startCookingSession(recipeId) {
+const response = await fetch(`http://127.0.0.1:5000/cooking-session/${recipeSessionId}`, {
+    method: "POST",
+    headers: {
+        "Content-Type": "application/json"
+    },
+    body: JSON.stringify({ "recipe_id": recipeId })
+});
+const data = await response.json();
+console.log(`Cooking session for recipe ID ${recipeId}: `, data);
+return data;
+}
+
+
+/**
+ * @brief Mover o cursor da sessão de confeção.
+ * @details Envia um pedido [GET] para o servidor para avançar (`next`), recuar (`previous`) ou repetir (`repeat`) o
+ * passo da sessão do utilizador (`recipeSessionId`). Se o servidor já não tiver a sessão (por exemplo depois de
+ * reiniciar), é iniciada uma nova para a receita atual (`recipe_id`).
+ * 
+ * @param {string} action - A ação: "next", "previous", "repeat" ou "current".
+ * 
+ * @return {string|null} description - A descrição do passo, ou null se não houver passo nessa direção.
+ * 
+ * @see app.move_cooking_session(`session_id`,`action`) Para mais detalhes sobre a função que lida com o pedido.
+ */
+async function moveCookingSession(action) {
+const response = await fetch(`http://127.0.0.1:5000/cooking-session/${recipeSessionId}/${action}?recipe_id=${recipe_id}`);
+const data = await response.json();
+console.log(`Cooking session ${action}: `, data);
+return data.step ? data.step.description : null;
+}
+
+
+/**
+ * @brief Obter a próxima instrução da receita atual.
+ * @details Avança o cursor da sessão de confeção (ver `moveCookingSession`).
+ * 
+ * @return {array} data - A próxima instrução da receita (null no fim da receita).
  * 
  * @code
  *  {
  *      next_instruction: instruction
  *  }
  * @endcode
- * 
- * @see app.fetch_next_instruction(`recipeId`,`step`) Para mais detalhes sobre a função que lida com o pedido.
  */
-async function getNextInstruction(recipeId, step) {
-const response = await fetch(`http://127.0.0.1:5000/recipe/${recipeId}/next-instruction/${step}`);
-const data = await response.json();
-console.log(`Next instruction for recipe ID ${recipeId} and step ${step}: `, data);
-return data;
+async function getNextInstruction() {
+return { "next_instruction": await moveCookingSession("next") };
 }
 
 
 /**
- * @brief Obter a instrução anterior por um ID de receita e passo.
- * @details Envia um pedido [GET] para o servidor para obter a instrução anterior por um ID de receita e passo.
- * 
- * - STEP = 0 -> FIRST INSTRUCTION (STEP -1) -> RETURN NULL
- * - STEP = 1 -> SECOND INSTRUCTION (STEP 0) -> RETURN NULL
- * - STEP = 2 -> THIRD INSTRUCTION (STEP 1) -> RETURN FIRST INSTRUCTION
- * - ...
- * - STEP = N -> N-1 INSTRUCTION (STEP N) -> RETURN N INSTRUCTION
+ * @brief Obter a instrução anterior da receita atual.
+ * @details Recua o cursor da sessão de confeção (ver `moveCookingSession`).
  * 
- * @param {string} recipeId - O ID da receita.
- * @param {string} step - O passo da receita.
- * 
- * @return {array} data - A instrução anterior da receita.
+ * @return {array} data - A instrução anterior da receita (null no primeiro passo).
  * 
  * @code
  * {
  *    previous_instruction: instruction
  * }
  * @endcode
- * 
- * @see app.fetch_previous_instruction(`recipeId`,`step`) Para mais detalhes sobre a função que lida com o pedido.
  */
-async function getPreviousInstruction(recipeId, step) {
-const response = await fetch(`http://127.0.0.1:5000/recipe/${recipeId}/previous-instruction/${step}`);
-const data = await response.json();
-console.log(`Previous instruction for recipe ID ${recipeId} and step ${step}: `, data);
-return data;
+async function getPreviousInstruction() {
+return { "previous_instruction": await moveCookingSession("previous") };
 }
 
 
 /**
- * @brief Obter a instrução atual por um ID de receita e passo.
- * @details Envia um pedido [GET] para o servidor para obter a instrução atual por um ID de receita e passo.
- * 
- * - STEP = 0 -> 0 INSTRUCTION (STEP -1) -> RETURN NULL
- * - STEP = 1 -> FIRST INSTRUCTION (STEP 1) -> RETURN FIRST INSTRUCTION
- * - STEP = 2 -> SECOND INSTRUCTION (STEP 2) -> RETURN SECOND INSTRUCTION
- * - ...
- * - STEP = N -> N INSTRUCTION (STEP N) -> RETURN N INSTRUCTION
- * 
- * @param {string} recipeId - O ID da receita.
- * @param {string} step - O passo da receita.
+ * @brief Obter a instrução atual da receita atual.
+ * @details Repete o passo atual da sessão de confeção, ou o primeiro se a receita ainda não começou
+ * (ver `moveCookingSession`).
  * 
  * @return {array} data - A instrução atual da receita.
  * 
@@ -1361,14 +1600,9 @@ return data;
  *   actual_instruction: instruction
  * }
  * @endcode
- * 
- * @see app.fetch_actual_instruction(`recipeId`,`step`) Para mais detalhes sobre a função que lida com o pedido.
  */
-async function getActualInstruction(recipeId, step) {
-const response = await fetch(`http://127.0.0.1:5000/recipe/${recipeId}/actual-instruction/${step}`);
-const data = await response.json();
-console.log(`Actual instruction for recipe ID ${recipeId} and step ${step}: `, data);
-return data;
+async function getActualInstruction() {
+return { "actual_instruction": await moveCookingSession("repeat") };
 }
 
 
@@ -1449,12 +1683,6 @@ function getRandJoke() {
  */
 var recipe_id = 0;
 
-/**
- * @var {number} step
- * @brief Contador de etapas da receita atual.
- * @details Contador de etapas da receita atual, começa com o valor 1 e é incrementado ou decrementado conforme o utilizador avança ou retrocede nas etapas da receita.
- */
-var step = 1;
 
 
 /**
@@ -1510,7 +1738,7 @@ var s_list = null;
  * @var {Array|null} p_list
  * @brief Lista de produtos na despensa temporária, usada para gestão de stock.
  * @details Lista de produtos na despensa temporária, usada para gestão de stock.
- * Array de objetos com a estrutura {name: "product_name", quantity: "product_quantity", unit: "product_unit"}.
+ * Array de objetos com a estrutura {lot_id, name, quantity, unit, expiration_date} (ver `get_pantry_products()`).
  */
 var p_list = null;
 
@@ -1781,20 +2009,25 @@ async function im1MessageHandler(data){
                                 //console.log("ASK SPECIFIC RECIPE_VALUE: "+c.nlu.recipe);
                                 let tag = c.nlu.recipe; // ------------------------------------------------- Get the recipe tag
                                 let temp_img = await getRecipesByTag(tag); // ------------------------------ Get the recipe_id for the specific recipe
-                                recipe_id = temp_img.recipe_ids[0]; // ------------------------------------- Set the recipe_id for the specific recipe
+                                if (temp_img.recipe_ids) {
+                                    recipe_id = temp_img.recipe_ids[0]; // --------------------------------- Set the recipe_id for the specific recipe
+                                } else {
+                                    let matches = await searchRecipes(tag, 1); // -------------------------- No tag: search by the closest recipe name
+                                    if (!Array.isArray(matches) || matches.length === 0) {
+                                        sendToVoice("Não encontrei nenhuma receita parecida com " + tag);
+                                        break;
+                                    }
+                                    recipe_id = matches[0].recipe_id;
+                                }
                                 console.log("RECIPE_ID: ", recipe_id);
-                                step = 1; // --------------------------------------------------------------- Set the step to 1 - to reset the var step
-                                let temp_recipe_name = await getRecipeName(recipe_id); // ------------------ Get the recipe name
-                                let tag_recipe_name = temp_recipe_name.recipe_name; // --------------------- Get the recipe name
+                                await startCookingSession(recipe_id); // ------------------------------------ Start the cooking session (step cursor on the server)
+                                let recipe_tag = await getRecipeFull(recipe_id, ["name", "image", "ingredients", "tools"]); // Get the whole recipe in one request
+                                let tag_recipe_name = recipe_tag.name; // ---------------------------------- Get the recipe name
                                 console.log("TAG RECIPE NAME: ", tag_recipe_name);
                                 addRecipeName(tag_recipe_name); // ----------------------------------------- Add the recipe name to the page as <h2>
-                                let temp_img_url_tag = await getRecipeImage(recipe_id); // ----------------- Get the recipe image url
-                                let img_url_tag = temp_img_url_tag.img_url; // ----------------------------- Get the recipe image url
-                                addImage(img_url_tag); // -------------------------------------------------- Add the recipe image to the page as <img>
-                                let ingredients_tag = await getIngredients(recipe_id); // ------------------ Get the ingredients for the recipe
-                                addIngredientsTable(ingredients_tag); // ----------------------------------- Add the ingredients to the page as <table> id = ingredients-table
-                                let tools_tag = await getTools(recipe_id); // ------------------------------ Get the tools for the recipe
-                                addToolsTable(tools_tag); // ----------------------------------------------- Add the tools to the page as <table> id = tools-table
+                                addImage(recipe_tag.img_url); // ------------------------------------------- Add the recipe image to the page as <img>
+                                addIngredientsTable(recipe_tag.ingredients); // ---------------------------- Add the ingredients to the page as <table> id = ingredients-table
+                                addToolsTable(recipe_tag.tools.map(tool => [tool])); // -------------------- Add the tools to the page as <table> id = tools-table
                                 // ------------------------------------------------------------------------- SEND THE VOICE TO THE USER
                                 // - THE PUNCTUATION AFFECTS THE TIME BETWEEN THE TWO SENTENCES -
                                 sendToVoice("RECEITA ESCOLHIDA : "+ tag_recipe_name + " . Quando estiver pronto podemos começar a receita");
@@ -1818,7 +2051,7 @@ async function im1MessageHandler(data){
                                 //console.log(c.nlu);
                                 data = await getRandRecipe() // -------------------------------------------- Get the random recipe
                                 recipe_id = data.recipe_id; // --------------------------------------------- Set the recipe_id fer the random recipe
-                                step = 1; // --------------------------------------------------------------- Set the step to 1 - to reset the var step
+                                await startCookingSession(recipe_id); // ------------------------------------ Start the cooking session (step cursor on the server)
                                 //console.log("RECIPE_ID : " , recipe_id); 
                                 //console.log("DATA: " , data);
                                 //console.log("DATA PARSING" + data.recipe_name);
@@ -1827,11 +2060,10 @@ async function im1MessageHandler(data){
                                 let img_url = data.recipe_img; // ------------------------------------------ Get the recipe image url
                                 console.log("IMG URL: " + img_url);
                                 addImage(img_url); // ------------------------------------------------------ Add the recipe image to the page as <img>
-                                let ingredients = await getIngredients(data.recipe_id); // ----------------- Get the ingredients for the recipe
-                                addIngredientsTable(ingredients); // --------------------------------------- Add the ingredients to the page as <table> id = ingredients-table
-                                //console.log("INGREDIENTS: ", ingredients);
-                                let tools = await getTools(data.recipe_id); // ----------------------------- Get the tools for the recipe
-                                addToolsTable(tools); // --------------------------------------------------- Add the tools to the page as <table> id = tools-table
+                                let recipe_parts = await getRecipeFull(data.recipe_id, ["ingredients", "tools"]); // Get ingredients and tools in one request
+                                addIngredientsTable(recipe_parts.ingredients); // -------------------------- Add the ingredients to the page as <table> id = ingredients-table
+                                //console.log("INGREDIENTS: ", recipe_parts.ingredients);
+                                addToolsTable(recipe_parts.tools.map(tool => [tool])); // ------------------ Add the tools to the page as <table> id = tools-table
                                 //console.log("TOOLS: ", tools);
                                 // ------------------------------------------------------------------------- SEND THE VOICE TO THE USER
                                 // - THE PUNCTUATION AFFECTS THE TIME BETWEEN THE TWO SENTENCES -
@@ -1845,7 +2077,7 @@ async function im1MessageHandler(data){
                                 break;
                             case "ask_repeat_step":
                                 console.log("ASK REPEAT STEP -----------------------------");
-                                let repeat_instruction = await getActualInstruction(recipe_id, step); // --- Get the actual instruction for the recipe
+                                let repeat_instruction = await getActualInstruction(); // ------------- Get the actual instruction for the recipe
                                 //console.log("REPEAT INSTRUCTION: ", repeat_instruction.actual_instruction);
                                 voice = c.nlu.audioReconized; // ------------------------------------------- Get the voice from the user
                                 //openChatBox();
@@ -1857,7 +2089,8 @@ async function im1MessageHandler(data){
                                 break;
                             case "ask_first_step":
                                 console.log("ASK FIRST STEP -----------------------------");
-                                let instruction = await getActualInstruction(recipe_id, step); // ---------- Get the first instruction for the recipe
+                                await startCookingSession(recipe_id); // -------------------------------------- Restart the recipe from the beginning
+                                let instruction = await getActualInstruction(); // -------------------------- Get the first instruction for the recipe
                                 //console.log("INSTRUCTION: ", instruction.actual_instruction); 
                                 voice = c.nlu.audioReconized; // ------------------------------------------- Get the voice from the user
                                 //openChatBox();
@@ -1870,9 +2103,9 @@ async function im1MessageHandler(data){
                                 break;
                             case "ask_next_step":
                                 console.log("ASK NEXT STEP -----------------------------");
-                                let next_instruction = await getNextInstruction(recipe_id, step); // ------- Get the next instruction for the recipe
+                                let next_instruction = await getNextInstruction(); // ------- Get the next instruction for the recipe
                                 voice = c.nlu.audioReconized;
-                                if (next_instruction == null) { // ----------------------------------------- If there are NO MORE instructions
+                                if (next_instruction.next_instruction == null) { // ----------------------------------------- If there are NO MORE instructions
                                     //console.log("NO MORE INSTRUCTIONS");
                                     //openChatBox();
                                     addMsgToChat('Você',': ' + voice);
@@ -1880,7 +2113,6 @@ async function im1MessageHandler(data){
                                     sendToVoice("A receita terminou");
                                     break;
                                 }else{ // ------------------------------------------------------------------- If there are MORE instructions
-                                    step++; // ---------------------------------------------------------------- Increment the step
                                     //console.log("NEXT INSTRUCTION: ", next_instruction.next_instruction);
                                     //openChatBox();
                                     addMsgToChat('Você',': ' + voice); // ------------------------------------- Add the voice to the chat
@@ -1894,7 +2126,7 @@ async function im1MessageHandler(data){
                             case "ask_pantry":
                                 console.log("ASK PANTRY -----------------------------");
                                 clearContent(); // -------------------------------------------------------- Clear the content
-                                let pantry_products = await get_pantry_products(); // ---------------------- Get all the products in the pantry
+                                let pantry_products = await get_live_pantry_products(); // ---------------------- Get all the products in the pantry
                                 addRecipeName("Produtos na Despensa"); // ------------------------------------ Add the title to the page as <h2>
                                 addPantryTable(pantry_products); // ---------------------------------------- Add the pantry products to the page as <table> id = pantry-table
                                 // ------------------------------------------------------------------------- SEND THE VOICE TO THE USER
@@ -1907,19 +2139,24 @@ async function im1MessageHandler(data){
                                 console.log("ADD PANTRY -----------------------------");
                                 add_pdb_flag = true; // ------------------------------------------------------ Set the flag to true
                                 let name = c.nlu.audioReconized; // ---------------------------------------------------- Get the ingredient
-                                if(name){
-                                    name = await get_product_name(name); // -------------------------------------- Get the type of the product
-                                    product["name"] = name["message"]; // ----------------------------------------------- Store the ingredient
-                                }
+                                let extracted = name ? await extract_utterance(name) : null; // ---------------- Product, quantity and unit in one request
+                                if(extracted && extracted["ingredient"])
+                                    product["name"] = extracted["ingredient"]["text"]; // -------------------------------- Store the ingredient
                                 let quantity = c.nlu.quantity; // -------------------------------------------- Get the quantity
+                                if(!quantity && extracted && extracted["quantity"])
+                                    quantity = extracted["quantity"]["value"]; // ---------------------------------- Quantity missed by RASA
                                 if(quantity)
                                     product["quantity"] = quantity; // ----------------------------------------- Store the quantity
-                                let unit = c.nlu.unit; // ------------------------------------------------------ Get the unit
-                                if(unit){
-                                    unit = await get_product_unit(unit)
-                                    product["unit"] = unit["message"]; // --------------------------------------------------- Store the unit
-                                }else
-                                    product["unit"] = "uni"; // -------------------------------------------------- Default unit
+                                let unit = null;
+                                if(extracted && extracted["unit"])
+                                    unit = extracted["unit"]["value"]; // --------------------------------------------- Unit found in the sentence
+                                else if(c.nlu.unit){
+                                    let nlu_unit = await get_product_unit(c.nlu.unit); // ------------------------ Unit recognized by RASA
+                                    unit = nlu_unit ? nlu_unit["message"] : null;
+                                }
+                                product["unit"] = unit || "uni"; // ---------------------------------------------- Store the unit (default unit)
+                                if(extracted && extracted["expiration_date"])
+                                    product["expiration_date"] = extracted["expiration_date"]["value"]; // -------- Expiration date said with the product
                                 // name && quantity
                                 // name && unit & quantity
                                 // name 
@@ -1933,36 +2170,22 @@ async function im1MessageHandler(data){
                                         doStartRequest(new EMMA("text-", "text", "command", 1, 0).
                                         setValue(JSON.stringify({text: "Get Quantity Ingredient"})))); // ------------ Call the function to get the quantity
                                 }else if(product["name"] && product["quantity"] && product["unit"]){
-                                    // ask for the expiration_date
-                                    if(checkType(product["name"]) == "animal"){
+                                    if(!product["expiration_date"] && checkType(product["name"]) == "animal"){
                                         console.log("ANIMAL PRODUCT -----------------------------");
                                         // add a pre-established expiration_date for animal products : 3 DAYS
                                         product["expiration_date"] = set_expiration_date(3); // ---------------------- Set the expiration date
-                                        // --------------------------------------------------------------------------- Create the message to the user
-                                        await insert_stock(); // ----------------------------------------------------------- Insert the product to the pantry
-                                        await remove_shopping_list(product["name"]); // ------------------------------------------------------ Remove the product from the shopping list
-                                        await clearContent(); // -------------------------------------------------------- Clear the content
-                                        s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                        p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
-                                        await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
-                                        await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
-                                        answer = "O produto foi inserido com sucesso" // ------------------------ Create the VOICE message to the user
-                                        sendToVoice(answer); // ----------------------------------------------------- Send the voice msg to the user
-                                        openChatBox(); // ------------------------------------------------------------ Open the chat box
-                                        answer = "O produto "+ product["name"] + " com a quantidade " + product["quantity"] + " " + product["unit"] + " foi <span style='color: green;'>ADICIONADO</span> à despensa com a data de validade " + product["expiration_date"];
-                                        addMsgToChat("Assistente", answer); // -------------------------------------- Add the message to the chat
-                                        reset_product(); // ---------------------------------------------------------- Reset the product dictionary
-                                        add_pdb_flag = false; // ----------------------------------------------------- Reset the flag
-                                    }else if(checkType(product["name"]) == "plant"){
+                                    }else if(!product["expiration_date"] && checkType(product["name"]) == "plant"){
                                         console.log("PLANT PRODUCT -----------------------------");
                                         // add a pre-established expiration_date for plant products : 7 DAYS ( 1 week )
                                         product["expiration_date"] = set_expiration_date(7); // ---------------------- Set the expiration date
+                                    }
+                                    if(product["expiration_date"]){
                                         // --------------------------------------------------------------------------- Create the message to the user
                                         await insert_stock(); // ----------------------------------------------------------- Insert the product to the pantry
                                         await remove_shopping_list(product["name"]); // ------------------------------------------------------ Remove the product from the shopping list
                                         await clearContent(); // -------------------------------------------------------- Clear the content
-                                        s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                        p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                        s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                        p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                         await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                         await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                         answer = "O produto foi inserido com sucesso" // ------------------------ Create the VOICE message to the user
@@ -2003,8 +2226,8 @@ async function im1MessageHandler(data){
                                     //E tem de ser removido depois da leitura do código de barras
                                 }
                                 //clearContent(); // -------------------------------------------------------- Clear the content
-                                s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                 addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                 addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                 sendToVoice("O produto foi removido com sucesso"); //- SEND THE VOICE TO THE USER
@@ -2051,8 +2274,8 @@ async function im1MessageHandler(data){
                                     // --------------------------------------------------------------------------- Create the message to the user
                                     await remove_stock(); // ----------------------------------------------------------- Insert the product to the pantry
                                     await clearContent(); // -------------------------------------------------------- Clear the content
-                                    s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                    p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                    s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                    p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                     await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                     await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                     answer = "O produto foi removido com sucesso" // ------------------------ Create the VOICE message to the user
@@ -2084,8 +2307,8 @@ async function im1MessageHandler(data){
                                     sendToVoice("Foi removido o produto " + pantry_products_rmv["message"] + " da despensa!"); // ---------------------- SEND THE VOICE TO THE USER
                                 }
                                 await clearContent(); // -------------------------------------------------------- Clear the content
-                                s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                 await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                 await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                 break;
@@ -2094,8 +2317,8 @@ async function im1MessageHandler(data){
                                 await clear_shoppingList(); // ------------------------------------------------------ Clear the pantry
                                 sendToVoice("A Lista de compras foi limpa!"); // ---------------------- SEND THE VOICE TO THE USER
                                 await clearContent(); // -------------------------------------------------------- Clear the content
-                                s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                 await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                 await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                 break;
@@ -2113,8 +2336,8 @@ async function im1MessageHandler(data){
                                 if (product["name"]){
                                     await insert_shooping_list(product["name"]); // -------------------------------------- Insert the product to the shopping list
                                     await clearContent(); // -------------------------------------------------------- Clear the content
-                                    s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                    p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                    s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                    p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                     await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                     await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                     answer = "O produto foi inserido com sucesso" // ------------------------ Create the VOICE message to the user
@@ -2139,7 +2362,7 @@ async function im1MessageHandler(data){
                             case "ask_shopping_list":
                                 console.log("ASK SHOPPING LIST -----------------------------");
                                 clearContent(); // -------------------------------------------------------- Clear the content
-                                s_list = await get_shopping_list(); // ------------------------------------- Get the shopping list
+                                s_list = await get_live_shopping_list(); // ------------------------------------- Get the shopping list
                                 await addRecipeName("Lista de Compras"); // ---------------------------------------- Add the title to the page as <h2>
                                 await addShoopingListTable(s_list); // ------------------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table
                                 sendToVoice("Segue a lista de compras!"); // -------------------------------------- SEND THE VOICE TO THE USER
@@ -2168,7 +2391,7 @@ async function im1MessageHandler(data){
                                 break;
                             case "send_shopping_list":
                                 console.log("SEND SHOPPING LIST -----------------------------");
-                                s_list = await get_shopping_list(); // ------------------------------------- Get the shopping list 
+                                s_list = await get_live_shopping_list(); // ------------------------------------- Get the shopping list 
                                 //console.log("SHOPPING LIST: ", s_list);
                                 if(s_list.length > 0){
                                     // send the shopping list
@@ -2231,8 +2454,8 @@ async function im1MessageHandler(data){
                                     await remove_shopping_list(product["name"]); // ------------------------------------------------------ Remove the product from the shopping list
                                     console.log(" UPDATE PANTRY TABLE"); // -------------------------------------- Update the pantry table
                                     clearContent(); // -------------------------------------------------------- Clear the content
-                                    s_list = await get_shopping_list(); // -------------------------------------- Get the shopping list
-                                    p_list = await get_pantry_products(); // -------------------------------------- Get the pantry list
+                                    s_list = await get_live_shopping_list(); // -------------------------------------- Get the shopping list
+                                    p_list = await get_live_pantry_products(); // -------------------------------------- Get the pantry list
                                     await addPantryTable(p_list); // ------------------------------------------------------ Add the pantry list to the page as <table> id = pantry-table
                                     await addShoopingListTable(s_list); // ---------------------------------------- Add the shopping list to the page as <table> id = shopping-list-table 
                                     answer = "O produto foi inserido com sucesso" // ------------------------ Create the VOICE message to the user
@@ -2260,8 +2483,7 @@ async function im1MessageHandler(data){
                                 await sendToVoice("Olá, posso ajudar?"); // -------------------------------------- Send the voice to the user saying "Olá, posso ajudar?"
                                 if (!alerted){ // ------------------------------------------------------------------------------ Check if the email was already sent
                                     // check if the product is near the expiration date
-                                    let product_list = await get_pantry_products(); // ----------------------------------------- Get all the products in the pantry
-                                    let near_expiration_date_products = get_near_expiration_date_products(product_list); // ---- Get the products that are near the expiration date
+                                    let near_expiration_date_products = await get_expiring_products(3); // --------------------- Get the products that are near the expiration date
                                     // CONSTRUCT EMAIL 
                                     if (near_expiration_date_products.length > 0){
                                         await send_email("expiration", near_expiration_date_products); // ---------------------- SEND EMAIL
@@ -2272,8 +2494,8 @@ async function im1MessageHandler(data){
                                     }
                                     alerted = true;
                                 }
-                                s_list = await get_shopping_list(); // ------------------------------------------------ Get the shopping list
-                                p_list = await get_pantry_products(); // ------------------------------------------------ Get the pantry products
+                                s_list = await get_live_shopping_list(); // ------------------------------------------------ Get the shopping list
+                                p_list = await get_live_pantry_products(); // ------------------------------------------------ Get the pantry products
                                 await addRecipeName("Despensa"); // ------------------------------------------------------ Add the recipe name to the page as <h2>
                                 await addPantryTable(p_list); // ------------------------------------------------------------ Add the pantry table to the page
                                 await addShoopingListTable(s_list); // ------------------------------------------------------ Add the shopping list table to the page
@@ -13,9 +13,20 @@ from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from .consts import * # O "." é o caminho relativo para o arquivo consts.py
                                         # É necessário meter este "."  caso contrário o rasa não consegue encontrar o arquivo consts.py
-import random
 import requests
 import recipedb_queries as q
+import recipe_catalog as rc # Catálogo de receitas em memória, também partilhado com o backend Flask
+import recipe_search as rs # Pesquisa aproximada de receitas pelo nome
+
+
+# Nome, ingredientes e utensílios de uma receita numa só leitura do catálogo
+def get_recipe_summary(recipe_id):
+    recipe = rc.get_recipe_full(recipe_id, fields=["name", "ingredients", "tools"]) if recipe_id else None
+    if recipe is None:
+        return None, [], []
+    ingredients = [(i['name'], i['quantity'], i['unit']) for i in recipe['ingredients']]
+    tools = [(tool,) for tool in recipe['tools']]
+    return recipe['name'], ingredients, tools
 
 
 class ActionRandomRecipe(Action):
@@ -23,29 +34,17 @@ class ActionRandomRecipe(Action):
     def name(self) -> Text:
         return "action_random_recipe" 
     
-    def get_ingredients(self, recipe_id):
-        ingredients = q.getIngredients(recipe_id)
-        return ingredients
-    
-    def get_tools(self, recipe_id):
-        tools = q.getTools(recipe_id)
-        return tools
-    
-    # Retorna uma receita aleatória id, nome
-    def Random(self):
-        random_recipe_id = q.getRandomRecipe()
-        random_recipe_name = q.getRecipeName(random_recipe_id)
-        
-        return random_recipe_id, random_recipe_name
+    # Retorna o id de uma receita aleatória, sem repetir receitas na mesma conversa até esgotar o catálogo
+    def Random(self, sender_id):
+        return rc.random_recipe(sender_id)['recipe_id']
 
 
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker, 
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        recipe_id, name = self.Random()
-        r_ingredients = self.get_ingredients(recipe_id)
-        r_tools = self.get_tools(recipe_id)
+        recipe_id = self.Random(tracker.sender_id)
+        name, r_ingredients, r_tools = get_recipe_summary(recipe_id)
         
         message = f"Receita: {name}\n\n\nIngredientes: {r_ingredients}\n\n\nUtensílios: {r_tools}"
         
@@ -61,17 +60,12 @@ class ActionSpecifRecipe(Action):
         def name(self) -> Text:
             return "action_specific_recipe" 
         
-        def get_ingredients(self, recipe_id):
-            ingredients = q.getIngredients(recipe_id)
-            return ingredients
-    
-        def get_tools(self, recipe_id):
-            tools = q.getTools(recipe_id)
-            return tools
-        
+        # Procura primeiro pela tag; se não houver, procura pelo nome mais parecido (acentos e erros do ASR)
         def get_recipe_id(self, tag):
-            r_id = q.getRecipeByTag(tag)
-            return r_id
+            r_ids = q.getRecipeByTag(tag)
+            if r_ids:
+                return r_ids[0]
+            return rs.find_recipe(tag) if tag else None
         
         def run(self, dispatcher: CollectingDispatcher,
                 tracker: Tracker, 
@@ -80,12 +74,13 @@ class ActionSpecifRecipe(Action):
             tag = tracker.get_slot("receita")
             print("TAG: ", tag)
             
-            recipe_id = self.get_recipe_id(tag)[0] 
+            recipe_id = self.get_recipe_id(tag)
             print("RECEITA ID: ", recipe_id)
-            name = q.getRecipeName(recipe_id)
+            if recipe_id is None:
+                dispatcher.utter_message(text=f"Não encontrei nenhuma receita parecida com {tag}")
+                return []
+            name, r_ingredients, r_tools = get_recipe_summary(recipe_id)
             print("RECIPE NAME: ",name)
-            r_ingredients = self.get_ingredients(recipe_id)
-            r_tools = self.get_tools(recipe_id)
             
             message = f"Receita: {name}\n\n\nIngredientes: {r_ingredients}\n\n\nUtensílios: {r_tools}"
             
@@ -103,13 +98,20 @@ class ActionRepeteStep(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         r_id = tracker.get_slot("recipe_id")
-        s_id = 0
-        if r_id == 0:
+        if not r_id:
             message = "Não Existe receita selecionada"
         else:
-            next_inst = q.getNextInstruction(r_id, s_id)
-            s_id += 1
-            message = f"Passo {s_id}: {next_inst}"
+            # The cursor lives in the Flask backend, keyed by the Rasa sender that the GUI also uses (recipeSessionId)
+            try:
+                response = requests.get(f"{BACKEND_URL}/cooking-session/{tracker.sender_id}/repeat",
+                                        params={"recipe_id": int(r_id)}, timeout=5)
+                step = response.json().get("step") if response.ok else None
+            except requests.RequestException:
+                step = None
+            if step is None:
+                message = "Não foi possível obter o passo da receita"
+            else:
+                message = f"Passo {step['step']}: {step['description']}"
         
         dispatcher.utter_message(text=message)
         return []
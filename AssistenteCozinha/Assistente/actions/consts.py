@@ -1,4 +1,6 @@
 API_KEYS = ["ef6f2279b7864bad8ff9a04de2180657","34af4d2879884e459a8b2e5bb71d410e","d20575f54b404530829032207847afdb","2971e205092f42268a2a1ab1e372124b",
             "ac793bb9af8340debe7e6145de267050","af1671b748fb4583b803624de57fea7b"] #Lista de chaves de API
 
-MAX_OFFSET = 900 #Número máximo de skips que a API permite
\ No newline at end of file
+MAX_OFFSET = 900 #Número máximo de skips que a API permite
+
+BACKEND_URL = "http://localhost:5000" #Servidor Flask (APP2), onde vivem as sessões de confeção
\ No newline at end of file
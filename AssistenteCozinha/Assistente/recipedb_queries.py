@@ -1,16 +1,15 @@
-import mysql.connector
 from mysql.connector import Error
 import random
+import os
+import sys
+
+# Share the connection pool (and the other backend modules) with the Flask app instead of copying them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebAppAssistantV2", "APP2"))
+import db_pool
 
 def create_connection():
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="admin",
-            password="admin",
-            database="recipe_database"
-        )
-        return connection
+        return db_pool.get_connection("recipe_database")
     except Error as e:
         print(f"Erro ao conectar ao MariaDB: {e}")
         return None
@@ -154,6 +153,24 @@ def getRecipeName(recipe_id):
         cursor.close()
         conn.close()
 
+# Returns the image url of a recipe given its recipe_id (fallback of recipe_catalog when the catalog is not loaded)
+def getImg_url(recipe_id):
+    conn = create_connection()
+    if conn is None:
+        return None
+    query = "SELECT image_url FROM recipe_images WHERE recipe_id = %s"
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, (recipe_id,))
+        img_url = cursor.fetchone()
+        return img_url[0] if img_url else None
+    except Error as e:
+        print(f"Erro: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
 # Returns a list of tuples with the description of all instructions of a recipe
 def getNextInstruction(recipe_id, step):
     """Obtém a descrição do próximo passo para um recipe_id e step dado."""
@@ -0,0 +1,236 @@
+"""
+Verificação dos planos de execução das consultas dos módulos *_queries.
+
+Extrai do código-fonte todas as consultas SQL (SELECT, UPDATE, DELETE e INSERT ... SELECT) dos módulos de consultas,
+corre `EXPLAIN` sobre cada uma na base de dados correspondente e falha se alguma tabela filtrada for lida
+com uma leitura completa (`type = ALL`):
+- sempre que não há nenhum índice utilizável (`possible_keys` vazio);
+- mesmo havendo índice, se a tabela não for trivial (o EXPLAIN estima pelo menos `--min-rows` linhas).
+
+São verificadas:
+- as strings literais dentro das funções e as constantes SQL ao nível do módulo (`MISSING_INGREDIENTS_QUERY`, ...);
+- as f-strings, com cada `{placeholders}` substituído por um único `%s`;
+- os modelos com campos `{...}` (`STOCK_TOTALS_UPDATE`, `SUMMARY_UPSERT`), com os exemplos de `TEMPLATE_SAMPLES`;
+- as consultas montadas de outra forma, registadas em `REGISTERED_QUERIES`.
+Uma f-string ou um modelo sem exemplo registado conta como erro, para que nenhuma consulta nova fique por verificar.
+
+Consultas sem `WHERE` (listagens completas como `SELECT name FROM grocerylist`) podem ler toda a primeira
+tabela; as tabelas juntadas a essa continuam a ter de usar um índice. As restantes leituras completas
+esperadas estão em `ALLOWED_SCANS`.
+
+Uso:
+    python migrate.py && python check_query_plans.py
+    python check_query_plans.py --verbose      # mostra o plano de todas as consultas
+    python check_query_plans.py --min-rows 10  # tabelas a partir de 10 linhas já não são triviais
+
+@note Os parâmetros `%s` são substituídos por '1' apenas para o EXPLAIN; a consulta não é executada.
+@note Com tabelas muito pequenas o MariaDB pode preferir ler a tabela toda mesmo havendo índice; por isso uma
+leitura completa com índice possível só conta como regressão a partir de `--min-rows` linhas.
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+
+from mysql.connector import Error
+
+# Reuse the Flask backend connection pool (Assistente/WebAppAssistantV2/APP2/db_pool.py)
+ASSISTENTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Assistente")
+sys.path.append(os.path.join(ASSISTENTE_DIR, "WebAppAssistantV2", "APP2"))
+import db_pool
+
+# Módulos de consultas verificados e a base de dados de cada um
+QUERY_MODULES = [
+    (os.path.join(ASSISTENTE_DIR, "WebAppAssistantV2", "APP2", "recipedb_queries.py"), "recipe_database"),
+    (os.path.join(ASSISTENTE_DIR, "WebAppAssistantV2", "APP2", "pantrydb_queries.py"), "pantry_database"),
+    (os.path.join(ASSISTENTE_DIR, "WebAppAssistantV2", "APP2", "cooking_session.py"), "recipe_database"),
+    (os.path.join(ASSISTENTE_DIR, "recipedb_queries.py"), "recipe_database"),
+]
+
+# Exemplos dos campos dos modelos SQL ao nível do módulo: nome -> [(variante, campos)]
+TEMPLATE_SAMPLES = {
+    "STOCK_TOTALS_UPDATE": [
+        ("all", {"details": "", "items": ""}),
+        ("items", {"details": "WHERE sd.stock_id IN (%s)", "items": "WHERE s.stock_id IN (%s)"}),
+    ],
+    "SUMMARY_UPSERT": [
+        ("all", {"where": ""}),
+        ("recipe", {"where": "WHERE r.recipe_id = %s"}),
+    ],
+}
+
+# Consultas montadas por concatenação, que a leitura do código-fonte não reconstrói: módulo -> [(função, consulta)]
+REGISTERED_QUERIES = {
+    "pantrydb_queries.py": [
+        ("getStockRows", "SELECT s.name, sd.quantity, sd.unit, sd.expiration_date FROM stock_details sd "
+                         "JOIN stock s ON sd.stock_id = s.stock_id WHERE s.name IN (%s)"),
+    ],
+}
+
+# Leituras completas esperadas: consulta (função, constante ou constante/variante) -> tabelas do EXPLAIN
+ALLOWED_SCANS = {
+    # Full recomputations, used by migrations and maintenance, read every row on purpose
+    "STOCK_TOTALS_UPDATE/all": {"s", "sd", "oldest"},
+    "SUMMARY_UPSERT/all": {"r"},
+}
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT\b.*\bSELECT)\b", re.IGNORECASE | re.DOTALL)
+HAS_WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+
+def render_fstring(node):
+    """
+    Reconstrói uma f-string SQL com `%s` no lugar de cada `{placeholders}`.
+
+    @return A consulta, ou None se a f-string interpolar outra expressão.
+    """
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        elif isinstance(value.value, ast.Name) and value.value.id == "placeholders":
+            parts.append("%s")
+        else:
+            return None
+    return "".join(parts)
+
+
+def expand_template(name, query):
+    """
+    Preenche os campos `{...}` de um modelo SQL com os exemplos de `TEMPLATE_SAMPLES`.
+
+    @return Lista de tuplos (rótulo, consulta), ou None se o modelo não tiver exemplos registados.
+    """
+    if not TEMPLATE_FIELD.search(query):
+        return [(name, query)]
+    if name not in TEMPLATE_SAMPLES:
+        return None
+    return [(f"{name}/{variant}", query.format(**fields)) for variant, fields in TEMPLATE_SAMPLES[name]]
+
+
+def extract_queries(path):
+    """
+    Lista as consultas SQL de um módulo, com o nome da função ou da constante onde aparecem.
+
+    @return (consultas, erros): listas de tuplos (rótulo, linha, consulta) e (rótulo, linha, motivo).
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    queries, errors = [], []
+
+    for statement in tree.body:
+        if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                and isinstance(statement.targets[0], ast.Name) and isinstance(statement.value, ast.Constant)
+                and isinstance(statement.value.value, str) and EXPLAINABLE.match(statement.value.value)):
+            name = statement.targets[0].id
+            expanded = expand_template(name, statement.value.value)
+            if expanded is None:
+                errors.append((name, statement.lineno, "modelo SQL sem exemplos em TEMPLATE_SAMPLES"))
+                continue
+            queries.extend((label, statement.lineno, query) for label, query in expanded)
+
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        # The literal parts of an f-string are checked with the whole f-string, not on their own
+        fragments = {id(part) for node in ast.walk(function) if isinstance(node, ast.JoinedStr) for part in node.values}
+        for node in ast.walk(function):
+            if id(node) in fragments:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and EXPLAINABLE.match(node.value):
+                queries.append((function.name, node.lineno, node.value))
+            elif isinstance(node, ast.JoinedStr):
+                literal = "".join(v.value for v in node.values if isinstance(v, ast.Constant))
+                if not EXPLAINABLE.match(literal):
+                    continue
+                query = render_fstring(node)
+                if query is None:
+                    errors.append((function.name, node.lineno, "f-string SQL sem exemplo; registe-a em REGISTERED_QUERIES"))
+                else:
+                    queries.append((function.name, node.lineno, query))
+
+    for function, query in REGISTERED_QUERIES.get(os.path.basename(path), []):
+        queries.append((function, 0, query))
+
+    # Several functions share the same SQL (e.g. next/previous instruction); explain each query once
+    seen = set()
+    queries = [(label, line, " ".join(query.split())) for label, line, query in sorted(queries, key=lambda q: q[1])]
+    return [q for q in queries if not (q[2] in seen or seen.add(q[2]))], errors
+
+
+def check_query(cursor, label, query, min_rows):
+    """
+    Corre EXPLAIN sobre uma consulta.
+
+    @return (plano, problemas): as linhas do EXPLAIN e a lista de tabelas lidas por inteiro (sem índice possível,
+    ou com índice mas com pelo menos `min_rows` linhas), excluindo as de `ALLOWED_SCANS`.
+    """
+    cursor.execute("EXPLAIN " + query, ("1",) * query.count("%s"))
+    plan = cursor.fetchall()
+    problems = []
+    filtered = bool(HAS_WHERE.search(query))
+    for i, row in enumerate(plan):
+        table = row.get("table") or ""
+        if table.startswith("<"):
+            continue  # derived tables and unions
+        if i == 0 and not filtered:
+            continue  # listing queries are expected to read the driving table
+        if row.get("type") != "ALL" or table in ALLOWED_SCANS.get(label, ()):
+            continue
+        if not row.get("possible_keys") or (row.get("rows") or 0) >= min_rows:
+            problems.append(table)
+    return plan, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica se as consultas dos módulos *_queries usam índices.")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar o plano de todas as consultas")
+    parser.add_argument("--min-rows", type=int, default=50,
+                        help="Linhas a partir das quais uma leitura completa com índice possível é uma regressão")
+    args = parser.parse_args()
+
+    regressions = 0
+    for path, database in QUERY_MODULES:
+        module = os.path.relpath(path, os.path.join(ASSISTENTE_DIR, ".."))
+        try:
+            conn = db_pool.get_connection(database)
+        except Error as e:
+            print(f"{module}: falha ao ligar a {database}: {e}")
+            regressions += 1
+            continue
+        try:
+            cursor = conn.cursor(dictionary=True)
+            queries, errors = extract_queries(path)
+            for function, line, reason in errors:
+                print(f"ERRO  {module}:{line} {function}: {reason}")
+                regressions += 1
+            for function, line, query in queries:
+                try:
+                    plan, problems = check_query(cursor, function, query, args.min_rows)
+                except Error as e:
+                    print(f"ERRO  {module}:{line} {function}: {e}")
+                    regressions += 1
+                    continue
+                if problems:
+                    regressions += 1
+                    print(f"SCAN  {module}:{line} {function}: leitura completa em {', '.join(problems)}")
+                    print(f"      {query}")
+                elif args.verbose:
+                    print(f"OK    {module}:{line} {function}")
+                if problems or args.verbose:
+                    for row in plan:
+                        print(f"      {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+            cursor.close()
+        finally:
+            conn.close()
+
+    if regressions:
+        print(f"{regressions} consulta(s) com problemas.")
+        sys.exit(1)
+    print("Todas as consultas usam índices.")
+
+
+if __name__ == "__main__":
+    main()
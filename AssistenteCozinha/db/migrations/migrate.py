@@ -0,0 +1,158 @@
+"""
+Migrações versionadas das bases de dados `recipe_database` e `pantry_database`.
+
+Cada base de dados tem uma pasta com ficheiros `NNNN_descricao.sql`, aplicados por ordem de versão.
+Passos de dados que precisam do código do backend (por exemplo conversões de unidades) são ficheiros
+`NNNN_descricao.py` com uma função `upgrade(cursor)`, aplicados na mesma sequência.
+As migrações aplicadas ficam registadas na tabela `schema_migrations` de cada base de dados (versão, nome,
+checksum e data), por isso correr o script várias vezes só aplica as migrações novas.
+
+Uso:
+    python migrate.py                      # aplica as migrações pendentes nas duas bases de dados
+    python migrate.py --status             # mostra o estado das migrações sem aplicar nada
+    python migrate.py --database pantry_database
+
+Depois de migrar, `check_query_plans.py` verifica se as consultas dos módulos *_queries usam os índices.
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+
+from mysql.connector import Error
+
+# Reuse the Flask backend connection pool (Assistente/WebAppAssistantV2/APP2/db_pool.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Assistente", "WebAppAssistantV2", "APP2"))
+import db_pool
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bases de dados geridas, pela ordem em que são migradas
+DATABASES = ["recipe_database", "pantry_database"]
+
+MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.(sql|py)$")
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def list_migrations(database):
+    """
+    Lista as migrações de uma base de dados.
+
+    @return Lista de tuplos (versão, nome, caminho, checksum) ordenada por versão.
+    """
+    folder = os.path.join(MIGRATIONS_DIR, database)
+    migrations = []
+    for filename in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(folder, filename)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append((int(match.group(1)), match.group(2), path, checksum))
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Versões de migração repetidas em {folder}")
+    return sorted(migrations)
+
+
+def split_statements(sql):
+    """
+    Divide um ficheiro SQL em instruções, ignorando comentários `--`.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def run_python_migration(cursor, version, path):
+    """
+    Carrega um ficheiro de migração `.py` e corre a sua função `upgrade(cursor)`.
+    """
+    spec = importlib.util.spec_from_file_location(f"migration_{version:04d}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(cursor)
+
+
+def applied_migrations(cursor):
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version, name, checksum FROM schema_migrations ORDER BY version")
+    return {version: (name, checksum) for version, name, checksum in cursor.fetchall()}
+
+
+def migrate(database, status_only=False):
+    """
+    Aplica (ou só mostra) as migrações pendentes de uma base de dados.
+
+    @return True se tudo correu bem; False se alguma migração falhou.
+    """
+    conn = db_pool.get_connection(database)
+    try:
+        cursor = conn.cursor()
+        applied = applied_migrations(cursor)
+        conn.commit()
+        print(f"[{database}]")
+        for version, name, path, checksum in list_migrations(database):
+            if version in applied:
+                if applied[version][1] != checksum:
+                    print(f"  {version:04d} {name}: AVISO - o ficheiro mudou depois de ter sido aplicado")
+                else:
+                    print(f"  {version:04d} {name}: aplicada")
+                continue
+            if status_only:
+                print(f"  {version:04d} {name}: pendente")
+                continue
+            statements = []
+            if path.endswith(".sql"):
+                with open(path, encoding="utf-8") as f:
+                    statements = split_statements(f.read())
+            try:
+                # DDL commits implicitly in MariaDB: statements are written to be idempotent (IF NOT EXISTS)
+                for statement in statements:
+                    cursor.execute(statement)
+                if path.endswith(".py"):
+                    run_python_migration(cursor, version, path)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (version, name, checksum))
+                conn.commit()
+                detail = "script" if path.endswith(".py") else f"{len(statements)} instruções"
+                print(f"  {version:04d} {name}: aplicada agora ({detail})")
+            except Error as e:
+                conn.rollback()
+                print(f"  {version:04d} {name}: FALHOU - {e}")
+                return False
+        cursor.close()
+        return True
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica as migrações versionadas das bases de dados.")
+    parser.add_argument("--database", choices=DATABASES, help="Migrar apenas esta base de dados")
+    parser.add_argument("--status", action="store_true", help="Mostrar o estado sem aplicar migrações")
+    args = parser.parse_args()
+
+    ok = True
+    for database in [args.database] if args.database else DATABASES:
+        try:
+            ok = migrate(database, status_only=args.status) and ok
+        except Error as e:
+            print(f"[{database}] Falha ao ligar à base de dados: {e}")
+            ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+-- -------------------------------------------------------------------------------
+-- 0001 - Índices para as consultas mais frequentes da base de dados da despensa
+-- -------------------------------------------------------------------------------
+-- Todas as operações de stock começam por procurar o item pelo nome
+CREATE INDEX IF NOT EXISTS idx_stock_name ON stock (name);
+
+-- Entradas de um item pela validade mais próxima (removeStock, searchStock)
+CREATE INDEX IF NOT EXISTS idx_stock_details_stock_expiration ON stock_details (stock_id, expiration_date);
+
+-- Produtos da lista de compras pelo nome (insertGrocery, removeGrocery)
+CREATE INDEX IF NOT EXISTS idx_grocerylist_name ON grocerylist (name);
@@ -0,0 +1,5 @@
+-- -------------------------------------------------------------------------------
+-- 0002 - Índice para os produtos perto do fim da validade
+-- -------------------------------------------------------------------------------
+-- Lotes que expiram até uma data, de todos os itens (getExpiringStock, /pantry/expiring)
+CREATE INDEX IF NOT EXISTS idx_stock_details_expiration ON stock_details (expiration_date, stock_id);
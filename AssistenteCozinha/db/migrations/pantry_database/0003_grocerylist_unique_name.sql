@@ -0,0 +1,13 @@
+-- -------------------------------------------------------------------------------
+-- 0003 - Nome único na lista de compras
+-- -------------------------------------------------------------------------------
+-- As operações da lista de compras passam a ser upserts (INSERT ... ON DUPLICATE KEY UPDATE) sobre o nome,
+-- por isso cada produto só pode aparecer uma vez. Remove as linhas repetidas, mantendo a mais antiga.
+DELETE g FROM grocerylist g
+JOIN grocerylist older ON older.name = g.name AND older.grocerylist_id < g.grocerylist_id;
+
+-- Produtos da lista de compras pelo nome (insertGroceryBulk, removeGroceryBulk, addMissingIngredients)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_grocerylist_name ON grocerylist (name);
+
+-- O índice único substitui o índice simples da migração 0001
+DROP INDEX IF EXISTS idx_grocerylist_name ON grocerylist;
@@ -0,0 +1,11 @@
+-- -------------------------------------------------------------------------------
+-- 0004 - Quantidades inteiras na unidade base de cada item
+-- -------------------------------------------------------------------------------
+-- Unidade base do item: 'mg' (massa) ou 'ul' (volume), fixada pelo primeiro lote com uma unidade conhecida
+ALTER TABLE stock ADD COLUMN IF NOT EXISTS base_unit VARCHAR(2) NULL;
+
+-- Quantidade do lote na unidade base do item, calculada na escrita (insertStock, insertStockBulk, removeStock).
+-- `quantity` e `unit` continuam a guardar a quantidade original, para mostrar.
+ALTER TABLE stock_details ADD COLUMN IF NOT EXISTS base_quantity BIGINT NULL;
+
+-- Os lotes existentes são preenchidos pela migração 0005 (usa as conversões de pantrydb_queries)
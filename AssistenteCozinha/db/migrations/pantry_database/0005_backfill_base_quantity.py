@@ -0,0 +1,59 @@
+"""
+0005 - Preenche `stock.base_unit` e `stock_details.base_quantity` dos lotes já existentes.
+
+As conversões (sinónimos, plurais, unidades não métricas e densidades dos ingredientes) são as mesmas que o
+backend usa na escrita (`pantrydb_queries.toBaseQuantity()`), por isso este passo é feito em Python e não em SQL.
+Lotes numa unidade sem conversão ficam com `base_quantity` NULL.
+"""
+import pantrydb_queries as pdb
+
+## @var BATCH_SIZE
+# @brief Número de lotes lidos e atualizados de cada vez.
+BATCH_SIZE = 1000
+
+
+def upgrade(cursor):
+    """
+    Preenche as colunas da migração 0004.
+
+    @return Número de lotes preenchidos.
+    """
+    # Base unit of each item: the first lot with a convertible unit
+    cursor.execute("""
+    SELECT s.stock_id, sd.unit
+    FROM stock s
+    JOIN stock_details sd ON sd.stock_id = s.stock_id
+    WHERE s.base_unit IS NULL
+    ORDER BY s.stock_id, sd.detail_id
+    """)
+    base_units = {}
+    for stock_id, unit in cursor.fetchall():
+        if stock_id not in base_units and pdb.baseUnit(unit):
+            base_units[stock_id] = pdb.baseUnit(unit)
+    if base_units:
+        cursor.executemany("UPDATE stock SET base_unit = %s WHERE stock_id = %s",
+                           [(base_unit, stock_id) for stock_id, base_unit in base_units.items()])
+
+    filled = 0
+    after = 0
+    while True:
+        cursor.execute("""
+        SELECT sd.detail_id, s.name, sd.quantity, sd.unit, s.base_unit
+        FROM stock_details sd
+        JOIN stock s ON s.stock_id = sd.stock_id
+        WHERE sd.detail_id > %s AND sd.base_quantity IS NULL AND s.base_unit IS NOT NULL
+        ORDER BY sd.detail_id
+        LIMIT %s
+        """, (after, BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            return filled
+        updates = []
+        for detail_id, name, quantity, unit, base_unit in rows:
+            base_quantity = pdb.toBaseQuantity(quantity, unit, base_unit, name)
+            if base_quantity is not None:
+                updates.append((base_quantity, detail_id))
+        if updates:
+            cursor.executemany("UPDATE stock_details SET base_quantity = %s WHERE detail_id = %s", updates)
+            filled += len(updates)
+        after = rows[-1][0]
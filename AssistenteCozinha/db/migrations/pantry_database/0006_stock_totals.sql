@@ -0,0 +1,26 @@
+-- -------------------------------------------------------------------------------
+-- 0006 - Totais por item na tabela stock
+-- -------------------------------------------------------------------------------
+-- Mantidos na mesma transação de cada escrita de lotes (pantrydb_queries.refreshStockTotals), para que
+-- "tenho X?" (searchStock, /pantry/check-grocery) leia uma só linha em vez de somar todos os lotes.
+ALTER TABLE stock
+    ADD COLUMN IF NOT EXISTS total_base_quantity BIGINT NULL,      -- SUM(stock_details.base_quantity)
+    ADD COLUMN IF NOT EXISTS lot_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS unconverted_lots INT NOT NULL DEFAULT 0, -- lotes sem base_quantity
+    ADD COLUMN IF NOT EXISTS earliest_expiration DATE NULL,
+    ADD COLUMN IF NOT EXISTS display_unit VARCHAR(50) NULL;        -- unidade do lote mais antigo
+
+-- Totais dos itens já existentes
+UPDATE stock s
+LEFT JOIN (
+    SELECT sd.stock_id, SUM(sd.base_quantity) AS total_base_quantity, COUNT(*) AS lot_count,
+        COUNT(*) - COUNT(sd.base_quantity) AS unconverted_lots, MIN(sd.expiration_date) AS earliest_expiration
+    FROM stock_details sd
+    GROUP BY sd.stock_id
+) t ON t.stock_id = s.stock_id
+SET s.total_base_quantity = t.total_base_quantity,
+    s.lot_count = COALESCE(t.lot_count, 0),
+    s.unconverted_lots = COALESCE(t.unconverted_lots, 0),
+    s.earliest_expiration = t.earliest_expiration,
+    s.display_unit = (SELECT oldest.unit FROM stock_details oldest WHERE oldest.stock_id = s.stock_id
+                      ORDER BY oldest.detail_id LIMIT 1);
@@ -0,0 +1,14 @@
+-- -------------------------------------------------------------------------------
+-- 0007 - Itens da despensa ligados à entidade canónica de ingrediente
+-- -------------------------------------------------------------------------------
+-- A tabela ingredients está em recipe_database (migração recipe_database/0003), que é migrada primeiro.
+ALTER TABLE stock ADD COLUMN IF NOT EXISTS ingredient_id INT NULL;
+
+-- Itens de um ingrediente (addMissingIngredients junta recipe_ingredients e stock por ingredient_id)
+CREATE INDEX IF NOT EXISTS idx_stock_ingredient ON stock (ingredient_id);
+
+ALTER TABLE stock
+    ADD CONSTRAINT fk_stock_ingredient FOREIGN KEY IF NOT EXISTS (ingredient_id)
+    REFERENCES recipe_database.ingredients (ingredient_id);
+
+-- Os itens existentes são preenchidos pela migração 0008
@@ -0,0 +1,31 @@
+"""
+0008 - Liga os itens da despensa já existentes à tabela `recipe_database.ingredients`.
+
+Usa o mesmo resolver do backend (`ingredients.resolve_many()`), por isso "batatas" na despensa e "batata" numa
+receita ficam com o mesmo `ingredient_id`.
+"""
+import ingredients as ing
+
+
+def upgrade(cursor):
+    """
+    Cria os ingredientes que faltam e preenche `stock.ingredient_id`.
+
+    @return Número de itens ligados.
+    """
+    cursor.execute("""
+    SELECT s.stock_id, s.name,
+        (SELECT sd.unit FROM stock_details sd WHERE sd.stock_id = s.stock_id ORDER BY sd.detail_id LIMIT 1)
+    FROM stock s
+    WHERE s.ingredient_id IS NULL
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+    units = {}
+    for _, name, unit in rows:
+        units.setdefault(name, unit)
+    ids = ing.resolver.resolve_many(list(units), units)
+    updates = [(ids[name], stock_id) for stock_id, name, _ in rows if ids.get(name)]
+    cursor.executemany("UPDATE stock SET ingredient_id = %s WHERE stock_id = %s", updates)
+    return len(updates)
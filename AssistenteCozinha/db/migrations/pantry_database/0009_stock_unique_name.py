@@ -0,0 +1,58 @@
+"""
+0009 - Nome único na tabela `stock`.
+
+A inserção de itens passa a ser um upsert (`INSERT ... ON DUPLICATE KEY UPDATE`) sobre o nome, como a lista de
+compras na migração 0003, por isso cada item só pode aparecer uma vez. Os itens repetidos são fundidos no mais
+antigo: os seus lotes passam para esse item, com `base_quantity` recalculada na unidade base do item que fica, e os
+totais da migração 0006 são recalculados. Por isso este passo é feito em Python e não em SQL.
+"""
+import pantrydb_queries as pdb
+
+
+def upgrade(cursor):
+    """
+    Funde os itens com o mesmo nome e cria o índice único `uq_stock_name`.
+
+    @return Número de itens removidos.
+    """
+    # Oldest item with the same name (the comparison follows the column collation, as the unique index will)
+    cursor.execute("""
+    SELECT s.stock_id, MIN(keep.stock_id)
+    FROM stock s
+    JOIN stock keep ON keep.name = s.name AND keep.stock_id < s.stock_id
+    GROUP BY s.stock_id
+    """)
+    keep = dict(cursor.fetchall())
+    if keep:
+        ids = sorted(set(keep) | set(keep.values()))
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"SELECT stock_id, name, base_unit, ingredient_id FROM stock WHERE stock_id IN ({placeholders})", ids)
+        items = {stock_id: [name, base_unit, ingredient_id] for stock_id, name, base_unit, ingredient_id in cursor.fetchall()}
+        # The kept item takes the base unit and ingredient of its duplicates when it has none
+        for stock_id in sorted(keep):
+            kept = items[keep[stock_id]]
+            kept[1] = kept[1] or items[stock_id][1]
+            kept[2] = kept[2] or items[stock_id][2]
+
+        # Lots of every merged item, including the kept one, whose base unit may have just been set
+        cursor.execute(f"SELECT detail_id, stock_id, quantity, unit FROM stock_details WHERE stock_id IN ({placeholders})",
+                       ids)
+        lots = []
+        for detail_id, stock_id, quantity, unit in cursor.fetchall():
+            target = keep.get(stock_id, stock_id)
+            name, base_unit, _ = items[target]
+            lots.append((target, pdb.toBaseQuantity(quantity, unit, base_unit, name), detail_id))
+        if lots:
+            cursor.executemany("UPDATE stock_details SET stock_id = %s, base_quantity = %s WHERE detail_id = %s", lots)
+        kept_ids = sorted(set(keep.values()))
+        cursor.executemany("UPDATE stock SET base_unit = %s, ingredient_id = %s WHERE stock_id = %s",
+                           [(items[stock_id][1], items[stock_id][2], stock_id) for stock_id in kept_ids])
+        duplicates = sorted(keep)
+        placeholders = ", ".join(["%s"] * len(duplicates))
+        cursor.execute(f"DELETE FROM stock WHERE stock_id IN ({placeholders})", duplicates)
+        pdb.refreshStockTotals(cursor, kept_ids)
+
+    # Itens da despensa pelo nome (insertStock, insertStockBulk); substitui o índice simples da migração 0001
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_name ON stock (name)")
+    cursor.execute("DROP INDEX IF EXISTS idx_stock_name ON stock")
+    return len(keep)
@@ -0,0 +1,19 @@
+-- -------------------------------------------------------------------------------
+-- 0001 - Índices para as consultas mais frequentes da base de dados de receitas
+-- -------------------------------------------------------------------------------
+-- Passos de uma receita, por ordem (cooking_session, getNext/Previous/ActualInstruction)
+CREATE INDEX IF NOT EXISTS idx_recipe_instructions_recipe_step ON recipe_instructions (recipe_id, step_number);
+
+-- Ingredientes de uma receita, pela ordem de inserção (getIngredients, recipe_catalog)
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_recipe ON recipe_ingredients (recipe_id, recipe_ingredient_id);
+
+-- Imagem de uma receita (getImg_url)
+CREATE INDEX IF NOT EXISTS idx_recipe_images_recipe ON recipe_images (recipe_id, image_id);
+
+-- Procura de tags e utensílios pelo nome (getRecipeByTag, ingestão de receitas)
+CREATE INDEX IF NOT EXISTS idx_tags_name ON tags (name);
+CREATE INDEX IF NOT EXISTS idx_tools_name ON tools (name);
+
+-- Receitas de uma tag (getRecipeByTag) e utensílios de um passo (getTools)
+CREATE INDEX IF NOT EXISTS idx_recipe_tags_tag ON recipe_tags (tag_id, recipe_id);
+CREATE INDEX IF NOT EXISTS idx_instructions_tools_tool ON instructions_tools (tool_id, recipe_instruction_id);
@@ -0,0 +1,58 @@
+-- -------------------------------------------------------------------------------
+-- 0002 - Resumo materializado das receitas (substitui o cálculo da vista recipe_information)
+-- -------------------------------------------------------------------------------
+-- Uma linha por receita com os valores que as listagens mostram, calculados uma vez na ingestão
+-- (recipedb_queries.refreshRecipeSummary) em vez de em cada leitura.
+CREATE TABLE IF NOT EXISTS recipe_summary (
+    recipe_id INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    number_of_servings INT,
+    cooking_minutes INT, -- Tempo de confeção em minutos (primeiro número de recipes.cooking_time)
+    calories_per_portion DECIMAL(10, 2), -- SUM(recipe_ingredients.calories) / number_of_servings
+    ingredient_count INT NOT NULL DEFAULT 0,
+    step_count INT NOT NULL DEFAULT 0,
+    tool_count INT NOT NULL DEFAULT 0, -- Utensílios distintos usados nos passos
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (recipe_id) REFERENCES recipes (recipe_id) ON DELETE CASCADE
+);
+
+-- Listagens ordenadas pelo nome (getRecipeSummaries)
+CREATE INDEX IF NOT EXISTS idx_recipe_summary_name ON recipe_summary (name);
+
+-- Preencher o resumo das receitas que já existem (mesma consulta que recipedb_queries.refreshRecipeSummary)
+INSERT INTO recipe_summary
+    (recipe_id, name, number_of_servings, cooking_minutes, calories_per_portion,
+     ingredient_count, step_count, tool_count)
+SELECT
+    r.recipe_id,
+    r.name,
+    r.number_of_servings,
+    CAST(NULLIF(REGEXP_SUBSTR(r.cooking_time, '[0-9]+'), '') AS UNSIGNED),
+    (SELECT SUM(ri.calories) FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id)
+        / NULLIF(r.number_of_servings, 0),
+    (SELECT COUNT(*) FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id),
+    (SELECT COUNT(*) FROM recipe_instructions rs WHERE rs.recipe_id = r.recipe_id),
+    (SELECT COUNT(DISTINCT it.tool_id)
+        FROM recipe_instructions rs
+        JOIN instructions_tools it ON it.recipe_instruction_id = rs.recipe_instruction_id
+        WHERE rs.recipe_id = r.recipe_id)
+FROM recipes r
+ON DUPLICATE KEY UPDATE
+    name = VALUES(name),
+    number_of_servings = VALUES(number_of_servings),
+    cooking_minutes = VALUES(cooking_minutes),
+    calories_per_portion = VALUES(calories_per_portion),
+    ingredient_count = VALUES(ingredient_count),
+    step_count = VALUES(step_count),
+    tool_count = VALUES(tool_count);
+
+-- A vista recipe_information passa a ler o resumo, mantendo as colunas que já tinha
+CREATE OR REPLACE VIEW recipe_information AS
+SELECT
+    s.recipe_id,
+    s.name AS RECEITA,
+    s.number_of_servings AS Serviços,
+    s.cooking_minutes AS Tempo,
+    s.calories_per_portion AS CaloriasPorPorção
+FROM
+    recipe_summary s;
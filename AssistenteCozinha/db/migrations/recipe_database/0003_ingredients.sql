@@ -0,0 +1,30 @@
+-- -------------------------------------------------------------------------------
+-- 0003 - Entidade canónica de ingrediente
+-- -------------------------------------------------------------------------------
+-- Um ingrediente por chave normalizada (singular, sem acentos, minúsculas; ver APP2/ingredients.py).
+-- stock.ingredient_id (pantry_database) e recipe_ingredients.ingredient_id apontam para esta tabela.
+CREATE TABLE IF NOT EXISTS ingredients (
+    ingredient_id INT AUTO_INCREMENT PRIMARY KEY,
+    name_key VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,            -- forma no singular, para mostrar
+    default_unit VARCHAR(50) NULL,
+    density DECIMAL(6, 3) NULL,            -- g/ml, para conversões entre massa e volume
+    UNIQUE KEY uq_ingredients_name_key (name_key)
+);
+
+-- Nomes alternativos de um ingrediente ("abacaxi" -> ananás)
+CREATE TABLE IF NOT EXISTS ingredient_synonyms (
+    synonym_key VARCHAR(255) PRIMARY KEY,
+    ingredient_id INT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    FOREIGN KEY (ingredient_id) REFERENCES ingredients (ingredient_id) ON DELETE CASCADE
+);
+
+-- Ingredientes das receitas ligados à entidade canónica (preenchido pela migração 0004)
+ALTER TABLE recipe_ingredients ADD COLUMN IF NOT EXISTS ingredient_id INT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_ingredient ON recipe_ingredients (ingredient_id);
+
+ALTER TABLE recipe_ingredients
+    ADD CONSTRAINT fk_recipe_ingredients_ingredient FOREIGN KEY IF NOT EXISTS (ingredient_id)
+    REFERENCES ingredients (ingredient_id);
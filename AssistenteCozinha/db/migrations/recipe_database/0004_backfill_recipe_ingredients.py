@@ -0,0 +1,25 @@
+"""
+0004 - Liga os ingredientes das receitas já existentes à tabela `ingredients`.
+
+A chave de cada nome é calculada em Python (`ingredients.ingredient_key()`: singular, sem acentos), a mesma usada
+pelo backend quando insere receitas e stock.
+"""
+import ingredients as ing
+
+
+def upgrade(cursor):
+    """
+    Cria os ingredientes que faltam e preenche `recipe_ingredients.ingredient_id`.
+
+    @return Número de nomes ligados.
+    """
+    cursor.execute("SELECT name, unit FROM recipe_ingredients WHERE ingredient_id IS NULL ORDER BY recipe_ingredient_id")
+    units = {}
+    for name, unit in cursor.fetchall():
+        units.setdefault(name, unit)
+    if not units:
+        return 0
+    ids = ing.resolver.resolve_many(list(units), units)
+    cursor.executemany("UPDATE recipe_ingredients SET ingredient_id = %s WHERE name = %s AND ingredient_id IS NULL",
+                       [(ingredient_id, name) for name, ingredient_id in ids.items() if ingredient_id])
+    return len(ids)
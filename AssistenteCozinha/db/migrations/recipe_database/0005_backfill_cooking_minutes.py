@@ -0,0 +1,21 @@
+"""
+0005 - Recalcula `recipe_summary.cooking_minutes` com as regras dos filtros por tempo.
+
+A migração 0002 guardava o primeiro número de `recipes.cooking_time`, por isso "1 hora" ficava 1 minuto e "1h30"
+também 1. O valor passa a ser calculado em Python (`recipe_facets.parse_minutes()`), o mesmo usado pelo backend
+em `recipedb_queries.refreshRecipeSummary()` e pela pesquisa facetada.
+"""
+from recipe_facets import parse_minutes
+
+
+def upgrade(cursor):
+    """
+    Atualiza os minutos de confeção de todas as receitas já resumidas.
+
+    @return Número de receitas atualizadas.
+    """
+    cursor.execute("SELECT s.recipe_id, r.cooking_time FROM recipe_summary s JOIN recipes r ON r.recipe_id = s.recipe_id")
+    rows = [(parse_minutes(cooking_time), recipe_id) for recipe_id, cooking_time in cursor.fetchall()]
+    if rows:
+        cursor.executemany("UPDATE recipe_summary SET cooking_minutes = %s WHERE recipe_id = %s", rows)
+    return len(rows)
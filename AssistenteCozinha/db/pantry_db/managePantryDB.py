@@ -1,6 +1,13 @@
-import mysql.connector
 from mysql.connector import Error
 from decimal import Decimal
+import os
+import sys
+
+# Reuse the Flask backend connection pool (Assistente/WebAppAssistantV2/APP2/db_pool.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Assistente", "WebAppAssistantV2", "APP2"))
+import db_pool
+import unit_conversion as uc
+import pantrydb_queries as pdb
 
 class ManagePantryDB:
     def __init__(self):
@@ -8,16 +15,10 @@ class ManagePantryDB:
 
     def connectDatabase(self):
         try:
-            conn = mysql.connector.connect(
-                host='localhost',
-                user='admin',
-                password='admin',
-                database='pantry_database'
-            )
-            if conn.is_connected():
-                cursor = conn.cursor()
-                print("Connected to pantry database")
-                return conn, cursor
+            conn = db_pool.get_connection('pantry_database')
+            cursor = conn.cursor()
+            print("Connected to pantry database")
+            return conn, cursor
         except Error as e:
             print(e)
             print("Failed to connect to pantry database")
@@ -52,36 +53,15 @@ class ManagePantryDB:
         'pacote': {'kg': Decimal('1')},
         'saqueta': {'g': Decimal('5')}
     }
+    converter = uc.UnitConverter(conversion_factors)
     
     # ---------------------------------------------------------------------------------------------- [CONVERT MEASURE]
     
     # Convert a quantity from one unit to another using a dictionary of conversion factors 
     def convert_measure(self, quantity, from_unit, to_unit, conversion_factors):
-        from_unit = from_unit.lower().strip('s')  # Normalize the from_unit name
-        to_unit = to_unit.lower().strip('s')  # Normalize the to_unit name
-
-        def find_conversion(current_quantity, current_unit, target_unit, visited_units=set()):
-            # Direct conversion case
-            if target_unit in conversion_factors[current_unit]:
-                return current_quantity * conversion_factors[current_unit][target_unit], target_unit
-
-            # Recursive conversion case: find a path through an intermediary
-            for intermediate_unit in conversion_factors[current_unit]:
-                if intermediate_unit not in visited_units:  # Avoid cycles
-                    visited_units.add(intermediate_unit)
-                    intermediate_quantity = current_quantity * conversion_factors[current_unit][intermediate_unit]
-                    # Recursively convert from intermediate unit to target unit
-                    result = find_conversion(intermediate_quantity, intermediate_unit, target_unit, visited_units)
-                    if result:
-                        return result
-            return None
-
-        # Start the conversion process
-        result = find_conversion(quantity, from_unit, to_unit)
-        if result:
-            return result
-        else:
-            raise ValueError("No valid conversion path found from {} to {}".format(from_unit, to_unit))
+        # All-pairs factor table compiled once (Assistente/WebAppAssistantV2/APP2/unit_conversion.py)
+        table = self.converter if conversion_factors is self.conversion_factors else uc.UnitConverter(conversion_factors)
+        return table.convert(quantity, from_unit, to_unit)
 
     # ---------------------------------------------------------------------------------------------- [STOCK List]
 
@@ -111,111 +91,14 @@ class ManagePantryDB:
             print("Failed to connect to the database.")
 
     # Insert a new Stock item into stock_details with expiration date
+    # Lots also store their quantity in the item's integer base unit (stock.base_unit, stock_details.base_quantity);
+    # use the backend functions so this script writes the same columns
     def insertStock(self, name, quantity, unit, expiration_date):
-        conn, cursor = self.connectDatabase()
-        if conn is not None and cursor is not None:
-            try:
-                cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-                stock_id_result = cursor.fetchone()
-                if stock_id_result:
-                    stock_id = stock_id_result[0]
-                else:
-                    print(f"Stock item '{name}' does not exist in the database, inserting it now.")
-                    cursor.execute("INSERT INTO stock (name) VALUES (%s)", (name,))
-                    conn.commit()
-                    print(f"Stock item '{name}' inserted successfully.")
-                    #self.insertStock_table(name)
-                    
-                    # Fetch the new stock_id for the just inserted item
-                    cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-                    new_stock_id_result = cursor.fetchone()
-                    print(" STOCK ID FROM THE NEW ADDED PRODUCT",new_stock_id_result)
-                    if new_stock_id_result:
-                        stock_id = new_stock_id_result[0]
-                    else:
-                        print("Failed to fetch stock_id after insertion.")
-                        return
+        return pdb.insertStock(name, quantity, unit, expiration_date)
 
-                # Insert into stock_details
-                cursor.execute("INSERT INTO stock_details (stock_id, quantity, unit, expiration_date) VALUES (%s, %s, %s, %s)", (stock_id, quantity, unit, expiration_date))
-                conn.commit()
-                print(f"Stock item '{name}' with expiration date '{expiration_date}' inserted successfully in the PantryDB.")
-            except Error as e:
-                print(e)
-                print(f"Failed to insert stock item '{name}'")
-            finally:
-                cursor.close()
-                conn.close()
-                print("Connection closed.")
-        else:
-            print("Failed to connect to the database.")
-
-    # Remove [update] stock item from stock_details           
+    # Remove [update] stock item from stock_details (FIFO over all lots of the item)
     def removeStock(self, name, quantity, unit):
-        conn, cursor = self.connectDatabase()
-        if conn is not None and cursor is not None:
-            try:
-                # Fetch stock_id using the name
-                cursor.execute("SELECT stock_id FROM stock WHERE name = %s", (name,))
-                stock_id_result = cursor.fetchone()
-                if stock_id_result:
-                    stock_id = stock_id_result[0]
-                    # Fetch the stock detail with the nearest expiration date for the given unit
-                    cursor.execute("""
-                    SELECT detail_id, quantity, unit
-                    FROM stock_details
-                    WHERE stock_id = %s
-                    ORDER BY expiration_date ASC
-                    LIMIT 1
-                    """, (stock_id,))
-                    stock_detail = cursor.fetchone()
-                                
-                    if stock_detail:
-                        detail_id, stock_quantity, stock_unit = stock_detail
-                        print(f"Found stock detail for '{name}' with quantity {stock_quantity} {stock_unit} in stock_details.")
-                        # If the unit is diferent, convert the quantity to the same unit
-                        if stock_unit != unit:
-                            new_quantity, new_unit = self.convert_measure(quantity, unit, stock_unit, self.conversion_factors)
-                            print(f"Converted {quantity} {unit} to {new_quantity} {new_unit}.")
-                        else:
-                            new_quantity, new_unit = quantity, unit
-                            print(f"Units {new_quantity} {new_unit}.")
-                            
-                        if new_quantity == stock_quantity:
-                            # Delete the row if quantity to remove is equal to current quantity
-                            cursor.execute("DELETE FROM stock_details WHERE detail_id = %s", (detail_id,))
-                            print(f"Removed {stock_quantity} {new_unit} of '{name}' from stock_details.")
-                        elif new_quantity < stock_quantity:
-                            # Update the row with the new quantity
-                            updated_quantity = Decimal(stock_quantity) - Decimal(new_quantity)
-                            print(f"Removing {new_quantity} {new_unit} of '{name}' from stock_details.")
-                            print(f"New quantity will be {updated_quantity} {stock_unit}.")
-                            cursor.execute("UPDATE stock_details SET quantity = %s WHERE detail_id = %s", (updated_quantity, detail_id))
-                            print(f"Updated '{name}' quantity to {updated_quantity} {stock_unit} in stock_details.")
-                        elif new_quantity > stock_quantity:
-                            # Search if there is another stock detail with the same name and that we could remove too
-                            cursor.execute("DELETE FROM stock_details WHERE detail_id = %s", (detail_id,))
-                            conn.commit()
-                            print(f"Removed {stock_quantity} {new_unit} of '{name}' from stock_details.")
-                            updated_quantity = Decimal(new_quantity) - Decimal(stock_quantity)
-                            print(f"Searching for another stock in order to remove the remaining {updated_quantity} {new_unit} of '{name}' from stock_details.")
-                            # Fetch the stock detail with the nearest expiration date for the given unit
-                            self.removeStock(name, updated_quantity, stock_unit)
-                            
-                        conn.commit()
-                    else:
-                        print(f"No stock detail found for '{name}' with unit '{unit}'.")
-                else:
-                    print(f"Stock item '{name}' does not exist in the database.")
-            except Error as e:
-                print(e)
-                print(f"Failed to remove stock item '{name}'")
-            finally:
-                cursor.close()
-                conn.close()
-                print("Connection closed.")
-        else:
-            print("Failed to connect to the database.")
+        return pdb.removeStock(name, Decimal(str(quantity)), unit)
 
     # ---------------------------------------------------------------------------------------------- [GROCERY List]
     
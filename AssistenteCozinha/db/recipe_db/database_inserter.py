@@ -1,27 +1,28 @@
 # FICHEIRO PARA INSERIR DADOS NA BASE DE DADOS
 
 import re
-import mysql.connector
 from mysql.connector import Error
 # conda install mysql-connector-python
 # pip install mysql-connector-python
 
 import translators as ts
 import translateData as data
+import os
+import sys
+
+# Reuse the Flask backend connection pool (Assistente/WebAppAssistantV2/APP2/db_pool.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Assistente", "WebAppAssistantV2", "APP2"))
+import db_pool
+import recipedb_queries as rdb
+import ingredients as ing
 
 # Connect to database
 def connectDatabase():
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='admin',
-            password='admin',
-            database='recipe_database'
-        )
-        if conn.is_connected():
-            print("Connected to database")
-            cursor = conn.cursor()
-            return conn, cursor
+        conn = db_pool.get_connection('recipe_database')
+        print("Connected to database")
+        cursor = conn.cursor()
+        return conn, cursor
     except Error as e:
         print(e)
         print("Failed to connect to database")
@@ -75,6 +76,9 @@ def insertRecipe(name):
             instructions = data.recipeSteps(recipeID)
             print("INSERT RECIPE - Instructions: ",instructions)
             insertRecipeInstructions(recipeID, instructions)
+
+            # update the materialized summary (calories per portion, counts, cooking minutes)
+            rdb.refreshRecipeSummary(recipeID)
         
         except Error as e:
             print(e)
@@ -184,14 +188,16 @@ def insertRecipeIngredients(recipeID, ingredients):
     nutri_score = "A"  # for testing purposes
     if conn is not None and cursor is not None:
         try:
+            # Canonical ingredient ids (APP2/ingredients.py), created in one batch for the whole recipe
+            ingredient_ids = ing.resolve_many(list(ingredients))
             for name, quantity_unit in ingredients.items(): 
                 # Usar expressão regular para separar quantidade da unidade
                 match = re.match(r"([0-9,.]+)\s*(.*)", quantity_unit)
                 if match:
                     quantity, unit = match.groups()
                     quantity = quantity.replace(',', '.')  # Converter vírgula em ponto para padronizar o formato decimal
-                    cursor.execute("INSERT INTO recipe_ingredients (recipe_id, name, quantity, unit, nutri_score_value, source_url) VALUES (%s, %s, %s, %s, %s, %s)", 
-                                   (recipeID, name, quantity, unit, nutri_score, sourceURL))
+                    cursor.execute("INSERT INTO recipe_ingredients (recipe_id, name, quantity, unit, nutri_score_value, source_url, ingredient_id) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
+                                   (recipeID, name, quantity, unit, nutri_score, sourceURL, ingredient_ids[name]))
                     print(f"Ingredient '{name}' inserted with quantity: {quantity} and unit: {unit}")
                 else:
                     print(f"Não foi possível processar o ingrediente: {name} com quantidade e unidade: {quantity_unit}")
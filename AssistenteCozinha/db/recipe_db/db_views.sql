@@ -7,6 +7,9 @@
 --  o tempo de cozimento, 
 --  as calorias por porção.
 --
+-- NOTA: a migração db/migrations/recipe_database/0002_recipe_summary.sql substitui esta vista por uma leitura
+-- da tabela materializada recipe_summary (mesmas colunas), atualizada na ingestão das receitas.
+--
 CREATE VIEW recipe_information AS
 SELECT 
     r.recipe_id,
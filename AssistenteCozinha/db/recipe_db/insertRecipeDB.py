@@ -1,10 +1,21 @@
 
-import mysql.connector
 from mysql.connector import Error
 from getData import GetData
 import translators as ts
 import re
 import argparse
+import urllib.request
+import os
+import sys
+
+# Reuse the Flask backend connection pool (Assistente/WebAppAssistantV2/APP2/db_pool.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Assistente", "WebAppAssistantV2", "APP2"))
+import db_pool
+import recipedb_queries as rdb
+import ingredients as ing
+
+# Endpoint do backend Flask que recarrega o catálogo de receitas em memória
+CATALOG_REFRESH_URL = "http://127.0.0.1:5000/recipes/catalog/refresh"
 
 # conda install mysql-connector-python
 # pip install mysql-connector-python
@@ -34,16 +45,10 @@ class InsertRecipeDB:
     
     def connectDatabase(self):
         try:
-            conn = mysql.connector.connect(
-                host='localhost',
-                user='admin',
-                password='admin',
-                database='recipe_database'
-            )
-            if conn.is_connected():
-                print("Connected to database")
-                cursor = conn.cursor()
-                return conn, cursor
+            conn = db_pool.get_connection('recipe_database')
+            print("Connected to database")
+            cursor = conn.cursor()
+            return conn, cursor
         except Error as e:
             print(e)
             print("Failed to connect to database")
@@ -58,7 +63,7 @@ class InsertRecipeDB:
                 existing_recipe = cursor.fetchone()
                 
                 if existing_recipe:
-                    recipeID = existing_recipe
+                    recipeID = existing_recipe[0]
                     print(f"Recipe '{self.name}' already exits.")
                 else:
                     
@@ -87,6 +92,9 @@ class InsertRecipeDB:
                 
                 # insert instructions [and associate(instructions, tools)]
                 self.insertRecipeInstructions(recipeID)
+
+                # update the materialized summary (calories per portion, counts, cooking minutes)
+                rdb.refreshRecipeSummary(recipeID)
             
             except Error as e:
                 print(e)
@@ -196,6 +204,8 @@ class InsertRecipeDB:
         
         if conn is not None and cursor is not None:
             try:
+                # Canonical ingredient ids (APP2/ingredients.py), created in one batch for the whole recipe
+                ingredient_ids = ing.resolve_many(list(self.ingredients))
                 for name, quantity_unit in self.ingredients.items(): 
                     en_name = ts.translate_text(name, "bing", "pt", "en")
                     tmp_calories = self.data.get_calories_by_ingredient_name(en_name)
@@ -210,8 +220,8 @@ class InsertRecipeDB:
                     #print("QUANTITY",quantity)
                     #print("UNIT",unit)
                     #quantity = quantity.replace(',', '.')  # Converter vírgula em ponto para padronizar o formato decimal
-                    cursor.execute("INSERT INTO recipe_ingredients (recipe_id, name, quantity, unit, calories, source_url) VALUES (%s, %s, %s, %s, %s, %s)", 
-                                (recipeID, name, quantity, unit, calories, sourceURL))
+                    cursor.execute("INSERT INTO recipe_ingredients (recipe_id, name, quantity, unit, calories, source_url, ingredient_id) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
+                                (recipeID, name, quantity, unit, calories, sourceURL, ingredient_ids[name]))
                     print(f"Ingredient '{name}' inserted with quantity: {quantity} and unit: {unit}")
                     conn.commit()
                     #else:
@@ -351,6 +361,13 @@ if __name__ == "__main__":
         
         insertVector = InsertRecipeDB(recipe_data)
         insertVector.insertRecipe()
+    
+    # Ask the running backend to reload its in-memory recipe catalog (it also notices on its own after a while)
+    try:
+        urllib.request.urlopen(urllib.request.Request(CATALOG_REFRESH_URL, method="POST"), timeout=2)
+        print("Recipe catalog refreshed")
+    except Exception as e:
+        print(f"Could not refresh the recipe catalog ({e}); it will reload on its next version check")
         
     # 
     # RUN COMMAND: